@@ -0,0 +1,78 @@
+"""
+That benchmark compares the JSON serializers of the LoggedJsonResponseMixin with the JsonResponse()
+and DjangoJSONEncoder that we used before. Run it from the root of the repository:
+
+    python benchmarks/json_serializers.py [--rows 1000] [--repeat 200]
+"""
+import argparse
+import datetime
+import decimal
+import os
+import sys
+import timeit
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_heaven.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.serializers.json import DjangoJSONEncoder  # noqa: E402
+from django.http import JsonResponse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from responses.serializers import EncodedJsonResponse, orjson  # noqa: E402
+
+
+def build_payload(rows: int) -> dict:
+    """ Rows that look like the values() of the usual model """
+    now = timezone.now()
+
+    return {"detail": [
+        {
+            "id": index,
+            "uuid": uuid.uuid4(),
+            "username": f"user-{index}",
+            "balance": decimal.Decimal(index) / 100,
+            "is_active": index % 2 == 0,
+            "created_at": now - datetime.timedelta(minutes=index),
+            "birthday": datetime.date(1990, 1, 1) + datetime.timedelta(days=index),
+            "tags": ["first", "second", "third"],
+        } for index in range(rows)
+    ]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    arguments = parser.parse_args()
+
+    payload = build_payload(arguments.rows)
+    candidates = {
+        "JsonResponse + DjangoJSONEncoder": lambda: JsonResponse(payload, encoder=DjangoJSONEncoder),
+        "EncodedJsonResponse 'django'": lambda: EncodedJsonResponse(payload, serializer='django'),
+        "EncodedJsonResponse 'json'": lambda: EncodedJsonResponse(payload, serializer='json'),
+    }
+
+    if orjson is not None:
+        candidates["EncodedJsonResponse 'orjson'"] = lambda: EncodedJsonResponse(payload, serializer='orjson')
+
+    baseline = None
+    print(f"{arguments.rows} rows, {arguments.repeat} responses per candidate")
+
+    for name, create_response in candidates.items():
+        create_response()   # warm up the caches of the serializers
+        seconds = min(timeit.repeat(create_response, number=arguments.repeat, repeat=3)) / arguments.repeat
+        baseline = baseline or seconds
+
+        print(
+            f"{name:<36} {seconds * 1000:8.3f} ms/response {1 / seconds:10.1f} responses/s "
+            f"{baseline / seconds:6.2f}x {len(create_response().content):>9} bytes",
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+That file contains the measurements of the benchmarks: operations per second, latency percentiles
+and allocations, and the baseline that we compare the results with.
+"""
+import gc
+import json
+import statistics
+import time
+import tracemalloc
+from typing import NamedTuple
+
+
+# tracemalloc.reset_peak() was added in Python 3.9, we cannot measure the peak of one call before it
+CAN_MEASURE_ALLOCATIONS = hasattr(tracemalloc, 'reset_peak')
+
+
+class Measurement(NamedTuple):
+    ops_per_sec: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    peak_alloc_bytes: int = None    # None if the allocations are not measured
+
+    def format(self) -> str:
+        allocations = "      n/a" if self.peak_alloc_bytes is None else f"{self.peak_alloc_bytes / 1024:9.1f}"
+        return (
+            f"{self.ops_per_sec:12.1f} ops/s  p50 {self.p50_us:9.2f}us  p90 {self.p90_us:9.2f}us  "
+            f"p99 {self.p99_us:9.2f}us  {allocations} KiB/op"
+        )
+
+
+def _percentile(sorted_values: list, percent: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))]
+
+
+def measure_allocations(function: callable, iterations: int) -> int:
+    """ Returns the largest peak of the traced memory of one call, or None on Python older than 3.9 """
+    if not CAN_MEASURE_ALLOCATIONS:
+        return None
+
+    peak = 0
+    tracemalloc.start()
+
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            function()
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+def measure(function: callable, min_time: float = 0.5, min_iterations: int = 20, warmup: int = 10) -> Measurement:
+    """
+    Calls the function for min_time seconds, at least min_iterations times, and times every call.
+    Allocations are measured in the separate run, since tracemalloc slows the calls down, and only on Python 3.9+.
+    """
+    for _ in range(warmup):
+        function()
+
+    timings = []
+    gc_was_enabled = gc.isenabled()
+    gc.disable()    # collections of the previous cases must not land in the percentiles of that one
+
+    try:
+        started_at = time.perf_counter()
+
+        while len(timings) < min_iterations or time.perf_counter() - started_at < min_time:
+            call_started_at = time.perf_counter_ns()
+            function()
+            timings.append(time.perf_counter_ns() - call_started_at)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    timings.sort()
+    return Measurement(
+        ops_per_sec=1e9 / statistics.mean(timings),
+        p50_us=_percentile(timings, 50) / 1000,
+        p90_us=_percentile(timings, 90) / 1000,
+        p99_us=_percentile(timings, 99) / 1000,
+        peak_alloc_bytes=measure_allocations(function, min(min_iterations, 20)),
+    )
+
+
+def save_baseline(path: str, results: dict):
+    with open(path, 'w') as baseline_file:
+        json.dump({name: measurement._asdict() for name, measurement in results.items()}, baseline_file, indent=4)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as baseline_file:
+        return {name: Measurement(**values) for name, values in json.load(baseline_file).items()}
+
+
+def find_regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """ Returns (name, current, baseline) of the cases whose throughput fell by more than the threshold """
+    return [
+        (name, measurement, baseline[name])
+        for name, measurement in results.items()
+        if name in baseline and measurement.ops_per_sec < baseline[name].ops_per_sec * (1 - threshold)
+    ]
+
+
+__all__ = [
+    'CAN_MEASURE_ALLOCATIONS',
+    'Measurement',
+    'find_regressions',
+    'load_baseline',
+    'measure',
+    'measure_allocations',
+    'save_baseline',
+]
@@ -0,0 +1,191 @@
+"""
+That benchmark measures what django-heaven costs compared to the raw Django: log_response_as_info/error
+of the response mixins for different payload sizes, and the ServiceFunctionDecorator of the service
+functions compared to the direct ORM calls. It uses the in-memory sqlite database and makes no network calls.
+Run it from the root of the repository:
+
+    python benchmarks/overhead.py [--suite all|responses|services] [--min-time 0.5] [--filter json]
+    python benchmarks/overhead.py --save-baseline             # remember the results in benchmarks/baseline.json
+    python benchmarks/overhead.py --check --threshold 0.15    # exit code 1 if some case is 15% slower
+
+Baselines are only comparable on the same machine, so do not commit them.
+"""
+import argparse
+import itertools
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_heaven.settings')
+
+from django.conf import settings  # noqa: E402
+
+settings.DATABASES['default']['NAME'] = ':memory:'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.response import Response  # noqa: E402
+
+from measure import find_regressions, load_baseline, measure, save_baseline  # noqa: E402
+from responses.http import LoggedHttpResponseMixin  # noqa: E402
+from responses.json import LoggedJsonResponseMixin  # noqa: E402
+from responses.redirect import LoggedRedirectResponseMixin  # noqa: E402
+from responses.rest_framework import LoggedRESTResponseMixin  # noqa: E402
+from services.base import BaseService  # noqa: E402
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PAYLOAD_SIZES = {"small": 1, "medium": 100, "large": 1000}
+
+
+class UserBenchmarkService(BaseService):
+    model = get_user_model()
+
+
+def silence_loggers():
+    """ Log records are still created, but they are not written, so we measure our code instead of the console """
+    for component in ('RESPONSES', 'SERVICES'):
+        logger_obj = settings.DJANGO_HEAVEN[component]['LOGGER_OBJ']
+        logger_obj.handlers = [logging.NullHandler()]
+        logger_obj.propagate = False
+
+
+def build_rows(rows: int) -> list:
+    return [
+        {"id": index, "username": f"user-{index}", "is_active": index % 2 == 0, "tags": ["first", "second"]}
+        for index in range(rows)
+    ]
+
+
+def render_rest_response(response: Response) -> Response:
+    """ Does what APIView.finalize_response() and the handler do with the response """
+    response.accepted_renderer = JSONRenderer()
+    response.accepted_media_type = 'application/json'
+    response.renderer_context = {}
+    return response.render()
+
+
+def response_cases() -> dict:
+    json_view, http_view = LoggedJsonResponseMixin(), LoggedHttpResponseMixin()
+    redirect_view, rest_view = LoggedRedirectResponseMixin(), LoggedRESTResponseMixin()
+    cases = {
+        "redirect/raw": lambda: HttpResponseRedirect('/next/'),
+        # Redirects are proxied, as in the views: the mixin cannot create them from the url yet
+        "redirect/info": lambda: redirect_view.log_response_as_info(
+            data=HttpResponseRedirect('/next/'), log_message="Redirected", redirect_code=302,
+        ),
+        "redirect/error": lambda: redirect_view.log_response_as_error(
+            data=HttpResponseRedirect('/next/'), log_message="Redirected", redirect_code=302,
+        ),
+    }
+
+    for size_name, rows in PAYLOAD_SIZES.items():
+        data = build_rows(rows)
+        content = repr(data)
+
+        cases.update({
+            f"json/{size_name}/raw": lambda data=data: JsonResponse({"detail": data}),
+            f"json/{size_name}/info": lambda data=data: json_view.log_response_as_info(
+                data=data, log_message="Rows are returned", status_code=200,
+            ),
+            f"json/{size_name}/error": lambda data=data: json_view.log_response_as_error(
+                data=data, log_message="Rows are not returned", status_code=400,
+            ),
+            f"http/{size_name}/raw": lambda content=content: HttpResponse(content),
+            f"http/{size_name}/info": lambda content=content: http_view.log_response_as_info(
+                data=HttpResponse(content), log_message="Rows are returned",
+            ),
+            f"http/{size_name}/error": lambda content=content: http_view.log_response_as_error(
+                data=HttpResponse(content), log_message="Rows are not returned",
+            ),
+            f"rest/{size_name}/raw": lambda data=data: render_rest_response(Response({"detail": data})),
+            f"rest/{size_name}/info": lambda data=data: render_rest_response(rest_view.log_response_as_info(
+                data=data, log_message="Rows are returned", status_code=200,
+            )),
+            f"rest/{size_name}/error": lambda data=data: render_rest_response(rest_view.log_response_as_error(
+                data=data, log_message="Rows are not returned", status_code=400,
+            )),
+        })
+
+    return cases
+
+
+def service_cases() -> dict:
+    call_command('migrate', verbosity=0)
+    model = UserBenchmarkService.model
+    model.objects.bulk_create([model(username=f"user-{index}") for index in range(1000)])
+
+    pk = model.objects.order_by('pk').values_list('pk', flat=True)[500]
+    counter = itertools.count()
+
+    def usernames(count: int) -> list:
+        return [model(username=f"created-{next(counter)}") for _ in range(count)]
+
+    return {
+        "service/get/raw": lambda: model.objects.get(pk=pk),
+        "service/get/heaven": lambda: UserBenchmarkService().get(pk=pk, info_message="User is found").result,
+        "service/filter/raw": lambda: list(model.objects.filter(is_active=True)[:50]),
+        "service/filter/heaven": lambda: list(
+            UserBenchmarkService().filter(is_active=True, info_message="Users are found").result[:50],
+        ),
+        "service/create/raw": lambda: model.objects.create(username=f"created-{next(counter)}"),
+        "service/create/heaven": lambda: UserBenchmarkService().create(
+            username=f"created-{next(counter)}", info_message="User is created",
+        ).result,
+        "service/bulk_create/raw": lambda: model.objects.bulk_create(usernames(100)),
+        "service/bulk_create/heaven": lambda: UserBenchmarkService().bulk_create(
+            instances=usernames(100), info_message="Users are created",
+        ).result,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', choices=('all', 'responses', 'services'), default='all')
+    parser.add_argument('--filter', default='', help="run only the cases whose names contain that string")
+    parser.add_argument('--min-time', type=float, default=0.5, help="seconds per case")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--check', action='store_true', help="compare the results with the baseline")
+    parser.add_argument('--threshold', type=float, default=0.15, help="allowed fall of ops/s, 0.15 is 15%%")
+    arguments = parser.parse_args()
+
+    silence_loggers()
+    cases = {}
+
+    if arguments.suite in ('all', 'responses'):
+        cases.update(response_cases())
+    if arguments.suite in ('all', 'services'):
+        cases.update(service_cases())
+
+    results = {}
+    for name, function in cases.items():
+        if arguments.filter in name:
+            results[name] = measure(function, min_time=arguments.min_time)
+            print(f"{name:<28} {results[name].format()}")
+
+    if arguments.save_baseline:
+        save_baseline(arguments.baseline, results)
+        print(f"Baseline is saved to {arguments.baseline}")
+
+    if arguments.check:
+        regressions = find_regressions(results, load_baseline(arguments.baseline), arguments.threshold)
+
+        for name, current, baseline in regressions:
+            print(f"REGRESSION {name}: {current.ops_per_sec:.1f} ops/s, baseline {baseline.ops_per_sec:.1f} ops/s")
+
+        if regressions:
+            sys.exit(1)
+
+        print(f"No regressions larger than {arguments.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+That file contains the log sampling and error de-duplication of the services and responses.
+Under the high load one info line for every response or service function may be the most of your logs.
+    - LOG_SAMPLE_RATE: log only that part of the info messages, e.g. 0.01 logs 1% of them
+    - LOG_FIRST_N: log only the first N info messages of every LOG_SAMPLE_INTERVAL seconds
+    - ERROR_DEDUP_WINDOW: log the same error message once in that many seconds, the next message
+        of the view or service reports how many times it was repeated
+Put them into settings.DJANGO_HEAVEN.SERVICES or RESPONSES, or reassign the class attributes with the same
+names in lowercase on your services and response mixins. All of them are turned off by default.
+The file does not import the services or the responses, so each of them works without the other one.
+"""
+import random
+import threading
+import time
+
+_MAX_DEDUP_MESSAGES = 1024
+
+
+class LogSampler:
+    """ Decides whether the info message is logged, every class has its own sampler """
+
+    def __init__(self, rate: float = None, first_n: int = None, interval: float = 1):
+        self.rate = rate
+        self.first_n = first_n
+        self.interval = interval
+
+        self._interval_started_at = time.monotonic()
+        self._interval_count = 0
+        self._lock = threading.Lock()
+
+    def should_log(self) -> bool:
+        if self.first_n is not None:
+            with self._lock:
+                now = time.monotonic()
+
+                if now - self._interval_started_at >= self.interval:
+                    self._interval_started_at, self._interval_count = now, 0
+
+                self._interval_count += 1
+                if self._interval_count > self.first_n:
+                    return False
+
+        return self.rate is None or random.random() < self.rate
+
+
+class ErrorDeduplicator:
+    """
+    Suppresses the repeated error messages during the window. When the window of the message is over,
+    the next error returns the summary of it: "<message> (repeated N times in the last W seconds)".
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._messages = {}     # message -> [time of the first message, number of the suppressed ones]
+        self._lock = threading.Lock()
+
+    def messages(self, message: str) -> list:
+        """ Returns the messages that must be logged instead of that one """
+        now = time.monotonic()
+        result = []
+
+        with self._lock:
+            for seen_message, (seen_at, repeated) in list(self._messages.items()):
+                if now - seen_at >= self.window:
+                    del self._messages[seen_message]
+
+                    if repeated:
+                        result.append(f"{seen_message} (repeated {repeated} times in the last {self.window} seconds)")
+
+            if message in self._messages:
+                self._messages[message][1] += 1
+            elif len(self._messages) < _MAX_DEDUP_MESSAGES:
+                self._messages[message] = [now, 0]
+                result.append(message)
+            else:   # we do not remember more messages, so we cannot suppress them either
+                result.append(message)
+
+        return result
+
+
+class LogPolicy:
+    """ Sampler and de-duplicator of one class """
+
+    def __init__(
+        self, sample_rate: float = None, first_n: int = None, interval: float = 1, dedup_window: float = None,
+    ):
+        self.sampler = None if sample_rate is None and first_n is None else LogSampler(sample_rate, first_n, interval)
+        self.deduplicator = None if dedup_window is None else ErrorDeduplicator(dedup_window)
+
+    def should_log_info(self) -> bool:
+        return self.sampler is None or self.sampler.should_log()
+
+    def error_messages(self, message: str) -> list:
+        return [message] if self.deduplicator is None else self.deduplicator.messages(message)
+
+
+_policies = {}
+_policies_lock = threading.Lock()
+
+
+def get_log_policy(owner) -> LogPolicy:
+    """
+    Returns the LogPolicy() of the class of the owner. Owner has log_sample_rate, log_first_n,
+    log_sample_interval and error_dedup_window attributes.
+    """
+    owner_class = owner if isinstance(owner, type) else owner.__class__
+    arguments = (owner.log_sample_rate, owner.log_first_n, owner.log_sample_interval, owner.error_dedup_window)
+    key = (owner_class, arguments)
+
+    try:
+        return _policies[key]
+    except KeyError:
+        with _policies_lock:
+            return _policies.setdefault(key, LogPolicy(*arguments))
+
+
+__all__ = [
+    'ErrorDeduplicator',
+    'LogPolicy',
+    'LogSampler',
+    'get_log_policy',
+]
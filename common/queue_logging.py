@@ -0,0 +1,235 @@
+"""
+That file contains the non-blocking log pipeline of the django-heaven.
+Set ASYNC_LOGGING to True in settings.DJANGO_HEAVEN.SERVICES or settings.DJANGO_HEAVEN.RESPONSES and
+LOGGER_OBJ of that part is wrapped into QueueLogger(). It creates the log record in the calling thread,
+so the record keeps its module, line and thread, and puts it into the bounded queue. The background
+thread takes the records from the queue in batches, so it wakes up once per batch, but the handlers of
+the real logger still receive the records one by one with logger.handle().
+
+If the queue is full, we drop the record instead of waiting, count it, and log how many records were dropped
+with the next batch. The queue is flushed when the process exits.
+    - LOG_QUEUE_SIZE: how many records may wait in the queue, 10000 by default
+    - LOG_BATCH_SIZE: how many records the background thread takes at once, 100 by default
+All the queue loggers share one pipeline, so both are read from settings.DJANGO_HEAVEN.SERVICES,
+or from RESPONSES if you only use the responses. We read them when the pipeline starts.
+The file does not import the services or the responses, so each of them works without the other one.
+"""
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+import traceback
+
+from django.conf import settings
+
+
+_STOP = object()
+
+
+def _pipeline_setting(name: str, default: int) -> int:
+    heaven_settings = getattr(settings, 'DJANGO_HEAVEN', {})
+
+    for component in ('SERVICES', 'RESPONSES'):
+        value = heaven_settings.get(component, {}).get(name)
+
+        if value is not None:
+            return value
+
+    return default
+
+
+class LogPipeline:
+    """ Bounded queue of the log records and the background thread that handles them """
+
+    def __init__(self, queue_size: int = None, batch_size: int = None):
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.dropped = 0
+
+        self._reported_dropped = 0
+        self._last_logger = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads do not survive fork(), so the worker processes of the preloaded application start their own
+        if self._pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._pid != os.getpid():
+                if self.queue_size is None:
+                    self.queue_size = _pipeline_setting('LOG_QUEUE_SIZE', 10000)
+                if self.batch_size is None:
+                    self.batch_size = _pipeline_setting('LOG_BATCH_SIZE', 100)
+
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._work, args=(self._queue,), daemon=True)
+                self._thread.name = 'django-heaven-logging'
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def put(self, logger: logging.Logger, record: logging.LogRecord):
+        """ Puts the record into the queue without waiting, the record is dropped if the queue is full """
+        self._ensure_started()
+
+        try:
+            self._queue.put_nowait((logger, record))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _work(self, records_queue: queue.Queue):
+        while True:
+            batch = [records_queue.get()]
+
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(records_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for item in batch:
+                if item is not _STOP:
+                    self._handle(*item)
+
+            self._report_dropped(batch)
+
+            for _ in batch:
+                records_queue.task_done()
+
+            if _STOP in batch:
+                return
+
+    def _handle(self, logger: logging.Logger, record: logging.LogRecord):
+        try:
+            logger.handle(record)
+        except Exception:   # handlers report their own errors, that is the last resort for the broken ones
+            logging.lastResort.handle(record)
+
+    def _report_dropped(self, batch: list):
+        with self._lock:
+            dropped = self.dropped - self._reported_dropped
+            self._reported_dropped = self.dropped
+
+        for item in batch:
+            if item is not _STOP:
+                self._last_logger = item[0]
+
+        if dropped and self._last_logger is not None:
+            self._last_logger.warning(f"{dropped} log records were dropped, because the log queue was full")
+
+    def flush(self, timeout: float = None) -> bool:
+        """ Waits until the background thread handles all the queued records. Returns False on timeout """
+        if self._pid != os.getpid():
+            return True
+
+        with self._queue.all_tasks_done:
+            return self._queue.all_tasks_done.wait_for(lambda: not self._queue.unfinished_tasks, timeout)
+
+    def stop(self, timeout: float = 5):
+        """ Handles the queued records and stops the background thread """
+        if self._pid != os.getpid():
+            return
+
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+
+        self._thread.join(timeout)
+        self._pid = None
+
+
+log_pipeline = LogPipeline()
+atexit.register(log_pipeline.stop)
+
+
+class QueueLogger:
+    """ Logger that hands the records to the LogPipeline() instead of calling the handlers """
+
+    def __init__(self, logger, pipeline: LogPipeline = log_pipeline):
+        self.logger = logging.getLogger() if logger is logging else logger  # logging module uses the root logger
+        self.pipeline = pipeline
+
+    def isEnabledFor(self, level: int) -> bool:
+        return self.logger.isEnabledFor(level)
+
+    def log(self, level: int, msg, *args, exc_info=None, extra=None, stack_info=False):
+        if not self.logger.isEnabledFor(level):
+            return
+
+        fn, lno, func, sinfo = _find_caller(stack_info)
+
+        if exc_info and not isinstance(exc_info, tuple):
+            exc_info = (type(exc_info), exc_info, exc_info.__traceback__) \
+                if isinstance(exc_info, BaseException) else sys.exc_info()
+
+        record = self.logger.makeRecord(self.logger.name, level, fn, lno, msg, args, exc_info, func, extra, sinfo)
+        self.pipeline.put(self.logger, record)
+
+    def debug(self, msg, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def exception(self, msg, *args, exc_info=True, **kwargs):
+        self.log(logging.ERROR, msg, *args, exc_info=exc_info, **kwargs)
+
+    def critical(self, msg, *args, **kwargs):
+        self.log(logging.CRITICAL, msg, *args, **kwargs)
+
+    def __repr__(self):
+        return f"<QueueLogger {self.logger.name}>"
+
+
+def _find_caller(stack_info: bool = False) -> tuple:
+    """ logging.Logger.findCaller() that skips the frames of that file too """
+    frame = sys._getframe(1)
+
+    while frame.f_back is not None and frame.f_code.co_filename == _find_caller.__code__.co_filename:
+        frame = frame.f_back
+
+    sinfo = None
+    if stack_info:
+        sinfo = "Stack (most recent call last):\n" + "".join(traceback.format_stack(frame)).rstrip("\n")
+
+    return frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name, sinfo
+
+
+_queue_loggers = {}
+
+
+def configured_logger(component_settings: dict):
+    """
+    Returns LOGGER_OBJ of the settings.DJANGO_HEAVEN.SERVICES or RESPONSES dictionary,
+    wrapped into the QueueLogger() if ASYNC_LOGGING is True. The same logger is wrapped only once.
+    """
+    logger_obj = component_settings.get('LOGGER_OBJ')
+
+    if not component_settings.get('ASYNC_LOGGING', False) or logger_obj is None:
+        return logger_obj
+
+    try:
+        return _queue_loggers[id(logger_obj)]
+    except KeyError:
+        return _queue_loggers.setdefault(id(logger_obj), QueueLogger(logger_obj))
+
+
+__all__ = [
+    'LogPipeline',
+    'QueueLogger',
+    'configured_logger',
+    'log_pipeline',
+]
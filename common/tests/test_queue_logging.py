@@ -0,0 +1,103 @@
+import logging
+import sys
+import threading
+
+from django.test import SimpleTestCase
+
+from common.queue_logging import LogPipeline, QueueLogger
+
+
+class ListHandler(logging.Handler):
+    """ Keeps the handled records, the first record may block the background thread until it is released """
+
+    def __init__(self, block_first: bool = False):
+        super(ListHandler, self).__init__()
+        self.records = []
+        self.started = threading.Event()
+        self.released = threading.Event()
+
+        if not block_first:
+            self.released.set()
+
+    def emit(self, record: logging.LogRecord):
+        self.started.set()
+        self.released.wait(5)
+        self.records.append(record)
+
+
+class LogPipelineTest(SimpleTestCase):
+    """ That is the tests for the bounded log queue and the QueueLogger """
+
+    def _logger(self, handler: logging.Handler) -> logging.Logger:
+        logger = logging.getLogger(f"django_heaven.tests.{self._testMethodName}")
+        logger.setLevel(logging.DEBUG)
+        logger.propagate = False
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def _pipeline(self, **kwargs) -> LogPipeline:
+        pipeline = LogPipeline(**kwargs)
+        self.addCleanup(pipeline.stop)
+        return pipeline
+
+    def test_full_queue_drops_and_reports_the_records(self):
+        handler = ListHandler(block_first=True)
+        queue_logger = QueueLogger(self._logger(handler), pipeline=self._pipeline(queue_size=1, batch_size=10))
+
+        queue_logger.info("first")
+        handler.started.wait(5)     # the background thread is busy with the first record now
+
+        for message in ("second", "third", "fourth"):
+            queue_logger.info(message)
+
+        self.assertEqual(queue_logger.pipeline.dropped, 2)
+        handler.released.set()
+        self.assertTrue(queue_logger.pipeline.flush(timeout=5))
+
+        self.assertEqual(
+            [record.getMessage() for record in handler.records],
+            # Records are dropped while the first batch is handled, so we report them after it
+            ["first", "2 log records were dropped, because the log queue was full", "second"],
+        )
+        self.assertEqual(handler.records[1].levelno, logging.WARNING)
+
+    def test_flush_and_stop_handle_all_the_queued_records(self):
+        handler = ListHandler()
+        pipeline = self._pipeline(queue_size=100, batch_size=7)
+        queue_logger = QueueLogger(self._logger(handler), pipeline=pipeline)
+
+        for index in range(50):
+            queue_logger.info("record %s", index)
+
+        self.assertTrue(pipeline.flush(timeout=5))
+        self.assertEqual(len(handler.records), 50)
+
+        for index in range(50, 60):
+            queue_logger.info("record %s", index)
+
+        thread = pipeline._thread
+        pipeline.stop()
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([record.getMessage() for record in handler.records], [f"record {i}" for i in range(60)])
+
+    def test_records_keep_the_exception_and_the_caller(self):
+        handler = ListHandler()
+        queue_logger = QueueLogger(self._logger(handler), pipeline=self._pipeline())
+
+        try:
+            raise ValueError("Test exception")
+        except ValueError:
+            line = sys._getframe().f_lineno + 1
+            queue_logger.exception("Test log message")
+
+        queue_logger.pipeline.flush(timeout=5)
+        record, = handler.records
+
+        self.assertIs(record.exc_info[0], ValueError)
+        self.assertEqual(str(record.exc_info[1]), "Test exception")
+        self.assertEqual(record.pathname, __file__)
+        self.assertEqual(record.lineno, line)
+        self.assertEqual(record.funcName, "test_records_keep_the_exception_and_the_caller")
+        self.assertEqual(record.thread, threading.get_ident())
@@ -82,7 +82,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Services tests read from that replica alias, see services/tests/test_replicas.py
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+    },
 }
 
 
@@ -173,6 +178,7 @@ DJANGO_HEAVEN = {
         "DEFAULT_RESPONSE_VERB": "detail",
         "LOGGER_OBJ": logging.getLogger(TEST_LOGGER_NAME),
         "RAW_TYPES": (int, str, bytes, list, dict),
+        "PROXY_VALIDATION": "full",
     },
     "SERVICES": {
         "LOGGER_OBJ": logging.getLogger(TEST_LOGGER_NAME),
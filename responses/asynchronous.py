@@ -0,0 +1,78 @@
+"""
+That file contains the helpers of the async responses.
+Django 4.2 and newer consume async iterators of the StreamingHttpResponse() in the event loop of the ASGI
+server, so async streams are served without thread hops. Older versions accept only sync iterators,
+so there we can only run the async iterator in one background event loop and wait for its items.
+The ASGI handler of these versions reads the sync iterator in its event loop, so the waiting blocks the server.
+That is why the async streaming raises ResponseProgrammingException before Django 4.2, unless you set
+settings.DJANGO_HEAVEN.RESPONSES.ASYNC_STREAMING_BRIDGE to True, e.g. if you serve the async views with WSGI.
+"""
+import asyncio
+import threading
+
+import django
+from django.conf import settings
+
+from responses.exceptions import ResponseProgrammingException
+
+
+_bridge_loop = None
+_bridge_lock = threading.Lock()
+
+
+def supports_async_streaming() -> bool:
+    """ StreamingHttpResponse() accepts async iterators since Django 4.2 """
+    return django.VERSION >= (4, 2)
+
+
+def get_bridge_loop() -> asyncio.AbstractEventLoop:
+    """ Returns the background event loop that runs async iterators for the old Django versions """
+    global _bridge_loop
+
+    with _bridge_lock:
+        if _bridge_loop is None:
+            _bridge_loop = asyncio.new_event_loop()
+            threading.Thread(target=_bridge_loop.run_forever, name='django-heaven-streaming', daemon=True).start()
+
+    return _bridge_loop
+
+
+def iterate_in_bridge_loop(async_iterable):
+    """ Sync iterator over the async iterable, items are produced in the bridge loop """
+    loop = get_bridge_loop()
+    iterator = async_iterable.__aiter__()
+
+    while True:
+        try:
+            yield asyncio.run_coroutine_threadsafe(iterator.__anext__(), loop).result()
+        except StopAsyncIteration:
+            return
+
+
+async def iterate_async(iterable):
+    """ Async iterator over the sync iterable that does not make database queries, e.g. a list """
+    for item in iterable:
+        yield item
+
+
+def streaming_content(async_iterable):
+    """ Returns the content for the StreamingHttpResponse() that the current Django version accepts """
+    if supports_async_streaming():
+        return async_iterable
+    elif not settings.DJANGO_HEAVEN['RESPONSES'].get('ASYNC_STREAMING_BRIDGE', False):
+        raise ResponseProgrammingException(
+            f"Async streaming responses need Django 4.2 or newer, you have {django.get_version()}. "
+            f"Use the sync log_response_as_info() or set DJANGO_HEAVEN.RESPONSES.ASYNC_STREAMING_BRIDGE "
+            f"to True if blocking the event loop of the server while the rows are read is fine for you",
+        )
+
+    return iterate_in_bridge_loop(async_iterable)
+
+
+__all__ = [
+    'get_bridge_loop',
+    'iterate_async',
+    'iterate_in_bridge_loop',
+    'streaming_content',
+    'supports_async_streaming',
+]
@@ -1,5 +1,15 @@
 """ That file contains base classes for the formatted Responses """
+import calendar
+import datetime
+import inspect
+
 from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from common.log_sampling import get_log_policy
+from common.queue_logging import configured_logger
+from responses.envelopes import get_response_verb
 
 
 RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
@@ -12,19 +22,33 @@ class BaseLoggedResponseMixin:
     settings.DJANGO_HEAVEN.RESPONSES.RAW_TYPES, then we convert it to a dictionary, or using
     self.data_conversion_function().
     """
-    logger_obj = RESPONSES_SETTINGS['LOGGER_OBJ']
+    logger_obj = configured_logger(RESPONSES_SETTINGS)
     raw_types = RESPONSES_SETTINGS['RAW_TYPES']
     response_type = None
 
+    # Sampling of the info messages and de-duplication of the error messages, see common.log_sampling
+    log_sample_rate: float = RESPONSES_SETTINGS.get('LOG_SAMPLE_RATE')
+    log_first_n: int = RESPONSES_SETTINGS.get('LOG_FIRST_N')
+    log_sample_interval: float = RESPONSES_SETTINGS.get('LOG_SAMPLE_INTERVAL', 1)
+    error_dedup_window: float = RESPONSES_SETTINGS.get('ERROR_DEDUP_WINDOW')
+
     def data_conversion_function(self, data, **kwargs):
         """
         That function accepts the raw data from the self._log_response() and uses it
         to convert it to a similar structured responses.
+        If the data is a keyset page from the services (services.pagination.KeysetPage), we add
+        next_cursor and prev_cursor next to the data.
         """
-        return {
-            RESPONSES_SETTINGS['DEFAULT_RESPONSE_VERB']: data,
+        response = {
+            get_response_verb(): data,
         }
 
+        cursors = getattr(data, 'cursors', None)
+        if cursors is not None:
+            response.update(cursors)
+
+        return response
+
     def _log_response(self, log_function: callable, data, log_message: str, **kwargs):
         """
         That function is used to log the response and return your converted data.
@@ -46,6 +70,16 @@ class BaseLoggedResponseMixin:
 
         return data
 
+    def _log_info(self, log_message: str):
+        """ Logs the info message if the sampling of that class allows it """
+        if get_log_policy(self).should_log_info():
+            self.logger_obj.info(log_message)
+
+    def _log_error(self, log_message: str):
+        """ Logs the error message, repeated messages are de-duplicated if error_dedup_window is set """
+        for message in get_log_policy(self).error_messages(log_message):
+            self.logger_obj.error(message)
+
     def log_response_as_info(self, data, log_message: str, **kwargs):
         """
         That function helps you to log the response as an informational message.
@@ -53,7 +87,7 @@ class BaseLoggedResponseMixin:
         """
         return self._log_response(
             data=data,
-            log_function=self.logger_obj.info,
+            log_function=self._log_info,
             log_message=log_message,
             **kwargs,
         )
@@ -65,11 +99,33 @@ class BaseLoggedResponseMixin:
         """
         return self._log_response(
             data=data,
-            log_function=self.logger_obj.error,
+            log_function=self._log_error,
             log_message=log_message,
             **kwargs,
         )
 
+    async def _resolve_async_data(self, data):
+        """ Awaits the awaitable data, services with the querysets are evaluated in the service executor """
+        if inspect.isawaitable(data):
+            data = await data
+
+        if hasattr(data, 'aresult'):
+            data = await data.aresult()
+
+        return data
+
+    async def alog_response_as_info(self, data, log_message: str, **kwargs):
+        """
+        Async version of the log_response_as_info() for the async views, it accepts the same arguments.
+        data may be awaitable, e.g. the coroutine of the async service function.
+        Turn on ASYNC_LOGGING, so that the logging does not block the event loop.
+        """
+        return self.log_response_as_info(data=await self._resolve_async_data(data), log_message=log_message, **kwargs)
+
+    async def alog_response_as_error(self, data, log_message: str, **kwargs):
+        """ Async version of the log_response_as_error(), see alog_response_as_info() """
+        return self.log_response_as_error(data=await self._resolve_async_data(data), log_message=log_message, **kwargs)
+
     def proxy_response_validation(self, data, status_code: int, **kwargs):
         """ That function works as the additional validation for the response from the outer code. """
 
@@ -80,15 +136,60 @@ class BaseLoggedResponseMixin:
         That is the function that helps you to log your response either creating the
         response from the data provided or act as a proxy depending on
         the self.response_base_type variable.
+
+        Provide cheap validators of the data in order to answer the conditional GET requests:
+            - etag: string or function that returns it, e.g. the hash of the content or the version of the rows
+            - last_modified: datetime or timestamp, or function that returns it
+            - request: the request, self.request of the view by default
+        If If-None-Match or If-Modified-Since headers match, we log the message and return
+        304 Not Modified without converting and encoding the data. BaseService.conditional_validators()
+        computes both validators with one query.
         """
+        etag, last_modified = self._evaluate_validators(kwargs)
+
+        if etag is not None or last_modified is not None:
+            request = kwargs.get('request') or getattr(self, 'request', None)
+            conditional_response = None if request is None else get_conditional_response(
+                request, etag=etag, last_modified=last_modified,
+            )
+
+            if conditional_response is not None:
+                log_function(data=None, log_message=log_message, **kwargs)  # None is never converted
+                # 304 must have the validators of the 200 response, RFC 7232 section 4.1
+                return self._set_validator_headers(conditional_response, etag, last_modified)
+
         result_data = log_function(data=data, log_message=log_message, **kwargs)
 
         if isinstance(data, self.response_type):
             self.proxy_response_validation(data, status_code, **kwargs)
-            return data
+            return self._set_validator_headers(data, etag, last_modified)
+
+        response = self.create_response(result_data, status_code, **kwargs)
+        return self._set_validator_headers(response, etag, last_modified)
+
+    def _evaluate_validators(self, kwargs: dict) -> tuple:
+        """ Returns the quoted etag and the last_modified timestamp from the arguments of the response """
+        etag, last_modified = kwargs.get('etag'), kwargs.get('last_modified')
+        etag = etag() if callable(etag) else etag
+        last_modified = last_modified() if callable(last_modified) else last_modified
+
+        if isinstance(last_modified, datetime.datetime):
+            last_modified = calendar.timegm(last_modified.utctimetuple())
+
+        return None if etag is None else quote_etag(str(etag)), last_modified
+
+    def _set_validator_headers(self, response, etag: str = None, last_modified: int = None):
+        if etag is not None and not response.has_header('ETag'):
+            response['ETag'] = etag
+        if last_modified is not None and not response.has_header('Last-Modified'):
+            response['Last-Modified'] = http_date(last_modified)
+
+        return response
 
+    def create_response(self, data, status_code: int, **kwargs):
+        """ Creates the response from the converted data, reassign it if your response is created differently """
         return self.response_type(
-            data=result_data, status=status_code, **(kwargs.get('response_kwargs') or {}),
+            data=data, status=status_code, **(kwargs.get('response_kwargs') or {}),
         )
 
 
@@ -0,0 +1,274 @@
+"""
+That file contains the cache of the encoded responses. We store the final bytes of the response,
+so the hit costs one cache request and no conversion or encoding at all.
+Keys are built from the path, selected query parameters, selected headers and the data versions of
+cache_models, that services bump on every write (see services.versions), so writes make
+the cached responses stale immediately. Put the mixin before the response mixin:
+
+    class UsersView(CachedResponseMixin, LoggedJsonResponseMixin, View):
+        cache_timeout = 300
+        cache_models = (User,)
+        cache_query_params = ("page",)
+
+        def get(self, request):
+            return self.log_response_as_info(
+                data=lambda: list(UserService().all(info_message="Users are requested").values()),
+                log_message="Users are returned",
+                status_code=200,
+            )
+
+data may be a function, so we query the database only when the response is regenerated.
+alog_response_as_info() and alog_response_as_error() of the async views call it in the service executor,
+and they wait for the concurrent regeneration without blocking the event loop.
+
+Cached responses must be the same for everybody who sends the same key. We never use the cache for the requests
+with the Authorization header, do not store the responses that read the session (e.g. request.user),
+and the ones whose Vary header names the request headers that are not in cache_headers.
+Add 'Authorization' or 'Cookie' to cache_headers if you really want to cache per user.
+"""
+import asyncio
+import hashlib
+import inspect
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from responses.compression import CompressedResponseMixin
+from services.asynchronous import run_in_service_executor
+from services.versions import get_model_versions, track_model_versions
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+
+
+class CachedResponseMixin:
+    """
+    Caches the responses of the logged response mixins, e.g. LoggedJsonResponseMixin or LoggedRESTResponseMixin.
+    Only one request regenerates the missing response, the concurrent ones wait for it up to
+    cache_wait_timeout seconds instead of querying the database at the same time.
+    REST framework responses are stored after they are rendered, so every Accept header gets its own entry.
+    With CompressedResponseMixin we store the compressed bytes for every negotiated encoding.
+    """
+    cache_timeout: int = RESPONSES_SETTINGS.get('CACHE_TIMEOUT', 60)
+    cache_alias: str = RESPONSES_SETTINGS.get('CACHE_ALIAS', 'default')
+    cache_key_prefix: str = RESPONSES_SETTINGS.get('CACHE_KEY_PREFIX', 'django_heaven:response')
+
+    cache_models: tuple = ()    # versions of these models are a part of the key
+    cache_query_params: tuple = None    # None means all the query parameters
+    cache_headers: tuple = ('Accept', 'Accept-Language')
+    cache_methods: tuple = ('GET', 'HEAD')
+    cache_status_codes: tuple = (200,)
+
+    cache_lock_timeout: float = RESPONSES_SETTINGS.get('CACHE_LOCK_TIMEOUT', 10)
+    cache_wait_timeout: float = RESPONSES_SETTINGS.get('CACHE_WAIT_TIMEOUT', 5)
+    cache_poll_interval: float = 0.05
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        track_model_versions(*cls.cache_models)   # services bump the versions of these models only
+
+    @property
+    def response_cache(self):
+        return caches[self.cache_alias]
+
+    def get_cache_key(self, request) -> str:
+        """ Creates the key of the response, we hash it so that it fits into memcached key limits """
+        if self.cache_query_params is None:
+            query = sorted(request.GET.lists())
+        else:
+            query = [(param, request.GET.getlist(param)) for param in self.cache_query_params]
+
+        key_parts = (
+            request.path,
+            query,
+            [request.headers.get(header) for header in self.cache_headers],
+            get_model_versions(*self.cache_models),
+            self.negotiate_encoding(request) if isinstance(self, CompressedResponseMixin) else None,
+        )
+        key_hash = hashlib.md5(repr(key_parts).encode()).hexdigest()
+        return f"{self.cache_key_prefix}:{self.__class__.__name__}:{key_hash}"
+
+    def _keyed_headers(self) -> set:
+        """ Lowercase names of the request headers that the key is built from """
+        headers = {header.lower() for header in self.cache_headers}
+
+        if isinstance(self, CompressedResponseMixin):
+            headers.add('accept-encoding')  # the key has the negotiated encoding
+
+        return headers
+
+    def _is_private_request(self, request) -> bool:
+        """ Responses to the requests with credentials may contain the data of that user """
+        return 'Authorization' in request.headers and 'authorization' not in self._keyed_headers()
+
+    def _is_cacheable(self, request, response) -> bool:
+        vary_headers = {header.strip().lower() for header in response.get('Vary', '').split(',') if header.strip()}
+        session = getattr(request, 'session', None)
+
+        return (
+            response.status_code in self.cache_status_codes
+            and not getattr(response, 'streaming', False)
+            and not response.cookies
+            and '*' not in vary_headers
+            and vary_headers <= self._keyed_headers()
+            # SessionMiddleware adds 'Vary: Cookie' after the view, so we check what it checks
+            and (session is None or not session.accessed or 'cookie' in self._keyed_headers())
+        )
+
+    def _cached_entry(self, response) -> tuple:
+        return response.status_code, list(response.items()), response.content
+
+    def _store_response(self, request, key: str, lock_key: str, response, timeout: int):
+        if self._is_cacheable(request, response):
+            self.response_cache.set(key, self._cached_entry(response), timeout=timeout)
+
+        self.response_cache.delete(lock_key)
+        return response
+
+    def _response_from_entry(self, request, entry: tuple):
+        status_code, headers, content = entry
+        response = HttpResponse(content, status=status_code)
+
+        for header, value in headers:
+            response[header] = value
+
+        return get_conditional_response(request, etag=response.get('ETag'), response=response)
+
+    def _poll_entry(self, key: str) -> tuple:
+        """ Returns (entry, is_regenerated): the entry is None while another request regenerates it """
+        entry = self.response_cache.get(key)
+        return entry, entry is None and self.response_cache.has_key(f"{key}:lock")
+
+    def _wait_for_entry(self, key: str):
+        """ Waits while another request regenerates the response """
+        deadline = time.monotonic() + self.cache_wait_timeout
+
+        while time.monotonic() < deadline:
+            time.sleep(self.cache_poll_interval)
+            entry, is_regenerated = self._poll_entry(key)
+
+            if not is_regenerated:
+                return entry    # None if regeneration failed or the response is not cacheable
+
+        return None
+
+    async def _await_entry(self, key: str):
+        """ Async version of the _wait_for_entry(), it does not block the event loop """
+        deadline = time.monotonic() + self.cache_wait_timeout
+
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.cache_poll_interval)
+            entry, is_regenerated = await run_in_service_executor(self._poll_entry, key)
+
+            if not is_regenerated:
+                return entry
+
+        return None
+
+    def _lookup_entry(self, request, timeout: int) -> tuple:
+        """
+        Returns (key, entry, is_locked). key is None if the response is not cached, entry is None
+        on the miss, and is_locked says if we regenerate it or wait for the concurrent request.
+        """
+        if (
+            request is None or request.method not in self.cache_methods or not timeout
+            or self._is_private_request(request)
+        ):
+            return None, None, False
+
+        key = self.get_cache_key(request)
+        entry = self.response_cache.get(key)
+        is_locked = entry is None and self.response_cache.add(f"{key}:lock", 1, timeout=self.cache_lock_timeout)
+        return key, entry, is_locked
+
+    def _regenerate(self, request, key: str, timeout: int, create_response: callable):
+        lock_key = f"{key}:lock"
+
+        try:
+            response = create_response()
+        except Exception:
+            self.response_cache.delete(lock_key)
+            raise
+
+        if isinstance(self, CompressedResponseMixin):
+            response = self.compress_response(request, response)
+
+        if getattr(response, 'is_rendered', True):
+            return self._store_response(request, key, lock_key, response, timeout)
+
+        # REST framework renders the response later, with the renderer it negotiated
+        response.add_post_render_callback(
+            lambda rendered: self._store_response(request, key, lock_key, rendered, timeout),
+        )
+        return response
+
+    def log_response_proxy_or_creation(
+        self, log_function: callable, data, log_message: str, status_code: int, **kwargs,
+    ):
+        """
+        Returns the cached response or creates and caches the new one. Arguments you can provide
+        in addition to the ones of the response mixin:
+            - data: may be a function that returns the data, we call it only on the cache miss
+            - cache_timeout: TTL of that response, cache_timeout of the class by default
+            - request: the request, self.request of the view by default
+        """
+        timeout = kwargs.pop('cache_timeout', self.cache_timeout)
+        lookup = kwargs.pop('cache_lookup', None)   # the async functions look the entry up without blocking
+        request = kwargs.get('request') or getattr(self, 'request', None)
+        parent = super(CachedResponseMixin, self).log_response_proxy_or_creation
+
+        def create_response():
+            return parent(log_function, data() if callable(data) else data, log_message, status_code, **kwargs)
+
+        key, entry, is_locked = lookup or self._lookup_entry(request, timeout)
+
+        if key is not None and entry is None and not is_locked:
+            entry = self._wait_for_entry(key)
+
+        if key is None or (entry is None and not is_locked):
+            return create_response()    # not cached, or regeneration takes too long and we do not wait anymore
+
+        if entry is None:
+            return self._regenerate(request, key, timeout, create_response)
+
+        log_function(data=None, log_message=log_message, **kwargs)   # None is never converted
+        return self._response_from_entry(request, entry)
+
+    async def _alog_cached_response(self, parent: callable, data, log_message: str, **kwargs):
+        """ Looks the entry up and calls data() in the service executor, so the event loop is never blocked """
+        request = kwargs.get('request') or getattr(self, 'request', None)
+        key, entry, is_locked = lookup = await run_in_service_executor(
+            self._lookup_entry, request, kwargs.get('cache_timeout', self.cache_timeout),
+        )
+
+        if key is not None and entry is None and not is_locked:
+            entry = await self._await_entry(key)
+            lookup = (key, entry, False) if entry is not None else (None, None, False)
+
+        if entry is None and callable(data) and not inspect.isawaitable(data):
+            try:
+                data = await run_in_service_executor(data)
+            except Exception:
+                if is_locked:
+                    await run_in_service_executor(self.response_cache.delete, f"{key}:lock")
+                raise
+
+        return await parent(data=data, log_message=log_message, cache_lookup=lookup, **kwargs)
+
+    async def alog_response_as_info(self, data, log_message: str, **kwargs):
+        return await self._alog_cached_response(
+            super(CachedResponseMixin, self).alog_response_as_info, data, log_message, **kwargs,
+        )
+
+    async def alog_response_as_error(self, data, log_message: str, **kwargs):
+        return await self._alog_cached_response(
+            super(CachedResponseMixin, self).alog_response_as_error, data, log_message, **kwargs,
+        )
+
+
+__all__ = [
+    'CachedResponseMixin',
+]
@@ -0,0 +1,228 @@
+"""
+That file contains the compression of the responses with gzip and deflate of the standard library.
+We choose the encoding from the Accept-Encoding header of the request and compress only the bodies
+that are larger than COMPRESSION_MIN_SIZE, small bodies become larger after the compression.
+Streaming responses are compressed chunk by chunk with one compressor, so they still use constant memory.
+Put the mixin before the response mixin:
+
+    class UsersView(CompressedResponseMixin, LoggedJsonResponseMixin, View):
+        ...
+
+Together with CachedResponseMixin the compressed bytes are cached, so hot responses are compressed only once.
+"""
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+
+GZIP = 'gzip'
+DEFLATE = 'deflate'
+_WBITS = {GZIP: 16 + zlib.MAX_WBITS, DEFLATE: zlib.MAX_WBITS}
+_STRONG_ETAG = re.compile(r'^"[^"]*"$')
+
+CONSTANTS_CACHE_SIZE = RESPONSES_SETTINGS.get('PAYLOAD_CACHE_SIZE', 1024)
+_compressed_constants = OrderedDict()   # LRU, dynamic values must not push the constants out
+_lock = threading.Lock()
+
+
+def negotiate_encoding(accept_encoding: str, encodings: tuple = (GZIP, DEFLATE)):
+    """ Returns the encoding with the highest quality in the Accept-Encoding header, encodings are in our order """
+    qualities = {}
+
+    for item in (accept_encoding or '').split(','):
+        name, _, parameters = item.partition(';')
+        parameters = parameters.strip()
+        quality = 1.0
+
+        if parameters.startswith('q='):
+            try:
+                quality = float(parameters[2:])
+            except ValueError:
+                quality = 0
+
+        qualities[name.strip().lower()] = quality
+
+    best_encoding, best_quality = None, 0
+
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+
+        if quality > best_quality:
+            best_encoding, best_quality = encoding, quality
+
+    return best_encoding
+
+
+def compress(content: bytes, encoding: str, level: int = 6) -> bytes:
+    # zlib writes the gzip header with mtime=0, so the bytes are reproducible. gzip.compress(mtime=0) needs Python 3.8
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+    return compressor.compress(content) + compressor.flush()
+
+
+def compress_constant(content: bytes, encoding: str, level: int = 6) -> bytes:
+    """ Compresses the pre-encoded constant payloads only once, see responses.envelopes """
+    key = (encoding, level, content)
+
+    with _lock:
+        try:
+            _compressed_constants.move_to_end(key)
+            return _compressed_constants[key]
+        except KeyError:
+            pass
+
+    compressed = compress(content, encoding, level)
+
+    with _lock:
+        _compressed_constants[key] = compressed
+
+        while len(_compressed_constants) > CONSTANTS_CACHE_SIZE:
+            _compressed_constants.popitem(last=False)
+
+    return compressed
+
+
+def compress_stream(chunks, encoding: str, level: int = 6):
+    """ Compresses the iterator of bytes, every chunk is flushed so the client receives the rows immediately """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+
+    for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+async def acompress_stream(chunks, encoding: str, level: int = 6):
+    """ Async version of the compress_stream() """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _WBITS[encoding])
+
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        if compressed:
+            yield compressed
+
+    yield compressor.flush()
+
+
+class CompressedResponseMixin:
+    """
+    Compresses the responses of the logged response mixins, including the streaming ones.
+    REST framework responses are compressed after they are rendered.
+    """
+    compression_encodings: tuple = tuple(RESPONSES_SETTINGS.get('COMPRESSION_ENCODINGS', (GZIP, DEFLATE)))
+    compression_min_size: int = RESPONSES_SETTINGS.get('COMPRESSION_MIN_SIZE', 1024)
+    compression_level: int = RESPONSES_SETTINGS.get('COMPRESSION_LEVEL', 6)
+    compress_streaming: bool = RESPONSES_SETTINGS.get('COMPRESS_STREAMING', True)
+
+    def negotiate_encoding(self, request):
+        return negotiate_encoding(request.headers.get('Accept-Encoding'), self.compression_encodings)
+
+    def _should_compress(self, response) -> bool:
+        if response.has_header('Content-Encoding') or 'no-transform' in response.get('Cache-Control', ''):
+            return False
+        elif response.streaming:
+            return self.compress_streaming
+
+        return len(response.content) >= self.compression_min_size
+
+    def _compress_content(self, response, encoding: str):
+        if getattr(response, 'constant_payload', False):
+            compressed = compress_constant(response.content, encoding, self.compression_level)
+        else:
+            compressed = compress(response.content, encoding, self.compression_level)
+
+        if len(compressed) >= len(response.content):
+            return False
+
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        return True
+
+    def _compress_streaming_content(self, response, encoding: str):
+        if getattr(response, 'is_async', False):  # Django 4.2+ async iterators
+            response.streaming_content = acompress_stream(response.streaming_content, encoding, self.compression_level)
+        else:
+            response.streaming_content = compress_stream(response.streaming_content, encoding, self.compression_level)
+
+        if response.has_header('Content-Length'):
+            del response['Content-Length']
+
+        return True
+
+    def compress_response(self, request, response):
+        """ Compresses the response with the encoding that the client accepts, the response is changed in place """
+        if request is None or not hasattr(response, 'has_header'):
+            return response
+
+        if not getattr(response, 'is_rendered', True):
+            # REST framework responses are rendered later, callbacks of the render may return the new response
+            response.add_post_render_callback(lambda rendered: self.compress_response(request, rendered))
+            return response
+
+        if not self._should_compress(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self.negotiate_encoding(request)
+
+        if encoding is None:
+            return response
+
+        compress_function = self._compress_streaming_content if response.streaming else self._compress_content
+        if not compress_function(response, encoding):
+            return response
+
+        etag = response.get('ETag')
+        if etag and _STRONG_ETAG.match(etag):   # the bytes are not the same anymore
+            response['ETag'] = f"W/{etag}"
+
+        response['Content-Encoding'] = encoding
+        return response
+
+    def _request_from_kwargs(self, kwargs: dict):
+        return kwargs.get('request') or getattr(self, 'request', None)
+
+    def log_response_as_info(self, data, log_message: str, **kwargs):
+        return self.compress_response(
+            self._request_from_kwargs(kwargs),
+            super(CompressedResponseMixin, self).log_response_as_info(data=data, log_message=log_message, **kwargs),
+        )
+
+    def log_response_as_error(self, data, log_message: str, **kwargs):
+        return self.compress_response(
+            self._request_from_kwargs(kwargs),
+            super(CompressedResponseMixin, self).log_response_as_error(data=data, log_message=log_message, **kwargs),
+        )
+
+    async def alog_response_as_info(self, data, log_message: str, **kwargs):
+        response = await super(CompressedResponseMixin, self).alog_response_as_info(
+            data=data, log_message=log_message, **kwargs,
+        )
+        return self.compress_response(self._request_from_kwargs(kwargs), response)
+
+    async def alog_response_as_error(self, data, log_message: str, **kwargs):
+        response = await super(CompressedResponseMixin, self).alog_response_as_error(
+            data=data, log_message=log_message, **kwargs,
+        )
+        return self.compress_response(self._request_from_kwargs(kwargs), response)
+
+
+__all__ = [
+    'CompressedResponseMixin',
+    'DEFLATE',
+    'GZIP',
+    'acompress_stream',
+    'compress',
+    'compress_constant',
+    'compress_stream',
+    'negotiate_encoding',
+]
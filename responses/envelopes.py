@@ -0,0 +1,151 @@
+"""
+That file contains the pre-encoded envelopes of the JSON responses.
+Every response has the same structure: {"detail": data}, so we encode it once per serializer and split it
+into the prefix and the suffix bytes: b'{"detail":' and b'}'. The data is encoded alone and spliced
+between them, so the wrapper is never built or encoded again.
+Constant payloads, e.g. success_data = "OK" of your view, are encoded completely only once per class.
+Declared constants are always kept, other immutable values live in the LRU cache of PAYLOAD_CACHE_SIZE entries,
+so dynamic strings or numbers never push the real constants out.
+Caches are cleared when the settings change (setting_changed signal), and the key has the current
+DEFAULT_RESPONSE_VERB, so the changed verb never meets the old bytes. We read the verb from
+settings.DJANGO_HEAVEN every time, so override_settings() changes it too.
+"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+from responses.serializers import get_serializer
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+PAYLOAD_CACHE_SIZE = RESPONSES_SETTINGS.get('PAYLOAD_CACHE_SIZE', 1024)
+
+# Immutable types whose values are cached without the declaration
+CONSTANT_TYPES = (str, int, float, bool)
+_ENVELOPE_MARKER = '__django_heaven_envelope_data__'
+
+_envelopes = {}
+_payloads = {}   # declared constants, their number is bounded by the classes
+_value_payloads = OrderedDict()   # immutable values, LRU
+_lock = threading.Lock()
+
+
+class EncodedPayload(NamedTuple):
+    """ Body of the response that is encoded already, LoggedJsonResponseMixin does not encode it again """
+    content: bytes
+    constant: bool = False
+
+
+class JsonEnvelope(NamedTuple):
+    """ Encoded parts of the response structure around the data """
+    prefix: bytes
+    suffix: bytes
+
+    def wrap(self, encoded_data: bytes) -> bytes:
+        return self.prefix + encoded_data + self.suffix
+
+
+def get_response_verb() -> str:
+    """ Returns the current DEFAULT_RESPONSE_VERB, the key of the data in the responses """
+    return settings.DJANGO_HEAVEN['RESPONSES']['DEFAULT_RESPONSE_VERB']
+
+
+def get_envelope(serializer, verb: str = None) -> JsonEnvelope:
+    """ Returns the encoded envelope of the serializer, it is created only once """
+    serializer = get_serializer(serializer)
+    verb = verb or get_response_verb()
+    key = (serializer, verb)
+
+    try:
+        return _envelopes[key]
+    except KeyError:
+        pass
+
+    encoded_marker = serializer.dumps(_ENVELOPE_MARKER)
+    parts = serializer.dumps({verb: _ENVELOPE_MARKER}).split(encoded_marker)
+
+    if len(parts) != 2:
+        raise ValueError(f"Serializer {serializer} does not encode the data of the envelope as it is")
+
+    with _lock:
+        return _envelopes.setdefault(key, JsonEnvelope(*parts))
+
+
+def is_constant_payload(data) -> bool:
+    return type(data) in CONSTANT_TYPES
+
+
+def encode_payload(data, serializer, owner=None, constant_name: str = None) -> EncodedPayload:
+    """
+    Encodes the data inside of the envelope. Constant payloads are cached per owner class:
+    the declared ones by constant_name, so they must never change, and the other immutable values
+    by their value in the LRU cache.
+    """
+    serializer = get_serializer(serializer)
+    envelope = get_envelope(serializer)
+
+    if constant_name is not None:
+        key = (owner, serializer, envelope, constant_name)
+
+        try:
+            return _payloads[key]
+        except KeyError:
+            pass
+
+        encoded = EncodedPayload(envelope.wrap(serializer.dumps(data)), constant=True)
+
+        with _lock:
+            return _payloads.setdefault(key, encoded)
+
+    if not is_constant_payload(data):
+        return EncodedPayload(envelope.wrap(serializer.dumps(data)))
+
+    key = (owner, serializer, envelope, type(data), data)
+
+    with _lock:
+        try:
+            _value_payloads.move_to_end(key)
+            return _value_payloads[key]
+        except KeyError:
+            pass
+
+    encoded = EncodedPayload(envelope.wrap(serializer.dumps(data)), constant=True)
+
+    with _lock:
+        _value_payloads[key] = encoded
+
+        while len(_value_payloads) > PAYLOAD_CACHE_SIZE:
+            _value_payloads.popitem(last=False)
+
+    return encoded
+
+
+def clear_envelope_cache(**kwargs):
+    """ Forgets all the encoded envelopes and payloads """
+    with _lock:
+        _envelopes.clear()
+        _payloads.clear()
+        _value_payloads.clear()
+
+
+def _on_setting_changed(setting: str, **kwargs):
+    if setting == 'DJANGO_HEAVEN':
+        clear_envelope_cache()
+
+
+setting_changed.connect(_on_setting_changed, dispatch_uid='django_heaven_clear_envelope_cache')
+
+
+__all__ = [
+    'CONSTANT_TYPES',
+    'EncodedPayload',
+    'JsonEnvelope',
+    'clear_envelope_cache',
+    'encode_payload',
+    'get_envelope',
+    'get_response_verb',
+    'is_constant_payload',
+]
@@ -1,38 +1,93 @@
 """ That file contains responses for pure Django JsonResponse """
-import json
-
-from django.core.serializers.json import DjangoJSONEncoder
+from django.conf import settings
 from django.http import JsonResponse
 
 from responses.base import BaseLoggedResponseMixin
+from responses.envelopes import EncodedPayload, encode_payload
 from responses.exceptions import ResponseProgrammingException
+from responses.serializers import EncodedJsonResponse, get_serializer
+from responses.validation import SAMPLED, validate_json_response
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+# Arguments of the JsonResponse() that HttpResponse() does not know, the envelope cannot honour them
+JSON_RESPONSE_KWARGS = ('encoder', 'json_dumps_params', 'safe')
 
 
 class LoggedJsonResponseMixin(BaseLoggedResponseMixin):
     """
     Use that class in order to create a new JsonResponse() with structured data inside. Mind that
     I always use safe=False, since it is not a great idea from my point of view, and heaven must be a safe place.
+
+    We encode the data with the json_serializer, see responses.serializers. If you provide your own encoder
+    argument, we use json.dumps() with it instead.
+
+    Raw data is encoded alone and put into the pre-encoded envelope, see responses.envelopes.
+    Immutable values, e.g. success_data = "OK", are encoded only once, and you can declare
+    the names of the other attributes that never change in constant_payloads.
+    JsonResponse() arguments in response_kwargs, e.g. json_dumps_params, skip the envelope.
     """
     response_type = JsonResponse
+    json_serializer = RESPONSES_SETTINGS.get('JSON_SERIALIZER', 'fast')
+    # 'off', 'sampled' or 'full', see responses.validation
+    proxy_validation: str = RESPONSES_SETTINGS.get('PROXY_VALIDATION', SAMPLED)
+    proxy_validation_sample_rate: float = RESPONSES_SETTINGS.get('PROXY_VALIDATION_SAMPLE_RATE', 0.01)
+    constant_payloads: tuple = ()   # names of the attributes whose data is encoded only once, e.g. ("error_data",)
 
     def proxy_response_validation(self, data, status_code: int, **kwargs):
-        """ Tests that the JsonResponse() is a safe one """
-        try:
-            if not isinstance(json.loads(data.content), dict):
-                raise ResponseProgrammingException(
-                    "JsonResponse() must be a safe one. Change your response structure to a dictionary"
-                )
-            if not isinstance(data, JsonResponse):
-                raise ResponseProgrammingException(
-                    f"Provide only JsonResponse() objects in LoggedJsonResponseProxyMixin()"
-                )
-
-        except json.JSONDecodeError:
+        """ Tests that the JsonResponse() is a safe one, proxy_validation mode says how strict we are """
+        if not isinstance(data, JsonResponse):
             raise ResponseProgrammingException(
-                f"Data provided in JsonResponse() cannot be decoded. Data: {data}"
+                f"Provide only JsonResponse() objects in LoggedJsonResponseProxyMixin()"
             )
 
-    def log_response_as_info(self, data, log_message: str, encoder=DjangoJSONEncoder, **kwargs):
+        validate_json_response(data, mode=self.proxy_validation, sample_rate=self.proxy_validation_sample_rate)
+
+    def _uses_envelope(self, data, **kwargs) -> bool:
+        """ Envelope has the structure of the default data_conversion_function(), keyset pages add cursors to it """
+        response_kwargs = kwargs.get('response_kwargs') or {}
+
+        return (
+            kwargs.get('encoder') is None
+            and not any(name in response_kwargs for name in JSON_RESPONSE_KWARGS)
+            and isinstance(data, self.raw_types)
+            and getattr(data, 'cursors', None) is None
+            and type(self).data_conversion_function is BaseLoggedResponseMixin.data_conversion_function
+        )
+
+    def _constant_name(self, data):
+        for name in self.constant_payloads:
+            if getattr(self, name, None) is data:
+                return name
+
+        return None
+
+    def _log_response(self, log_function: callable, data, log_message: str, **kwargs):
+        if not self._uses_envelope(data, **kwargs):
+            return super(LoggedJsonResponseMixin, self)._log_response(log_function, data, log_message, **kwargs)
+
+        log_function(log_message)
+        return encode_payload(data, self.json_serializer, owner=type(self), constant_name=self._constant_name(data))
+
+    def create_response(self, data, status_code: int, **kwargs):
+        if isinstance(data, EncodedPayload):
+            response_kwargs = {
+                "content_type": get_serializer(self.json_serializer).content_type,
+                **(kwargs.get('response_kwargs') or {}),
+            }
+            response = EncodedJsonResponse.from_encoded(data.content, status=status_code, **response_kwargs)
+            response.constant_payload = data.constant   # compressed only once, see responses.compression
+            return response
+
+        return EncodedJsonResponse(
+            data=data,
+            serializer=self.json_serializer,
+            encoder=kwargs.get('encoder'),
+            status=status_code,
+            **(kwargs.get('response_kwargs') or {}),
+        )
+
+    def log_response_as_info(self, data, log_message: str, encoder=None, **kwargs):
         return self.log_response_proxy_or_creation(
             log_function=super(LoggedJsonResponseMixin, self).log_response_as_info,
             data=data,
@@ -41,7 +96,7 @@ class LoggedJsonResponseMixin(BaseLoggedResponseMixin):
             **kwargs,
         )
 
-    def log_response_as_error(self, data, log_message: str, encoder=DjangoJSONEncoder, **kwargs):
+    def log_response_as_error(self, data, log_message: str, encoder=None, **kwargs):
         return self.log_response_proxy_or_creation(
             log_function=super(LoggedJsonResponseMixin, self).log_response_as_error,
             data=data,
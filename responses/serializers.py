@@ -0,0 +1,205 @@
+"""
+That file contains JSON serializers of the LoggedJsonResponseMixin.
+Serializer turns the data into the bytes of the response body. Choose it with
+settings.DJANGO_HEAVEN.RESPONSES.JSON_SERIALIZER or json_serializer attribute of your view:
+    - 'fast' (default): 'orjson' if it is installed, otherwise 'json'
+    - 'orjson': orjson with the Django types of DjangoJSONEncoder
+    - 'json': compact json.dumps() with the type-dispatch table of the Django types
+    - 'django': json.dumps() with DjangoJSONEncoder, as JsonResponse does it
+You can also register your own serializer with register_serializer().
+Django types (datetimes, Decimal, UUID, lazy strings) are encoded exactly as DjangoJSONEncoder encodes them.
+
+The speedup of 'fast' comes from orjson, that is an optional dependency: pip install django-heaven[orjson].
+Without it 'fast' is 'json', which encodes about as fast as JsonResponse does, its responses are only smaller.
+Run benchmarks/json_serializers.py in order to compare them on your data.
+"""
+import datetime
+import decimal
+import json
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+from django.utils.timezone import is_aware
+
+from responses.validation import mark_safe_json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+
+
+def _encode_datetime(value: datetime.datetime) -> str:
+    result = value.isoformat()
+
+    if value.microsecond:
+        result = result[:23] + result[26:]
+    if result.endswith('+00:00'):
+        result = result[:-6] + 'Z'
+
+    return result
+
+
+def _encode_time(value: datetime.time) -> str:
+    if is_aware(value):
+        raise ValueError("JSON can't represent timezone-aware times.")
+
+    result = value.isoformat()
+    return result[:12] if value.microsecond else result
+
+
+# Type-dispatch table: we find the encoder with one dictionary lookup instead of the isinstance() chain
+TYPE_ENCODERS = {
+    datetime.datetime: _encode_datetime,
+    datetime.date: datetime.date.isoformat,
+    datetime.time: _encode_time,
+    datetime.timedelta: duration_iso_string,
+    decimal.Decimal: str,
+    uuid.UUID: str,
+    Promise: str,
+}
+
+
+def encode_default(value):
+    """ default() function of the encoders. Subclasses of the known types are added to the table once """
+    try:
+        return TYPE_ENCODERS[type(value)](value)
+    except KeyError:
+        pass
+
+    for value_type in type(value).__mro__[1:]:
+        encoder = TYPE_ENCODERS.get(value_type)
+
+        if encoder is not None:
+            TYPE_ENCODERS[type(value)] = encoder
+            return encoder(value)
+
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class BaseJsonSerializer:
+    """ Serializer converts the data to the JSON bytes. Reassign dumps() in order to create your own one """
+    content_type = 'application/json'
+
+    def dumps(self, data) -> bytes:
+        raise NotImplementedError
+
+
+class DjangoJsonSerializer(BaseJsonSerializer):
+    """ The same encoding as JsonResponse() has, you may provide your own json.JSONEncoder and json.dumps() params """
+
+    def __init__(self, encoder=DjangoJSONEncoder, **json_dumps_params):
+        self.encoder = encoder
+        self.json_dumps_params = json_dumps_params
+
+    def dumps(self, data) -> bytes:
+        return json.dumps(data, cls=self.encoder, **self.json_dumps_params).encode()
+
+
+class StdlibJsonSerializer(BaseJsonSerializer):
+    """ Compact json encoder with the type-dispatch table, we create the encoder only once """
+
+    def __init__(self):
+        self._encode = json.JSONEncoder(separators=(',', ':'), default=encode_default).encode
+
+    def dumps(self, data) -> bytes:
+        # ensure_ascii is on, so the ASCII codec is enough and it is the fastest one
+        return self._encode(data).encode('ascii')
+
+
+class OrjsonSerializer(BaseJsonSerializer):
+    """ orjson returns bytes itself. We pass datetimes through, so that they are encoded as Django encodes them """
+    options = 0 if orjson is None else orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("You need to install orjson in order to use OrjsonSerializer")
+
+    def dumps(self, data) -> bytes:
+        return orjson.dumps(data, default=encode_default, option=self.options)
+
+
+_serializers = {}
+_serializer_classes = {
+    'django': DjangoJsonSerializer,
+    'json': StdlibJsonSerializer,
+    'orjson': OrjsonSerializer,
+    'fast': StdlibJsonSerializer if orjson is None else OrjsonSerializer,
+}
+
+
+def register_serializer(name: str, serializer: BaseJsonSerializer):
+    """ Makes the serializer available by its name in the settings and views """
+    _serializers[name] = serializer
+
+
+def get_serializer(serializer) -> BaseJsonSerializer:
+    """ Returns the serializer by its name, serializer instances are returned as they are """
+    if isinstance(serializer, BaseJsonSerializer):
+        return serializer
+
+    try:
+        return _serializers[serializer]
+    except KeyError:
+        pass
+
+    try:
+        serializer_class = _serializer_classes[serializer]
+    except KeyError:
+        raise ValueError(f"JSON serializer '{serializer}' is not registered")
+
+    return _serializers.setdefault(serializer, serializer_class())
+
+
+class EncodedJsonResponse(JsonResponse):
+    """
+    JsonResponse() that is encoded with the serializer. The bytes of the serializer
+    become the body of the response as they are. If you provide encoder or json_dumps_params
+    of the JsonResponse(), we encode the data with json.dumps() as JsonResponse() does.
+    """
+
+    def __init__(
+        self, data, serializer=None, safe: bool = True, encoder=None, json_dumps_params: dict = None, **kwargs,
+    ):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the safe parameter to False.'
+            )
+
+        if encoder is not None or json_dumps_params is not None:
+            serializer = DjangoJsonSerializer(encoder or DjangoJSONEncoder, **(json_dumps_params or {}))
+        else:
+            serializer = get_serializer(serializer or RESPONSES_SETTINGS.get('JSON_SERIALIZER', 'fast'))
+
+        kwargs.setdefault('content_type', serializer.content_type)
+        HttpResponse.__init__(self, content=serializer.dumps(data), **kwargs)
+        mark_safe_json(self, data)
+
+    @classmethod
+    def from_encoded(cls, content: bytes, safe_json: bool = True, **kwargs):
+        """ Creates the response from the bytes that are encoded already, e.g. the cached ones """
+        response = cls.__new__(cls)
+        kwargs.setdefault('content_type', BaseJsonSerializer.content_type)
+        HttpResponse.__init__(response, content=content, **kwargs)
+        response.safe_json = safe_json
+        return response
+
+
+__all__ = [
+    'BaseJsonSerializer',
+    'DjangoJsonSerializer',
+    'EncodedJsonResponse',
+    'OrjsonSerializer',
+    'StdlibJsonSerializer',
+    'TYPE_ENCODERS',
+    'encode_default',
+    'get_serializer',
+    'register_serializer',
+]
@@ -0,0 +1,338 @@
+"""
+That file contains the streaming responses that are fed from the services.
+They take the service (its result), the queryset or any iterable, and encode the rows in chunks
+while the response is sent, so the export of millions of rows starts immediately and uses constant memory.
+Querysets are read with QuerySet.iterator(), that uses server-side cursors where the database supports them.
+We log the message when the stream is finished, with the number of rows and the duration.
+
+    class UsersExportView(LoggedStreamingJsonResponseMixin, View):
+        def get(self, request):
+            return self.log_response_as_info(
+                data=UserService().all(info_message="Exporting the users"),
+                log_message="Users are exported",
+                fields=("id", "username"),
+            )
+"""
+import csv
+import inspect
+import io
+import itertools
+import time
+
+from django.conf import settings
+from django.db.models import Model, QuerySet
+from django.http import StreamingHttpResponse
+
+from responses.asynchronous import iterate_async, streaming_content
+from responses.base import BaseLoggedResponseMixin
+from responses.envelopes import get_envelope
+from responses.serializers import get_serializer
+from services.asynchronous import iterate_in_thread
+
+
+RESPONSES_SETTINGS = settings.DJANGO_HEAVEN['RESPONSES']
+
+
+def model_row(instance: Model) -> dict:
+    """ Values of the concrete fields by attname, foreign keys are ids, so we never query the related objects """
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+class BaseLoggedStreamingResponseMixin(BaseLoggedResponseMixin):
+    """
+    Base class of the streaming responses. Reassign content_type, stream_prefix(), encode_chunk()
+    and stream_suffix() in order to create your own format. Everything that lives as long as one stream,
+    e.g. the buffers, goes into the state of create_stream_state(), never into the view: one view
+    may create several responses, and their streams must not share anything.
+    """
+    response_type = StreamingHttpResponse
+    content_type: str = None
+    streaming_chunk_size: int = RESPONSES_SETTINGS.get('STREAMING_CHUNK_SIZE', 500)
+
+    def prepare_queryset(self, queryset: QuerySet, fields: tuple = None) -> QuerySet:
+        """ Selects the fields of the rows, we stream dictionaries by default """
+        return queryset.values(*(fields or ()))
+
+    def stream_fields(self, data, fields: tuple = None) -> tuple:
+        """ Returns the fields of the stream, the ones that you provided by default """
+        return fields
+
+    def iterate_rows(self, data, fields: tuple = None, chunk_size: int = None):
+        """ Returns the iterator over the rows of the service, queryset or iterable """
+        rows = getattr(data, 'result', data)    # services keep their querysets and iterators in result
+
+        if isinstance(rows, QuerySet):
+            return self.prepare_queryset(rows, fields).iterator(chunk_size=chunk_size)
+
+        return iter(rows)
+
+    def aiterate_rows(self, data, fields: tuple = None, chunk_size: int = None):
+        """ Async version of the iterate_rows(), async iterators of the services are used as they are """
+        rows = getattr(data, 'result', data)
+
+        if hasattr(rows, '__aiter__'):
+            return rows
+        elif isinstance(rows, QuerySet):
+            queryset = self.prepare_queryset(rows, fields)
+
+            if hasattr(queryset, 'aiterator'):  # Django 4.1+
+                return queryset.aiterator(chunk_size=chunk_size)
+
+            return iterate_in_thread(lambda: queryset.iterator(chunk_size=chunk_size), chunk_size=chunk_size)
+
+        return iterate_async(rows)
+
+    def create_stream_state(self, fields: tuple = None) -> dict:
+        """ Returns the state of one stream, it is passed to stream_prefix(), encode_chunk() and stream_suffix() """
+        return {"fields": fields}
+
+    def stream_prefix(self, state: dict) -> bytes:
+        return b''
+
+    def encode_chunk(self, chunk: list, is_first: bool, state: dict) -> bytes:
+        raise NotImplementedError
+
+    def stream_suffix(self, state: dict) -> bytes:
+        return b''
+
+    def _stream(self, log_function: callable, rows, log_message: str, chunk_size: int, fields: tuple = None):
+        """ Yields the encoded chunks and logs the message when the stream is finished """
+        started_at = time.perf_counter()
+        rows_count = 0
+        state = self.create_stream_state(fields)
+
+        try:
+            yield self.stream_prefix(state)
+
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+
+                yield self.encode_chunk(chunk, is_first=rows_count == 0, state=state)
+                rows_count += len(chunk)
+
+            yield self.stream_suffix(state)
+
+        except Exception as exc:
+            # Headers are already sent, so we can only log the error and break the stream
+            self._log_error(f"{log_message}. Stream failed after {rows_count} rows. Exception: {exc}")
+            raise
+
+        log_function(f"{log_message}. Streamed {rows_count} rows in {time.perf_counter() - started_at:.4f}s")
+
+    async def _astream(self, log_function: callable, rows, log_message: str, chunk_size: int, fields: tuple = None):
+        """ Async version of the _stream() """
+        started_at = time.perf_counter()
+        rows_count = 0
+        chunk = []
+        state = self.create_stream_state(fields)
+
+        try:
+            yield self.stream_prefix(state)
+
+            async for row in rows:
+                chunk.append(row)
+
+                if len(chunk) == chunk_size:
+                    yield self.encode_chunk(chunk, is_first=rows_count == 0, state=state)
+                    rows_count += len(chunk)
+                    chunk = []
+
+            if chunk:
+                yield self.encode_chunk(chunk, is_first=rows_count == 0, state=state)
+                rows_count += len(chunk)
+
+            yield self.stream_suffix(state)
+
+        except Exception as exc:
+            self._log_error(f"{log_message}. Stream failed after {rows_count} rows. Exception: {exc}")
+            raise
+
+        log_function(f"{log_message}. Streamed {rows_count} rows in {time.perf_counter() - started_at:.4f}s")
+
+    def _log_streaming_response(
+        self, log_function: callable, data, log_message: str, status_code: int = 200,
+        fields: tuple = None, chunk_size: int = None, response_kwargs: dict = None, **kwargs,
+    ):
+        if isinstance(data, self.response_type):
+            log_function(log_message)
+            self.proxy_response_validation(data, status_code, **kwargs)
+            return data
+
+        chunk_size = chunk_size or self.streaming_chunk_size
+        fields = self.stream_fields(data, fields)
+        response_kwargs = {"content_type": self.content_type, **(response_kwargs or {})}
+
+        return self.response_type(
+            self._stream(log_function, self.iterate_rows(data, fields, chunk_size), log_message, chunk_size, fields),
+            status=status_code,
+            **response_kwargs,
+        )
+
+    def _alog_streaming_response(
+        self, log_function: callable, data, log_message: str, status_code: int = 200,
+        fields: tuple = None, chunk_size: int = None, response_kwargs: dict = None, **kwargs,
+    ):
+        if isinstance(data, self.response_type):
+            return self._log_streaming_response(log_function, data, log_message, status_code, **kwargs)
+
+        chunk_size = chunk_size or self.streaming_chunk_size
+        fields = self.stream_fields(data, fields)
+        response_kwargs = {"content_type": self.content_type, **(response_kwargs or {})}
+        rows = self.aiterate_rows(data, fields, chunk_size)
+        stream = self._astream(log_function, rows, log_message, chunk_size, fields)
+
+        return self.response_type(streaming_content(stream), status=status_code, **response_kwargs)
+
+    async def alog_response_as_info(self, data, log_message: str, **kwargs):
+        """
+        Async version of the log_response_as_info(). data may be the async iterator, e.g. the result
+        of the service aiterate(), and querysets are read without blocking the event loop.
+        On Django 4.2+ the stream is consumed in the event loop without thread hops,
+        older versions need ASYNC_STREAMING_BRIDGE, see responses.asynchronous.
+        """
+        if inspect.isawaitable(data):
+            data = await data
+
+        return self._alog_streaming_response(self._log_info, data, log_message, **kwargs)
+
+    async def alog_response_as_error(self, data, log_message: str, **kwargs):
+        """ Async version of the log_response_as_error() """
+        if inspect.isawaitable(data):
+            data = await data
+
+        return self._alog_streaming_response(self._log_error, data, log_message, **kwargs)
+
+    def log_response_as_info(self, data, log_message: str, **kwargs):
+        """
+        Streams the rows of the data and logs the info message at the end of the stream.
+        Arguments you can provide:
+            - data!: service, queryset or iterable of the rows
+            - log_message!: the message that we log with the number of rows and the duration
+            - status_code: 200 by default
+            - fields: fields of the rows of the queryset
+            - chunk_size: how many rows we encode at once
+            - response_kwargs: additional arguments of the StreamingHttpResponse()
+        """
+        return self._log_streaming_response(self._log_info, data, log_message, **kwargs)
+
+    def log_response_as_error(self, data, log_message: str, **kwargs):
+        """ The same as log_response_as_info(), but the message is logged as an error """
+        return self._log_streaming_response(self._log_error, data, log_message, **kwargs)
+
+
+class LoggedStreamingJsonResponseMixin(BaseLoggedStreamingResponseMixin):
+    """
+    Streams the rows in the usual structure of the responses: {"detail": [...]}.
+    Rows are encoded with the json_serializer, see responses.serializers, model instances are converted
+    with model_row(), as the rows of the querysets are.
+    """
+    content_type = 'application/json'
+    json_serializer = RESPONSES_SETTINGS.get('JSON_SERIALIZER', 'fast')
+
+    def stream_prefix(self, state: dict) -> bytes:
+        return get_envelope(self.json_serializer).prefix + b'['
+
+    def encode_chunk(self, chunk: list, is_first: bool, state: dict) -> bytes:
+        if isinstance(chunk[0], Model):
+            chunk = [model_row(instance) for instance in chunk]
+
+        encoded_rows = get_serializer(self.json_serializer).dumps(chunk)[1:-1]  # without the list brackets
+        return encoded_rows if is_first else b',' + encoded_rows
+
+    def stream_suffix(self, state: dict) -> bytes:
+        return b']' + get_envelope(self.json_serializer).suffix
+
+
+class LoggedStreamingNdjsonResponseMixin(LoggedStreamingJsonResponseMixin):
+    """ Streams one JSON document per line (NDJSON), so the consumers can read the rows one by one """
+    content_type = 'application/x-ndjson'
+
+    def create_stream_state(self, fields: tuple = None) -> dict:
+        # We reuse the buffer for all the chunks of the stream
+        return {**super(LoggedStreamingNdjsonResponseMixin, self).create_stream_state(fields), "buffer": bytearray()}
+
+    def stream_prefix(self, state: dict) -> bytes:
+        return b''
+
+    def encode_chunk(self, chunk: list, is_first: bool, state: dict) -> bytes:
+        dumps = get_serializer(self.json_serializer).dumps
+        buffer = state["buffer"]
+        buffer.clear()
+
+        for row in chunk:
+            buffer += dumps(model_row(row) if isinstance(row, Model) else row)
+            buffer += b'\n'
+
+        return bytes(buffer)
+
+    def stream_suffix(self, state: dict) -> bytes:
+        return b''
+
+
+class LoggedStreamingCsvResponseMixin(BaseLoggedStreamingResponseMixin):
+    """
+    Streams the rows as CSV. Querysets are read with values_list() of the fields, so only these columns
+    are selected, and the first line is the header with the field names.
+    Rows of the other iterables must be sequences, dictionaries are read in the order of the fields.
+    """
+    content_type = 'text/csv'
+    csv_dialect = 'excel'
+
+    def stream_fields(self, data, fields: tuple = None) -> tuple:
+        """ Querysets without the fields are streamed with all the concrete fields """
+        rows = getattr(data, 'result', data)
+
+        if not fields and isinstance(rows, QuerySet):
+            return tuple(field.attname for field in rows.model._meta.concrete_fields)
+
+        return fields
+
+    def prepare_queryset(self, queryset: QuerySet, fields: tuple = None) -> QuerySet:
+        return queryset.values_list(*(fields or self.stream_fields(queryset)))
+
+    def create_stream_state(self, fields: tuple = None) -> dict:
+        # One buffer and one writer for the whole stream, we only rewind the buffer after every chunk
+        buffer = io.StringIO()
+        return {
+            **super(LoggedStreamingCsvResponseMixin, self).create_stream_state(fields),
+            "buffer": buffer,
+            "writer": csv.writer(buffer, dialect=self.csv_dialect),
+        }
+
+    def stream_prefix(self, state: dict) -> bytes:
+        if state["fields"]:
+            state["writer"].writerow(state["fields"])
+
+        return self._flush_buffer(state["buffer"])
+
+    def _flush_buffer(self, buffer: io.StringIO) -> bytes:
+        encoded = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return encoded
+
+    def _row_values(self, row, fields: tuple = None):
+        if isinstance(row, Model):
+            return [getattr(row, field) for field in fields or ()]
+        elif isinstance(row, dict):
+            return [row.get(field) for field in fields] if fields else row.values()
+
+        return row
+
+    def encode_chunk(self, chunk: list, is_first: bool, state: dict) -> bytes:
+        if not isinstance(chunk[0], (list, tuple)):
+            chunk = [self._row_values(row, state["fields"]) for row in chunk]
+
+        state["writer"].writerows(chunk)
+        return self._flush_buffer(state["buffer"])
+
+
+__all__ = [
+    'BaseLoggedStreamingResponseMixin',
+    'LoggedStreamingCsvResponseMixin',
+    'LoggedStreamingJsonResponseMixin',
+    'LoggedStreamingNdjsonResponseMixin',
+    'model_row',
+]
@@ -14,16 +14,19 @@ class BaseLoggedResponseMixinTest(TestCase):
 
     info_data = None
     error_data = None
+    response_kwargs = {"status_code": 200}
 
     @classmethod
     def setUpClass(cls):
         try:
-            super(BaseLoggedResponseMixinTest, cls).setUpClass()
             cls.response_class: BaseLoggedResponseMixin = cls.testing_class()
-            cls.response_class.logger_obj = getLogger(settings.TEST_LOGGER_NAME)
         except TypeError:
+            # The skip must come before setUpClass() opens the transaction that tearDownClass() never closes
             raise unittest.SkipTest("Skipping tests of a bare BaseLoggedResponseMixinTest")
 
+        super(BaseLoggedResponseMixinTest, cls).setUpClass()
+        cls.response_class.logger_obj = getLogger(settings.TEST_LOGGER_NAME)
+
     def test_child_of_base_logged_response_mixin(self):
         self.assertIn(BaseLoggedResponseMixin, self.testing_class.mro())
 
@@ -43,3 +46,23 @@ class BaseLoggedResponseMixinTest(TestCase):
     def test_log_response_as_error_logging_message(self):
         self._test_log_response_base('error')
 
+    def test_log_first_n_sampling(self):
+        with patch.object(self.response_class, 'log_first_n', 2), \
+                patch.object(self.response_class, 'log_sample_interval', 60), \
+                patch.object(self.response_class.logger_obj, 'info') as mock_logger:
+            for _ in range(5):
+                self.response_class.log_response_as_info(
+                    data=self.info_data, log_message="sampled log message", **self.response_kwargs,
+                )
+
+            self.assertEqual(mock_logger.call_count, 2)
+
+    def test_error_dedup_window(self):
+        with patch.object(self.response_class, 'error_dedup_window', 60), \
+                patch.object(self.response_class.logger_obj, 'error') as mock_logger:
+            for _ in range(3):
+                self.response_class.log_response_as_error(
+                    data=self.error_data, log_message="repeated log message", **self.response_kwargs,
+                )
+
+            mock_logger.assert_called_once_with("repeated log message")
@@ -0,0 +1,5 @@
+""" Settings of the project that uses only the responses, test_imports.py imports them in a separate process """
+from django_heaven.settings import *  # noqa: F401, F403
+from django_heaven.settings import DJANGO_HEAVEN
+
+DJANGO_HEAVEN = {"RESPONSES": DJANGO_HEAVEN["RESPONSES"]}
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+from unittest.mock import Mock, patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase
+from rest_framework.views import APIView
+
+from responses.cache import CachedResponseMixin
+from responses.json import LoggedJsonResponseMixin
+from responses.rest_framework import LoggedRESTResponseMixin
+from services.base import BaseService
+from services.versions import get_model_versions, record_model_write
+
+
+class CachedJsonView(CachedResponseMixin, LoggedJsonResponseMixin):
+    cache_models = (get_user_model(),)
+    cache_query_params = ("page",)
+
+
+class CachedRESTView(CachedResponseMixin, LoggedRESTResponseMixin, APIView):
+    data_function = None
+
+    def get(self, request):
+        return self.log_response_as_info(data=self.data_function, log_message="REST log message", status_code=200)
+
+
+class UserTestService(BaseService):
+    model = get_user_model()
+
+
+class GroupTestService(BaseService):
+    model = Group
+
+
+class CachedResponseMixinTest(TestCase):
+    """ That is the tests for the CachedResponseMixin """
+
+    def setUp(self):
+        cache.clear()
+        self.response_class = CachedJsonView()
+
+    def _get(self, data_function, path: str = '/users/?page=1', request=None, **kwargs):
+        return self.response_class.log_response_as_info(
+            data=data_function, log_message="Test log message", status_code=200,
+            request=request or RequestFactory().get(path), **kwargs,
+        )
+
+    def test_hit_returns_cached_bytes(self):
+        data_function = Mock(return_value=[1, 2, 3])
+
+        with patch.object(self.response_class.logger_obj, 'info') as mock_logger:
+            first_response = self._get(data_function)
+            second_response = self._get(data_function)
+            self.assertEqual(mock_logger.call_count, 2)
+
+        data_function.assert_called_once()
+        self.assertEqual(first_response.content, second_response.content)
+        self.assertEqual(second_response['Content-Type'], 'application/json')
+
+    def test_key_parts(self):
+        data_function = Mock(return_value=[1, 2, 3])
+
+        self._get(data_function, path='/users/?page=1&utm_source=mail')
+        self._get(data_function, path='/users/?page=1&utm_source=ads')
+        self.assertEqual(data_function.call_count, 1)
+
+        self._get(data_function, path='/users/?page=2')
+        self.assertEqual(data_function.call_count, 2)
+
+        record_model_write(get_user_model())
+        self._get(data_function, path='/users/?page=2')
+        self.assertEqual(data_function.call_count, 3)
+
+    def test_cache_timeout_argument(self):
+        data_function = Mock(return_value=[1, 2, 3])
+
+        self._get(data_function, cache_timeout=0)
+        self._get(data_function, cache_timeout=0)
+        self.assertEqual(data_function.call_count, 2)
+
+    def test_single_flight_regeneration(self):
+        regeneration_started, finish_regeneration = threading.Event(), threading.Event()
+
+        def slow_data_function():
+            regeneration_started.set()
+            finish_regeneration.wait(5)
+            return [1, 2, 3]
+
+        waiting_data_function = Mock(return_value=[4, 5, 6])
+        thread = threading.Thread(target=self._get, args=(slow_data_function,))
+        thread.start()
+        regeneration_started.wait(5)
+
+        with patch.object(self.response_class, 'cache_poll_interval', 0.01):
+            threading.Timer(0.05, finish_regeneration.set).start()
+            response = self._get(waiting_data_function)
+
+        thread.join()
+        waiting_data_function.assert_not_called()
+        self.assertEqual(response.content, b'{"detail":[1,2,3]}')
+
+    def test_rest_framework_response_is_cached_after_render(self):
+        data_function = Mock(return_value={"users": [1, 2, 3]})
+        view = CachedRESTView.as_view(data_function=data_function)
+
+        first_response = view(RequestFactory().get('/users/', HTTP_ACCEPT='application/json'))
+        first_response.render()
+        second_response = view(RequestFactory().get('/users/', HTTP_ACCEPT='application/json'))
+
+        data_function.assert_called_once()
+        self.assertEqual(first_response.content, second_response.content)
+
+    def test_requests_with_credentials_are_not_cached(self):
+        data_function = Mock(return_value=[1, 2, 3])
+
+        for _ in range(2):
+            self._get(data_function, request=RequestFactory().get('/users/', HTTP_AUTHORIZATION='Token first'))
+
+        self.assertEqual(data_function.call_count, 2)
+
+    def test_responses_that_read_the_session_are_not_cached(self):
+        request = RequestFactory().get('/users/')
+        request.session = SessionStore()
+
+        def user_data_function():
+            return [request.session.get('user_id')]
+
+        self._get(user_data_function, request=request)
+        data_function = Mock(return_value=[1, 2, 3])
+        self._get(data_function, request=RequestFactory().get('/users/'))
+
+        data_function.assert_called_once()
+
+    def test_vary_headers_outside_of_the_key_are_not_cached(self):
+        def response_with_vary(vary: str):
+            response = HttpResponse(b'[1]', content_type='application/json')
+            response['Vary'] = vary
+            return response
+
+        self.assertTrue(self.response_class._is_cacheable(RequestFactory().get('/'), response_with_vary('Accept')))
+
+        for vary in ('Cookie', 'Accept, Authorization', '*'):
+            self.assertFalse(self.response_class._is_cacheable(RequestFactory().get('/'), response_with_vary(vary)))
+
+    def test_service_writes_bump_versions_of_cache_models_only(self):
+        user_versions, group_versions = get_model_versions(get_user_model()), get_model_versions(Group)
+
+        UserTestService().create(username="user", info_message="User is created")
+        GroupTestService().create(name="group", info_message="Group is created")
+
+        self.assertNotEqual(get_model_versions(get_user_model()), user_versions)   # cache_models of CachedJsonView
+        self.assertEqual(get_model_versions(Group), group_versions)
+
+    async def _aget(self, data_function, path: str = '/users/?page=1'):
+        return await self.response_class.alog_response_as_info(
+            data=data_function, log_message="Test log message", status_code=200, request=RequestFactory().get(path),
+        )
+
+    async def test_async_data_function_runs_outside_of_the_event_loop(self):
+        threads = []
+
+        def data_function():
+            threads.append(threading.current_thread())
+            return [1, 2, 3]
+
+        first_response = await self._aget(data_function)
+        second_response = await self._aget(data_function)
+
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], threading.current_thread())
+        self.assertEqual(first_response.content, second_response.content)
+
+    async def test_async_waiting_does_not_block_the_event_loop(self):
+        request = RequestFactory().get('/users/?page=1')
+        key = self.response_class.get_cache_key(request)
+        cache.add(f"{key}:lock", 1)
+        calls = []
+
+        def data_function():
+            calls.append(None)
+            return [4, 5, 6]
+
+        async def regenerate():
+            await asyncio.sleep(0.05)
+            cache.set(key, (200, [('Content-Type', 'application/json')], b'{"detail":[1,2,3]}'))
+            cache.delete(f"{key}:lock")
+
+        with patch.object(self.response_class, 'cache_poll_interval', 0.01), \
+                patch('responses.cache.time.sleep', side_effect=AssertionError("the event loop is blocked")):
+            response, _ = await asyncio.gather(self._aget(data_function), regenerate())
+
+        self.assertEqual(calls, [])
+        self.assertEqual(response.content, b'{"detail":[1,2,3]}')
@@ -0,0 +1,145 @@
+import gzip
+import zlib
+from unittest.mock import Mock, patch
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+
+from responses import compression
+from responses.cache import CachedResponseMixin
+from responses.compression import CompressedResponseMixin, negotiate_encoding
+from responses.http import LoggedHttpStreamingResponseMixin
+from responses.json import LoggedJsonResponseMixin
+from responses.streaming import LoggedStreamingNdjsonResponseMixin
+
+
+class CompressedJsonView(CompressedResponseMixin, LoggedJsonResponseMixin):
+    compression_min_size = 100
+    constant_payloads = ("large_data",)
+    large_data = {"rows": list(range(100))}
+
+
+class CompressedCachedJsonView(CachedResponseMixin, CompressedResponseMixin, LoggedJsonResponseMixin):
+    compression_min_size = 100
+
+
+class CompressedHttpStreamingView(CompressedResponseMixin, LoggedHttpStreamingResponseMixin):
+    pass
+
+
+class CompressedNdjsonView(CompressedResponseMixin, LoggedStreamingNdjsonResponseMixin):
+    pass
+
+
+class CompressedResponseMixinTest(TestCase):
+    """ That is the tests for the CompressedResponseMixin """
+    large_data = list(range(1000))
+
+    def _request(self, accept_encoding: str = 'gzip, deflate'):
+        return RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('gzip;q=0, *'), 'deflate')
+        self.assertEqual(negotiate_encoding('br'), None)
+        self.assertEqual(negotiate_encoding(None), None)
+
+    def test_large_json_response_is_compressed(self):
+        response = CompressedJsonView().log_response_as_info(
+            data=self.large_data, log_message="Test log message", status_code=200, request=self._request(),
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), f'{{"detail":{self.large_data}}}'.replace(' ', '').encode())
+
+        response = CompressedJsonView().log_response_as_info(
+            data=self.large_data, log_message="Test log message", status_code=200, request=self._request('deflate'),
+        )
+        self.assertEqual(response['Content-Encoding'], 'deflate')
+        self.assertTrue(zlib.decompress(response.content).startswith(b'{"detail":[0,1'))
+
+    def test_small_or_not_accepted_responses_are_not_compressed(self):
+        for data, accept_encoding in (("OK", 'gzip'), (self.large_data, 'identity')):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = CompressedJsonView().log_response_as_info(
+                    data=data, log_message="Test log message", status_code=200,
+                    request=self._request(accept_encoding),
+                )
+
+                self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_constant_payload_is_compressed_once(self):
+        view = CompressedJsonView()
+        compression._compressed_constants.clear()
+
+        with patch.object(compression, 'compress', wraps=compression.compress) as mock_compress:
+            for _ in range(3):
+                response = view.log_response_as_info(
+                    data=view.large_data, log_message="Test log message", status_code=200, request=self._request(),
+                )
+
+            self.assertEqual(mock_compress.call_count, 1)
+
+        expected_content = f'{{"detail":{{"rows":{list(range(100))}}}}}'.replace(' ', '').encode()
+        self.assertEqual(gzip.decompress(response.content), expected_content)
+
+    def test_streaming_responses_are_compressed(self):
+        response = CompressedHttpStreamingView().log_response_as_info(
+            data=StreamingHttpResponse(iter([b"first chunk ", b"second chunk"])),
+            log_message="Test log message", request=self._request(),
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b"first chunk second chunk")
+
+        response = CompressedNdjsonView().log_response_as_info(
+            data=[{"id": 1}, {"id": 2}], log_message="Test log message", request=self._request('deflate'),
+        )
+        self.assertEqual(zlib.decompress(b''.join(response.streaming_content)), b'{"id":1}\n{"id":2}\n')
+
+    def test_cached_responses_are_compressed_once(self):
+        cache.clear()
+        view, data_function = CompressedCachedJsonView(), Mock(return_value=self.large_data)
+
+        with patch.object(compression, 'compress', wraps=compression.compress) as mock_compress:
+            responses = [
+                view.log_response_as_info(
+                    data=data_function, log_message="Test log message", status_code=200, request=self._request(),
+                ) for _ in range(3)
+            ]
+
+            self.assertEqual(mock_compress.call_count, 1)
+
+        data_function.assert_called_once()
+        self.assertEqual(responses[2]['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(responses[2].content), gzip.decompress(responses[0].content))
+
+        identity_response = view.log_response_as_info(
+            data=data_function, log_message="Test log message", status_code=200, request=self._request('identity'),
+        )
+        self.assertFalse(identity_response.has_header('Content-Encoding'))
+        self.assertEqual(data_function.call_count, 2)
+
+    def test_compress_is_reproducible(self):
+        content = b'{"detail":[1,2,3]}' * 100
+        compressed = compression.compress(content, compression.GZIP)
+
+        self.assertEqual(compressed, compression.compress(content, compression.GZIP))
+        self.assertEqual(compressed[4:8], b'\x00\x00\x00\x00')   # mtime of the gzip header
+        self.assertEqual(gzip.decompress(compressed), content)
+        self.assertEqual(zlib.decompress(compression.compress(content, compression.DEFLATE)), content)
+
+    def test_compressed_constants_are_evicted(self):
+        compression._compressed_constants.clear()
+
+        with patch.object(compression, 'CONSTANTS_CACHE_SIZE', 2):
+            for content in (b'first', b'second', b'first', b'third'):
+                compression.compress_constant(content, compression.GZIP)
+
+            self.assertEqual(
+                [key[2] for key in compression._compressed_constants], [b'first', b'third'],
+            )
@@ -0,0 +1,109 @@
+import json
+from unittest.mock import patch
+
+from django.conf import settings
+from django.test import TestCase, override_settings
+
+from responses.envelopes import _payloads, _value_payloads, clear_envelope_cache, encode_payload, get_envelope
+from responses.json import LoggedJsonResponseMixin
+from responses.serializers import get_serializer
+
+
+class ConstantPayloadView(LoggedJsonResponseMixin):
+    constant_payloads = ("error_data",)
+    json_serializer = 'json'
+
+    success_data = "OK"
+    error_data = {"errors": [1, 2, 3], "reason": "because"}
+
+
+class JsonEnvelopesTest(TestCase):
+    """ That is the tests for the pre-encoded envelopes of the JSON responses """
+
+    def setUp(self):
+        clear_envelope_cache()
+        self.response_class = ConstantPayloadView()
+
+    def test_envelope_parts(self):
+        self.assertEqual(get_envelope('json'), (b'{"detail":', b'}'))
+        self.assertEqual(get_envelope('django'), (b'{"detail": ', b'}'))
+
+    def test_envelope_is_the_same_as_the_converted_data(self):
+        for data in ("OK", 1, [1, "two", None], {"key": "value"}):
+            with self.subTest(data=data):
+                self.assertEqual(
+                    encode_payload(data, 'django').content,
+                    get_serializer('django').dumps({"detail": data}),
+                )
+
+    def test_constant_payloads_are_encoded_once(self):
+        serializer = get_serializer('json')
+        get_envelope(serializer)
+
+        with patch.object(serializer, 'dumps', wraps=serializer.dumps) as mock_dumps, \
+                patch.object(self.response_class, 'data_conversion_function') as mock_conversion:
+            for _ in range(3):
+                success_response = self.response_class.log_response_as_info(
+                    data=self.response_class.success_data, log_message="Test log message", status_code=200,
+                )
+                error_response = self.response_class.log_response_as_error(
+                    data=self.response_class.error_data, log_message="Test log message", status_code=400,
+                )
+
+            self.assertEqual(mock_dumps.call_count, 2)
+            mock_conversion.assert_not_called()
+
+        self.assertEqual(success_response.content, b'{"detail":"OK"}')
+        self.assertEqual(error_response.content, b'{"detail":{"errors":[1,2,3],"reason":"because"}}')
+        self.assertEqual(error_response.status_code, 400)
+
+    def test_setting_changed_clears_the_cache(self):
+        encode_payload("OK", 'json', owner=ConstantPayloadView)
+        encode_payload({"key": "value"}, 'json', owner=ConstantPayloadView, constant_name="error_data")
+        self.assertEqual((len(_payloads), len(_value_payloads)), (1, 1))
+
+        with override_settings(DJANGO_HEAVEN=settings.DJANGO_HEAVEN):
+            self.assertEqual((len(_payloads), len(_value_payloads)), (0, 0))
+
+    def test_dynamic_values_do_not_evict_the_constants(self):
+        serializer = get_serializer('json')
+        get_envelope(serializer)
+        encode_payload(
+            self.response_class.error_data, serializer, owner=ConstantPayloadView, constant_name="error_data",
+        )
+        encode_payload("OK", serializer, owner=ConstantPayloadView)
+
+        with patch('responses.envelopes.PAYLOAD_CACHE_SIZE', 10):
+            for number in range(100):
+                encode_payload(f"User {number} is created", serializer, owner=ConstantPayloadView)
+                encode_payload("OK", serializer, owner=ConstantPayloadView)
+
+            self.assertEqual(len(_value_payloads), 10)
+
+            with patch.object(serializer, 'dumps', wraps=serializer.dumps) as mock_dumps:
+                encode_payload("OK", serializer, owner=ConstantPayloadView)
+                encode_payload(
+                    self.response_class.error_data, serializer, owner=ConstantPayloadView, constant_name="error_data",
+                )
+
+            mock_dumps.assert_not_called()
+
+    def test_overridden_verb_is_used(self):
+        self.response_class.log_response_as_info(data="OK", log_message="Test log message", status_code=200)
+        responses_settings = {**settings.DJANGO_HEAVEN["RESPONSES"], "DEFAULT_RESPONSE_VERB": "data"}
+        heaven_settings = {**settings.DJANGO_HEAVEN, "RESPONSES": responses_settings}
+
+        with override_settings(DJANGO_HEAVEN=heaven_settings):
+            constant_response = self.response_class.log_response_as_info(
+                data="OK", log_message="Test log message", status_code=200,
+            )
+            response = LoggedJsonResponseMixin().log_response_as_info(
+                data=[1, 2], log_message="Test log message", status_code=200,
+            )
+
+            self.assertEqual(constant_response.content, b'{"data":"OK"}')
+            self.assertEqual(json.loads(response.content), {"data": [1, 2]})
+            self.assertEqual(LoggedJsonResponseMixin().data_conversion_function([1, 2]), {"data": [1, 2]})
+
+        response = self.response_class.log_response_as_info(data="OK", log_message="Test log message", status_code=200)
+        self.assertEqual(response.content, b'{"detail":"OK"}')
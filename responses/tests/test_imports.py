@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+
+RESPONSES_MODULES = (
+    'responses.asynchronous', 'responses.base', 'responses.cache', 'responses.compression', 'responses.envelopes',
+    'responses.http', 'responses.json', 'responses.redirect', 'responses.rest_framework', 'responses.streaming',
+)
+
+
+class ResponsesImportTest(SimpleTestCase):
+    """ That is the test of the project that has only the RESPONSES settings """
+
+    def test_responses_work_without_services_settings(self):
+        code = "import django; django.setup(); " + "; ".join(f"import {module}" for module in RESPONSES_MODULES)
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'responses.tests.responses_only_settings'},
+        )
+
+        self.assertEqual(result.returncode, 0, result.stderr)
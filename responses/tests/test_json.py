@@ -1,8 +1,15 @@
+import datetime
+import json
+from unittest.mock import patch
+
 from django.http import JsonResponse
+from django.test import RequestFactory
 
 from responses.exceptions import ResponseProgrammingException
 from responses.json import LoggedJsonResponseMixin
+from responses.serializers import EncodedJsonResponse
 from responses.tests.base import BaseLoggedResponseMixinTest
+from services.pagination import KeysetPage
 
 
 class LoggedJsonResponseMixinTest(BaseLoggedResponseMixinTest):
@@ -48,3 +55,75 @@ class LoggedJsonResponseMixinTest(BaseLoggedResponseMixinTest):
             )
 
         self.testing_class().proxy_response_validation(JsonResponse(data={"data": 10}), status_code=200)
+
+    def test_keyset_page_envelope(self):
+        page = KeysetPage([{"id": 1}, {"id": 2}], next_cursor="next", prev_cursor=None)
+        response = self.response_class.log_response_as_info(
+            data=page, log_message="Test log message", status_code=200,
+        )
+
+        self.assertEqual(
+            json.loads(response.content),
+            {"detail": [{"id": 1}, {"id": 2}], "next_cursor": "next", "prev_cursor": None},
+        )
+
+    def test_json_response_kwargs(self):
+        for response_kwargs in ({'json_dumps_params': {'indent': 2}}, {'safe': False}):
+            with self.subTest(response_kwargs=response_kwargs):
+                for data in ("OK", self.info_data):
+                    response = self.response_class.log_response_as_info(
+                        data=data, log_message="Test log message", status_code=200,
+                        response_kwargs=response_kwargs,
+                    )
+
+                    self.assertEqual(json.loads(response.content), {"detail": data})
+
+        response = self.response_class.log_response_as_info(
+            data="OK", log_message="Test log message", status_code=200,
+            response_kwargs={'json_dumps_params': {'indent': 2}},
+        )
+        self.assertEqual(response.content, b'{\n  "detail": "OK"\n}')
+
+    def test_proxy_validation_modes(self):
+        unsafe_response = JsonResponse(data=[1, 2, 3], safe=False)
+
+        with patch.object(self.response_class, 'proxy_validation', 'sampled'), \
+                patch.object(self.response_class, 'proxy_validation_sample_rate', 0):
+            self.response_class.proxy_response_validation(JsonResponse(data={"data": 10}), status_code=200)
+
+            with self.assertRaises(ResponseProgrammingException):
+                self.response_class.proxy_response_validation(unsafe_response, status_code=200)
+
+            with patch('responses.validation.json.loads') as mock_loads:
+                safe_response = EncodedJsonResponse({"data": 10})
+                self.assertTrue(safe_response.safe_json)
+                self.response_class.proxy_response_validation(safe_response, status_code=200)
+                mock_loads.assert_not_called()
+
+        with patch.object(self.response_class, 'proxy_validation', 'off'):
+            self.response_class.proxy_response_validation(unsafe_response, status_code=200)
+
+    def test_conditional_get_not_modified(self):
+        request = RequestFactory().get('/', HTTP_IF_NONE_MATCH='"version-1"')
+
+        with patch.object(self.response_class, 'data_conversion_function') as mock_conversion, \
+                patch.object(self.response_class.logger_obj, 'info') as mock_logger:
+            response = self.response_class.log_response_as_info(
+                data=self.info_data, log_message="Test log message", status_code=200,
+                etag="version-1", last_modified=datetime.datetime(2021, 6, 1), request=request,
+            )
+
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], '"version-1"')
+            self.assertEqual(response['Last-Modified'], 'Tue, 01 Jun 2021 00:00:00 GMT')
+            mock_conversion.assert_not_called()
+            mock_logger.assert_called_once_with("Test log message")
+
+        response = self.response_class.log_response_as_info(
+            data=self.info_data, log_message="Test log message", status_code=200,
+            etag=lambda: "version-2", last_modified=datetime.datetime(2021, 6, 1), request=request,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"version-2"')
+        self.assertEqual(response['Last-Modified'], 'Tue, 01 Jun 2021 00:00:00 GMT')
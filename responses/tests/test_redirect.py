@@ -9,6 +9,7 @@ class LoggedRedirectResponseMixinTest(BaseLoggedResponseMixinTest):
     testing_class = LoggedRedirectResponseMixin
     info_data = HttpResponseRedirect("https://google.com")
     error_data = HttpResponseRedirect("https://example.com")
+    response_kwargs = {"redirect_code": 302}
 
     def _test_log_response_base(self, log_function: str):
         with patch.object(self.response_class.logger_obj, log_function) as mock_logger:
@@ -0,0 +1,55 @@
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+
+from responses.json import LoggedJsonResponseMixin
+from responses.serializers import EncodedJsonResponse, get_serializer, orjson
+
+
+class JsonSerializersTest(TestCase):
+    """ That is the tests for the JSON serializers of the LoggedJsonResponseMixin """
+    data = {
+        "datetime": datetime.datetime(2021, 6, 1, 12, 30, 15, 123456, tzinfo=timezone.utc),
+        "naive_datetime": datetime.datetime(2021, 6, 1, 12, 30, 15),
+        "date": datetime.date(2021, 6, 1),
+        "time": datetime.time(12, 30, 15, 123456),
+        "timedelta": datetime.timedelta(days=1, seconds=5),
+        "decimal": decimal.Decimal("10.50"),
+        "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "lazy": gettext_lazy("lazy string"),
+        "list": [1, "two", None, True],
+    }
+
+    def test_django_types_are_encoded_as_django_encodes_them(self):
+        expected = json.loads(json.dumps(self.data, cls=DjangoJSONEncoder))
+        names = ['django', 'json', 'fast'] + (['orjson'] if orjson is not None else [])
+
+        for name in names:
+            with self.subTest(serializer=name):
+                self.assertEqual(json.loads(get_serializer(name).dumps(self.data)), expected)
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            get_serializer('unknown')
+
+    def test_encoded_response_is_safe(self):
+        with self.assertRaises(TypeError):
+            EncodedJsonResponse([1, 2, 3])
+
+        response = EncodedJsonResponse([1, 2, 3], safe=False, serializer='json')
+        self.assertEqual(response.content, b'[1,2,3]')
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+    def test_per_view_serializer(self):
+        class View(LoggedJsonResponseMixin):
+            json_serializer = 'django'
+
+        response = View().log_response_as_info(data=[1, 2], log_message="Test log message", status_code=201)
+        self.assertEqual(response.content, b'{"detail": [1, 2]}')
+        self.assertEqual(response.status_code, 201)
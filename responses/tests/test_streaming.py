@@ -0,0 +1,171 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.test import TestCase, override_settings
+
+from responses.asynchronous import supports_async_streaming
+from responses.exceptions import ResponseProgrammingException
+from responses.json import LoggedJsonResponseMixin
+from responses.streaming import (
+    LoggedStreamingCsvResponseMixin, LoggedStreamingJsonResponseMixin, LoggedStreamingNdjsonResponseMixin,
+)
+
+
+class LoggedStreamingJsonResponseMixinTest(TestCase):
+    """ That is the tests for the LoggedStreamingJsonResponseMixin responses """
+    testing_class = LoggedStreamingJsonResponseMixin
+
+    def test_streams_iterable_in_envelope(self):
+        response_class = self.testing_class()
+
+        with patch.object(response_class.logger_obj, 'info') as mock_logger:
+            response = response_class.log_response_as_info(
+                data=({"id": index} for index in range(5)), log_message="Test log message", chunk_size=2,
+            )
+            mock_logger.assert_not_called()
+
+            chunks = list(response.streaming_content)
+            mock_logger.assert_called_once()
+
+        self.assertEqual(json.loads(b''.join(chunks)), {"detail": [{"id": index} for index in range(5)]})
+        self.assertEqual(len(chunks), 5)    # prefix, three chunks and suffix
+        self.assertIn("Streamed 5 rows", mock_logger.call_args[0][0])
+
+    def test_streams_queryset_fields(self):
+        get_user_model().objects.create(username="first")
+        get_user_model().objects.create(username="second")
+
+        response = self.testing_class().log_response_as_info(
+            data=get_user_model().objects.order_by('pk'), log_message="Test log message", fields=("username",),
+        )
+
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)),
+            {"detail": [{"username": "first"}, {"username": "second"}]},
+        )
+
+    def test_empty_stream(self):
+        response = self.testing_class().log_response_as_error(data=[], log_message="Test log message")
+        self.assertEqual(json.loads(b''.join(response.streaming_content)), {"detail": []})
+
+
+class LoggedStreamingExportResponseMixinsTest(TestCase):
+    """ That is the tests for the NDJSON and CSV streaming responses """
+
+    def setUp(self):
+        get_user_model().objects.create(username="first", first_name="First")
+        get_user_model().objects.create(username="second", first_name="Second")
+
+    def test_ndjson_stream(self):
+        response = LoggedStreamingNdjsonResponseMixin().log_response_as_info(
+            data=get_user_model().objects.order_by('pk'), log_message="Test log message",
+            fields=("username",), chunk_size=1,
+        )
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertEqual(b''.join(response.streaming_content), b'{"username":"first"}\n{"username":"second"}\n')
+
+    def test_model_instances_with_many_to_many_fields(self):
+        group = Group.objects.create(name="Group")
+        users = list(get_user_model().objects.order_by('pk'))
+        users[0].groups.add(group)
+
+        for testing_class in (LoggedStreamingJsonResponseMixin, LoggedStreamingNdjsonResponseMixin):
+            with self.subTest(testing_class=testing_class):
+                response = testing_class().log_response_as_info(data=users, log_message="Test log message")
+
+                with self.assertNumQueries(0):
+                    content = b''.join(response.streaming_content)
+
+                if testing_class is LoggedStreamingJsonResponseMixin:
+                    streamed_rows = json.loads(content)["detail"]
+                else:
+                    streamed_rows = [json.loads(line) for line in content.splitlines()]
+
+                self.assertEqual([row["username"] for row in streamed_rows], ["first", "second"])
+                self.assertEqual(streamed_rows[0]["id"], users[0].pk)
+                self.assertNotIn("groups", streamed_rows[0])
+
+    def test_csv_stream_selects_columns(self):
+        with patch.object(LoggedStreamingCsvResponseMixin, 'logger_obj') as mock_logger:
+            response = LoggedStreamingCsvResponseMixin().log_response_as_info(
+                data=get_user_model().objects.order_by('pk'), log_message="Test log message",
+                fields=("username", "first_name"),
+            )
+
+            self.assertEqual(
+                b''.join(response.streaming_content),
+                b'username,first_name\r\nfirst,First\r\nsecond,Second\r\n',
+            )
+            self.assertIn("Streamed 2 rows", mock_logger.info.call_args[0][0])
+
+    def test_streams_of_one_view_do_not_share_the_state(self):
+        view = LoggedStreamingCsvResponseMixin()
+        queryset = get_user_model().objects.order_by('pk')
+
+        full_response = view.log_response_as_info(data=queryset, log_message="Test log message", chunk_size=1)
+        username_response = view.log_response_as_info(
+            data=queryset, log_message="Test log message", fields=("username",), chunk_size=1,
+        )
+        full_stream, username_stream = iter(full_response.streaming_content), iter(username_response.streaming_content)
+        full_header, username_header = next(full_stream), next(username_stream)
+
+        full_rows = list(full_stream)
+        self.assertEqual(b''.join(username_stream), b'first\r\nsecond\r\n')
+        self.assertEqual(username_header, b'username\r\n')
+        self.assertTrue(full_header.startswith(b'id,password,last_login'))
+        self.assertEqual(len(full_rows[0].split(b',')), len(full_header.split(b',')))
+
+    def test_csv_stream_of_dictionaries(self):
+        response = LoggedStreamingCsvResponseMixin().log_response_as_info(
+            data=[{"b": 2, "a": 1}], log_message="Test log message", fields=("a", "b"),
+        )
+
+        self.assertEqual(b''.join(response.streaming_content), b'a,b\r\n1,2\r\n')
+
+
+async def rows():
+    for index in range(3):
+        yield {"id": index}
+
+
+@override_settings(DJANGO_HEAVEN={
+    **settings.DJANGO_HEAVEN,
+    "RESPONSES": {**settings.DJANGO_HEAVEN["RESPONSES"], "ASYNC_STREAMING_BRIDGE": True},
+})
+class AsyncStreamingResponseMixinsTest(TestCase):
+    """ That is the tests for the async versions of the streaming responses """
+
+    async def test_async_generator_stream(self):
+        with patch.object(LoggedStreamingJsonResponseMixin, 'logger_obj') as mock_logger:
+            response = await LoggedStreamingJsonResponseMixin().alog_response_as_info(
+                data=rows(), log_message="Test log message", chunk_size=2,
+            )
+
+            self.assertEqual(
+                json.loads(b''.join(response.streaming_content)),
+                {"detail": [{"id": 0}, {"id": 1}, {"id": 2}]},
+            )
+            self.assertIn("Streamed 3 rows", mock_logger.info.call_args[0][0])
+
+    async def test_awaitable_data_of_json_response(self):
+        async def data():
+            return [1, 2, 3]
+
+        response = await LoggedJsonResponseMixin().alog_response_as_info(
+            data=data(), log_message="Test log message", status_code=200,
+        )
+        self.assertEqual(json.loads(response.content), {"detail": [1, 2, 3]})
+
+
+@unittest.skipIf(supports_async_streaming(), "Django 4.2+ streams async iterators itself")
+class AsyncStreamingWithoutBridgeTest(TestCase):
+    """ Older Django blocks the event loop while it waits for the bridge, so we do not stream without permission """
+
+    async def test_async_stream_needs_the_bridge_setting(self):
+        with self.assertRaises(ResponseProgrammingException):
+            await LoggedStreamingJsonResponseMixin().alog_response_as_info(data=rows(), log_message="Test log message")
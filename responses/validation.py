@@ -0,0 +1,70 @@
+"""
+That file contains the validation of the proxied JsonResponse() objects.
+Decoding the whole response only to check that it is a dictionary doubles the cost of the large responses,
+so settings.DJANGO_HEAVEN.RESPONSES.PROXY_VALIDATION chooses how strict we are:
+    - 'off': we do not look at the content
+    - 'sampled' (default): responses that were created as safe ones are trusted, the other ones must start
+        with '{'. PROXY_VALIDATION_SAMPLE_RATE part of them (0.01 by default) is decoded completely
+    - 'full': every response is decoded, use it in your tests
+"""
+import json
+import random
+
+from responses.exceptions import ResponseProgrammingException
+
+
+OFF = 'off'
+SAMPLED = 'sampled'
+FULL = 'full'
+VALIDATION_MODES = (OFF, SAMPLED, FULL)
+
+_WHITESPACE = b' \t\n\r'
+
+
+def mark_safe_json(response, data):
+    """ Marks the response that was created from the dictionary, so we do not decode it again """
+    response.safe_json = isinstance(data, dict)
+    return response
+
+
+def starts_as_dict(content: bytes) -> bool:
+    """ O(1) check: the first byte of JSON that is not a whitespace must be '{' """
+    return content[:64].lstrip(_WHITESPACE)[:1] == b'{'
+
+
+def decodes_as_dict(response) -> bool:
+    """ Full check: decodes the whole content of the response """
+    try:
+        return isinstance(json.loads(response.content), dict)
+    except ValueError:
+        raise ResponseProgrammingException(f"Data provided in JsonResponse() cannot be decoded. Data: {response}")
+
+
+def validate_json_response(response, mode: str = SAMPLED, sample_rate: float = 0.01):
+    """ Raises ResponseProgrammingException if the content of the response is not a JSON dictionary """
+    if mode not in VALIDATION_MODES:
+        raise ResponseProgrammingException(f"Proxy validation mode must be one of {VALIDATION_MODES}, not '{mode}'")
+    elif mode == OFF:
+        return
+
+    if mode == FULL or random.random() < sample_rate:
+        is_dict = decodes_as_dict(response)
+    else:
+        is_dict = getattr(response, 'safe_json', False) or starts_as_dict(response.content)
+
+    if not is_dict:
+        raise ResponseProgrammingException(
+            "JsonResponse() must be a safe one. Change your response structure to a dictionary"
+        )
+
+
+__all__ = [
+    'FULL',
+    'OFF',
+    'SAMPLED',
+    'VALIDATION_MODES',
+    'decodes_as_dict',
+    'mark_safe_json',
+    'starts_as_dict',
+    'validate_json_response',
+]
@@ -0,0 +1,163 @@
+"""
+That file contains the tools for the async services.
+Django ORM is synchronous, and its async methods only hop into one shared thread, so the concurrent
+service calls would wait for each other. Instead, we run service functions in a bounded thread pool
+that you can size with settings.DJANGO_HEAVEN.SERVICES.ASYNC_MAX_WORKERS. That way your async views can
+fan out multiple service calls with asyncio.gather() without blocking the event loop.
+"""
+import asyncio
+import contextvars
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+
+from services.metrics import current_query_counter
+
+
+# responses.streaming uses that file, so it works without the SERVICES settings
+SERVICES_SETTINGS = settings.DJANGO_HEAVEN.get('SERVICES', {})
+
+ASYNC_MAX_WORKERS = SERVICES_SETTINGS.get('ASYNC_MAX_WORKERS', 10)
+# Worker threads keep their connections between the calls, we reconnect after that many seconds. None never does
+ASYNC_CONNECTION_MAX_AGE = SERVICES_SETTINGS.get('ASYNC_CONNECTION_MAX_AGE', 60)
+
+_executor = None
+_iteration_executors = []
+_iteration_turns = itertools.count()
+_executor_lock = threading.Lock()
+_worker_state = threading.local()
+
+
+def get_service_executor() -> ThreadPoolExecutor:
+    """ Returns the bounded executor that runs all the async service functions """
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=ASYNC_MAX_WORKERS, thread_name_prefix='django_heaven_service',
+                )
+
+    return _executor
+
+
+def get_iteration_executor() -> ThreadPoolExecutor:
+    """
+    Returns one of ASYNC_MAX_WORKERS single-thread executors for the iterations. Server-side cursors are bound
+    to the connection of the thread that opened them, so the whole iteration runs in the same thread,
+    and the iterations take turns between the executors.
+    """
+    with _executor_lock:
+        if not _iteration_executors:
+            _iteration_executors.extend(
+                ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'django_heaven_iteration_{index}')
+                for index in range(ASYNC_MAX_WORKERS)
+            )
+
+    return _iteration_executors[next(_iteration_turns) % len(_iteration_executors)]
+
+
+def release_connections():
+    """
+    Worker threads live longer than requests, but we do not close their connections after every call
+    as close_old_connections() does with CONN_MAX_AGE=0, since every call would connect again.
+    We only close the broken connections and the ones older than ASYNC_CONNECTION_MAX_AGE.
+    """
+    opened_at = getattr(_worker_state, 'opened_at', None)
+    if opened_at is None:
+        opened_at = _worker_state.opened_at = {}
+
+    now = time.monotonic()
+
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            opened_at.pop(connection.alias, None)
+            continue
+
+        # We remember the time of the first call that saw that connection object
+        opened = opened_at.get(connection.alias)
+        if opened is None or opened[0] != id(connection.connection):
+            opened = opened_at[connection.alias] = (id(connection.connection), now)
+
+        if connection.errors_occurred:
+            if not connection.is_usable():
+                connection.close()
+                continue
+
+            connection.errors_occurred = False
+
+        if ASYNC_CONNECTION_MAX_AGE is not None and now - opened[1] >= ASYNC_CONNECTION_MAX_AGE:
+            connection.close()
+
+
+def _run_with_connections(function: callable, *args, **kwargs):
+    """ Runs the function in the worker thread with the healthy connections """
+    release_connections()
+    counter = current_query_counter.get()
+
+    try:
+        if counter is None:
+            return function(*args, **kwargs)
+
+        with counter.wrap_connections():
+            return function(*args, **kwargs)
+    finally:
+        release_connections()
+
+
+def run_in_service_executor(function: callable, *args, **kwargs) -> asyncio.Future:
+    """ Runs the synchronous function in the service executor and returns the awaitable result """
+    context = contextvars.copy_context()
+
+    return asyncio.get_running_loop().run_in_executor(
+        get_service_executor(),
+        functools.partial(context.run, _run_with_connections, function, *args, **kwargs),
+    )
+
+
+async def iterate_in_thread(iterator_factory: callable, chunk_size: int):
+    """
+    Async generator over the synchronous iterator that iterator_factory() returns.
+    The whole iteration runs in one thread of get_iteration_executor(), so the number of the iteration
+    threads is bounded by ASYNC_MAX_WORKERS too. We fetch chunk_size items per thread hop.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    executor = get_iteration_executor()
+
+    def run(function: callable, *args):
+        return loop.run_in_executor(executor, functools.partial(context.run, function, *args))
+
+    def close_iterator(iterator):
+        try:
+            getattr(iterator, 'close', lambda: None)()
+        finally:
+            release_connections()
+
+    iterator = await run(lambda: iter(iterator_factory()))
+
+    try:
+        while True:
+            chunk = await run(lambda: list(itertools.islice(iterator, chunk_size)))
+            if not chunk:
+                return
+
+            for item in chunk:
+                yield item
+    finally:
+        await run(close_iterator, iterator)
+
+
+__all__ = [
+    'get_iteration_executor',
+    'get_service_executor',
+    'iterate_in_thread',
+    'release_connections',
+    'run_in_service_executor',
+]
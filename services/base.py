@@ -5,13 +5,32 @@ Instead, your code will have different services for various models. Every servic
 ORM queries with logging and custom error handling. That is, you will split your views and serializers
 to work with business logic in services.
 """
+import hashlib
+import inspect
+import time
+
 from django.conf import settings
-from django.db.models import Model
+from django.db import InterfaceError, OperationalError, router, transaction
+from django.db.models import Count, Max, Min, Model, Q, QuerySet
 
+from common.queue_logging import configured_logger
+from services.asynchronous import iterate_in_thread, run_in_service_executor
+from services.bulk import BulkOperationReport, chunked, supports_update_conflicts, unique_fields_query
+from services.cache import ServiceCache
+from services.context import get_service_context, service_context
 from services.exceptions import ServiceException, ServiceProgrammingException
+from services.formatting import format_result
+from services.identity import get_identity_map
+from services.loader import ServiceLoader
+from services.nplusone import track_queryset
+from services.pagination import KeysetPage, decode_cursor, encode_cursor, keyset_query, parse_order, row_values
+from services.replicas import replica_selector
+from services.unit_of_work import get_unit_of_work, open_unit_of_work
+from services.versions import is_model_version_tracked, record_model_write
 from services.decorators import ServiceFunctionDecorator, service_function_for_write
 
 SERVICES_SETTINGS = settings.DJANGO_HEAVEN['SERVICES']
+QUERY_PROFILE_METHODS = ('select_related', 'prefetch_related', 'only', 'defer')
 
 
 class BaseService:
@@ -19,11 +38,48 @@ class BaseService:
     model: Model = None    # your django ORM model
     read_only: bool = False  # if you only want to read from that model. May be useful for the read-only models
     raise_exception: bool = SERVICES_SETTINGS.get('RAISE_EXCEPTION', True)
-    logger_obj = SERVICES_SETTINGS.get('LOGGER_OBJ')
+    logger_obj = configured_logger(SERVICES_SETTINGS)
+    cache: ServiceCache = None  # assign ServiceCache() if you want to cache get() results of that service
+    # Writes bump the data version of the model, see services.versions and responses.cache.
+    # None bumps only the versions of the tracked models, e.g. cache_models of the cached views
+    track_data_versions: bool = SERVICES_SETTINGS.get('TRACK_DATA_VERSIONS')
+    bulk_batch_size: int = SERVICES_SETTINGS.get('BULK_BATCH_SIZE', 1000)
+    iteration_chunk_size: int = SERVICES_SETTINGS.get('ITERATION_CHUNK_SIZE', 2000)
+    page_size: int = SERVICES_SETTINGS.get('PAGE_SIZE', 50)
+
+    # Default relations and fields that get(), filter(), all(), first() and last() load
+    select_related_fields: tuple = ()
+    prefetch_related_fields: tuple = ()
+    only_fields: tuple = ()
+    defer_fields: tuple = ()
+    # Named sets of the arguments above that you can pick with query_profile='name' argument, e.g.:
+    # {"detailed": {"select_related": ("profile",), "prefetch_related": ("groups",)}}
+    query_profiles: dict = {}
+    detect_n_plus_one: bool = SERVICES_SETTINGS.get('DETECT_N_PLUS_ONE', settings.DEBUG)
+
+    # Sampling of the info messages and de-duplication of the error messages, see common.log_sampling
+    log_sample_rate: float = SERVICES_SETTINGS.get('LOG_SAMPLE_RATE')
+    log_first_n: int = SERVICES_SETTINGS.get('LOG_FIRST_N')
+    log_sample_interval: float = SERVICES_SETTINGS.get('LOG_SAMPLE_INTERVAL', 1)
+    error_dedup_window: float = SERVICES_SETTINGS.get('ERROR_DEDUP_WINDOW')
+
+    read_replicas: tuple = tuple(SERVICES_SETTINGS.get('READ_REPLICAS', ()))
+    # None means that only read_only services read from the replicas, set True to route reads of that service too
+    route_reads_to_replicas: bool = None
+    # After a write through that service we read from the primary for that many seconds in the same request
+    read_your_writes_window: float = SERVICES_SETTINGS.get('READ_YOUR_WRITES_WINDOW', 5)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        if cls.cache is not None and cls.model is not None:
+            cls.cache.connect(cls.model)
 
     def __init__(self, objects=None, instance=None):
         class_name = self.__class__.__name__
-        self._objects = objects or self.model.objects
+        # We do not use 'objects or' here, because bool() evaluates the queryset
+        self._objects = objects if objects is not None else self.model.objects
+        self._last_write_at = None
 
         if self.model is None:
             raise ValueError(f"You need to assign model in {class_name}")
@@ -45,24 +101,339 @@ class BaseService:
         if self.raise_exception:
             raise ServiceException(exc)
 
+    def _get_query_profile(self, query_profile: str = None) -> dict:
+        if query_profile is None:
+            return {
+                "select_related": self.select_related_fields,
+                "prefetch_related": self.prefetch_related_fields,
+                "only": self.only_fields,
+                "defer": self.defer_fields,
+            }
+
+        try:
+            return self.query_profiles[query_profile]
+        except KeyError:
+            raise ServiceProgrammingException(
+                f"Query profile '{query_profile}' is not declared in {self.__class__.__name__}.query_profiles",
+            )
+
+    def record_write(self):
+        """
+        Remembers the time of the write, so that the following reads go to the primary database,
+        clears the request loaders of the model and bumps its data version.
+        service_function_for_write calls it for you.
+        """
+        self._record_data_version()
+        context = get_service_context()
+
+        if context is None:
+            self._last_write_at = time.monotonic()
+            return
+
+        context.last_writes[self.__class__] = time.monotonic()
+
+        for loader in context.loaders.values():    # loaded instances of that model may be stale now
+            if loader.service.model is self.model:
+                loader.clear()
+
+    def _record_data_version(self):
+        if self.model is None or self.track_data_versions is False:
+            return
+
+        if self.track_data_versions or is_model_version_tracked(self.model):
+            record_model_write(self.model)
+
+    def _has_recent_write(self) -> bool:
+        context = get_service_context()
+        last_write_at = self._last_write_at if context is None else context.last_writes.get(self.__class__)
+        return last_write_at is not None and time.monotonic() - last_write_at < self.read_your_writes_window
+
+    def _replica_alias(self):
+        """ Returns the replica alias for the read, or None if we must read from the primary database """
+        if not self.read_replicas:
+            return None
+
+        route_reads = self.read_only if self.route_reads_to_replicas is None else self.route_reads_to_replicas
+        if not route_reads or getattr(self._objects, '_db', None) is not None or self._has_recent_write():
+            return None
+
+        return replica_selector.choose(self.read_replicas)
+
+    def _read(self, read_function: callable, query_profile: str = None):
+        """
+        Calls read_function(objects) with the objects of the query profile on the chosen replica.
+        If the replica fails during the read, we mark it as failed and repeat the read on the primary.
+        Lazy querysets are only checked when we choose the replica.
+        """
+        alias = self._replica_alias()
+        if alias is None:
+            return read_function(self._profiled_objects(query_profile))
+
+        try:
+            with replica_selector.track(alias):
+                return read_function(self._profiled_objects(query_profile, using=alias))
+        except (InterfaceError, OperationalError) as exc:
+            replica_selector.mark_failed(alias)
+            self.logger_obj.warning(
+                f"Replica '{alias}' failed in {self.__class__.__name__}, reading from the primary. Exception: {exc}",
+            )
+
+            return read_function(self._profiled_objects(query_profile, using=self._write_alias()))
+
+    def _write_alias(self, using: str = None) -> str:
+        """
+        Returns the database for the writes. Instances and querysets may come from the replica reads,
+        so we never take the database from them as save(using=None) does.
+        """
+        return using or router.db_for_write(self.model)
+
+    def _profiled_objects(self, query_profile: str = None, using: str = None):
+        """ Returns self._objects with select_related(), prefetch_related(), only() and defer() of the profile """
+        objects = self._objects if using is None else self._objects.using(using)
+
+        for method_name, fields in self._get_query_profile(query_profile).items():
+            if method_name not in QUERY_PROFILE_METHODS:
+                raise ServiceProgrammingException(
+                    f"Query profile can only contain {QUERY_PROFILE_METHODS} in {self.__class__.__name__}",
+                )
+            if fields:
+                objects = getattr(objects, method_name)(*fields)
+
+        return objects
+
+    def _track_n_plus_one(self, queryset):
+        """ Marks the instances of the queryset, so that we can detect their lazy relation loads """
+        return track_queryset(queryset, self.__class__) if self.detect_n_plus_one else queryset
+
+    def batch(self):
+        """
+        Opens the request scope for the loaders, use it outside of the requests:
+        with service.batch(): ...
+        """
+        return service_context()
+
+    def loader(self, field: str = 'pk') -> ServiceLoader:
+        """
+        Returns the batching loader of that service for the field. Inside of the request scope
+        we return the same loader for the whole request, and get(field=key) uses its loaded instances.
+        The request loader is shared by all the services of that class, so it loads from all the rows
+        of the model even if that service is filtered.
+        """
+        context = get_service_context()
+        if context is None:
+            return ServiceLoader(self, field=field)
+
+        try:
+            return context.loaders[(self.__class__, field)]
+        except KeyError:
+            loader = context.loaders[(self.__class__, field)] = ServiceLoader(self.__class__(), field=field)
+            return loader
+
+    def _active_loader(self, args: tuple, model_fields: dict, query_profile: str = None):
+        """
+        Returns (loader, key) if get() can be served by the request loader, (None, None) otherwise.
+        Loader does not know the filters of that service, so filtered services always query the database.
+        """
+        context = get_service_context()
+        if (
+            context is None or not context.loaders or args or query_profile is not None or len(model_fields) != 1
+            or self._objects is not self.model.objects
+        ):
+            return None, None
+
+        (lookup, key), = model_fields.items()
+        if lookup == self.model._meta.pk.name:
+            lookup = 'pk'
+
+        return context.loaders.get((self.__class__, lookup)), key
+
+    def _identity_key(self, args: tuple, model_fields: dict, query_profile: str = None):
+        """ Returns the primary key if get() can be served by the identity map, None otherwise """
+        if args or query_profile is not None or len(model_fields) != 1 or self._objects is not self.model.objects:
+            return None
+
+        (lookup, key), = model_fields.items()
+        pk_field = self.model._meta.pk
+        return key if lookup in ('pk', pk_field.name, pk_field.attname) else None
+
+    def _remember_identity(self, instance):
+        """ Returns the instance that the identity map keeps for that row, or the instance itself """
+        identity_map = get_identity_map()
+        if identity_map is None or not isinstance(instance, Model):
+            return instance
+
+        return identity_map.add(instance)
+
+    def conditional_validators(self, last_modified_field: str = None) -> dict:
+        """
+        Returns etag and last_modified of the rows of the service for the conditional responses,
+        computed with one aggregate query. Provide last_modified_field, e.g. 'updated_at', otherwise
+        only the created and deleted rows change the etag:
+            self.log_response_as_info(data=..., log_message=..., **service.conditional_validators('updated_at'))
+        """
+        aggregates = {"rows_count": Count('pk'), "max_pk": Max('pk')}
+        if last_modified_field is not None:
+            aggregates["last_modified"] = Max(last_modified_field)
+
+        values = self._read(lambda objects: objects.aggregate(**aggregates))
+        version = f"{self.model._meta.label}:{values['rows_count']}:{values['max_pk']}:{values.get('last_modified')}"
+
+        return {
+            "etag": hashlib.md5(version.encode()).hexdigest(),
+            "last_modified": values.get('last_modified'),
+        }
+
+    def fetch_many(self, keys, field: str = 'pk', query_profile: str = None) -> dict:
+        """ Loads the instances with one field__in query and returns them as {key: instance}, foreign keys are ids """
+        attname = (self.model._meta.pk if field == 'pk' else self.model._meta.get_field(field)).attname
+        instances = self._read(lambda objects: objects.filter(**{f"{field}__in": keys}), query_profile)
+        return {getattr(instance, attname): instance for instance in instances}
+
+    @ServiceFunctionDecorator()
+    def get_many(self, keys, field: str = 'pk', query_profile: str = None):
+        """
+        Loads all the keys with one query. Keys are deduplicated, but the result keeps their order:
+        it is a list of instances in the order of keys with None for the missing ones.
+        """
+        loader = ServiceLoader(self, field=field)
+        keys = [loader.normalize_key(key) for key in keys]
+        instances = self.fetch_many(list(dict.fromkeys(keys)), field=field, query_profile=query_profile)
+        return [instances.get(key) for key in keys]
+
     @ServiceFunctionDecorator()
-    def get(self, *args, **model_fields):
+    def get(self, *args, query_profile: str = None, **model_fields):
         if not args and not model_fields:
             raise ServiceProgrammingException("You need to provide *args or **kwargs in service get() function")
 
-        return self._objects.get(*args, **model_fields)
+        identity_map, pk = get_identity_map(), self._identity_key(args, model_fields, query_profile)
+        if identity_map is not None and pk is not None:
+            instance = identity_map.get(self.model, pk)
+
+            if instance is not None:
+                return instance
+
+        loader, key = self._active_loader(args, model_fields, query_profile)
+        if loader is not None:
+            instance = loader.load_now(key)  # that loads all the keys queued in the request with one query
+
+            if instance is None:
+                raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+
+            return self._remember_identity(instance)
+
+        def load():
+            return self._read(lambda objects: objects.get(*args, **model_fields), query_profile)
+
+        if self.cache is not None and not args and self._objects is self.model.objects:
+            return self._remember_identity(self.cache.get_or_set(
+                model=self.model, lookup={**model_fields, '__query_profile__': query_profile}, loader=load,
+            ))
+
+        return self._remember_identity(load())
 
     @ServiceFunctionDecorator()
-    def filter(self, *args, **model_fields):
-        return self._objects.filter(*args, **model_fields)
+    def filter(self, *args, query_profile: str = None, **model_fields):
+        return self._track_n_plus_one(
+            self._read(lambda objects: objects.filter(*args, **model_fields), query_profile),
+        )
 
     @ServiceFunctionDecorator()
-    def all(self):
-        return self._objects.all()
+    def all(self, query_profile: str = None):
+        return self._track_n_plus_one(self._read(lambda objects: objects.all(), query_profile))
 
     @ServiceFunctionDecorator()
     def order_by(self, *args):
-        return self._objects.order_by(*args)
+        return self._track_n_plus_one(self._read(lambda objects: objects.order_by(*args)))
+
+    def _invalidate_cache(self, using: str = None):
+        """
+        Invalidates the service cache after the writes that do not send post_save/post_delete signals.
+        update() and delete() are covered by the signals. We do not know which rows were written,
+        so the identity map forgets all the instances of the model too.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self.model, using=self._write_alias(using))
+
+        self._record_data_version()
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            identity_map.remove_model(self.model)
+
+    @ServiceFunctionDecorator()
+    def iterate(self, chunk_size: int = None, values: tuple = None, values_list: tuple = None, flat: bool = False):
+        """
+        Streams the rows of the service with QuerySet.iterator(), so you can walk through millions of rows
+        in constant memory. Databases that support server-side cursors will use them.
+        The result of the returned service is the iterator, and the info message is logged when it is exhausted.
+
+        Arguments you can provide:
+            - chunk_size: how many rows we fetch from the database at once
+            - values: fields for the values() projection
+            - values_list: fields for the values_list() projection
+            - flat: flat argument of the values_list()
+        """
+        queryset = self._read(lambda objects: objects.all())
+
+        if values is not None:
+            queryset = queryset.values(*values)
+        elif values_list is not None:
+            queryset = queryset.values_list(*values_list, flat=flat)
+
+        yield from queryset.iterator(chunk_size=chunk_size or self.iteration_chunk_size)
+
+    @ServiceFunctionDecorator()
+    def paginate(
+        self, after: str = None, before: str = None, limit: int = None,
+        order: tuple = ('pk',), values: tuple = None,
+    ):
+        """
+        Keyset pagination: we filter by the ordering values of the cursor row instead of using OFFSET,
+        so deep pages cost the same as the first one if you have an index on the order fields.
+
+        Arguments you can provide:
+            - after: next_cursor of the previous page
+            - before: prev_cursor of the previous page
+            - limit: page size, defaults to page_size of the service
+            - order: ordering fields, the combination must be unique, so finish it with 'pk'.
+                Order fields must not be NULL
+            - values: fields for the values() projection, order fields are always added to them
+        :returns: KeysetPage() - the list of rows with next_cursor and prev_cursor
+        """
+        if after is not None and before is not None:
+            raise ServiceProgrammingException(f"Provide either 'after' or 'before' in {self.__class__.__name__}")
+
+        limit = limit or self.page_size
+        parsed_order = parse_order(order)
+        backwards = before is not None
+        cursor = before if backwards else after
+        queryset = self._read(lambda objects: objects.all())
+
+        if cursor is not None:
+            queryset = queryset.filter(keyset_query(parsed_order, decode_cursor(cursor), backwards=backwards))
+        if values is not None:
+            queryset = queryset.values(*values, *(field for field, _ in parsed_order if field not in values))
+
+        rows = list(queryset.order_by(*(
+            f"-{field}" if descending != backwards else field for field, descending in parsed_order
+        ))[:limit + 1])
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return KeysetPage(rows)
+
+        # When we go backwards, there is always the page that we came from
+        has_next = backwards or has_more
+        has_previous = has_more if backwards else after is not None
+
+        return KeysetPage(
+            rows,
+            next_cursor=encode_cursor(row_values(rows[-1], parsed_order)) if has_next else None,
+            prev_cursor=encode_cursor(row_values(rows[0], parsed_order)) if has_previous else None,
+        )
 
     def _get_argument_from_kwargs(self, kwargs: dict, argument: str):
         try:
@@ -78,19 +449,20 @@ class BaseService:
         return instance.refresh_from_db(fields=kwargs.get('fields'), using=kwargs.get('using'))
 
     @ServiceFunctionDecorator()
-    def first(self):
-        return self._objects.first()
+    def first(self, query_profile: str = None):
+        return self._remember_identity(self._read(lambda objects: objects.first(), query_profile))
 
     @ServiceFunctionDecorator()
-    def last(self):
-        return self._objects.last()
+    def last(self, query_profile: str = None):
+        return self._remember_identity(self._read(lambda objects: objects.last(), query_profile))
 
     @service_function_for_write
-    @ServiceFunctionDecorator()
+    @ServiceFunctionDecorator(bufferable=True)
     def update(self, **kwargs):
         """
         Provide named-only argument 'instance' that will act as an instance you want to update.
         That method will automatically use 'update_fields' for the fields that you want to update.
+        Inside of the unit_of_work() we set the values and write them when the unit is flushed.
 
         Arguments you can provide:
             - instance!: the instance that you want to update
@@ -98,11 +470,21 @@ class BaseService:
         """
         instance = self._get_argument_from_kwargs(kwargs=kwargs, argument='instance')
         using_argument: str = kwargs.get('using')
+        fields = {field: value for field, value in kwargs.items() if field not in ('instance', 'using')}
 
-        for field, value in kwargs.items():
+        for field, value in fields.items():
             setattr(instance, field, value)
 
-        instance.save(update_fields=kwargs.keys(), force_update=True, using=using_argument)
+        unit = get_unit_of_work()
+        if unit is None:
+            instance.save(update_fields=fields.keys(), force_update=True, using=self._write_alias(using_argument))
+        else:
+            unit.update(self, instance, fields.keys())
+
+        identity_map = get_identity_map()
+        if identity_map is not None:    # the updated instance has the newest data of that row
+            identity_map.add(instance, replace=True)
+
         return instance
 
     def model_create_method(self) -> callable:
@@ -114,24 +496,172 @@ class BaseService:
         return self.model.objects.create
 
     @service_function_for_write
-    @ServiceFunctionDecorator()
+    @ServiceFunctionDecorator(bufferable=True)
     def create(self, *args, **kwargs):
-        """Provide arguments to create an instance of your model."""
+        """
+        Provide arguments to create an instance of your model.
+        Inside of the unit_of_work() we return the unsaved instance and create it when the unit is flushed.
+        Services with their own model_create_method() always create immediately.
+        """
+        unit = get_unit_of_work()
+
+        if unit is not None and type(self).model_create_method is BaseService.model_create_method:
+            return unit.create(self, self.model(*args, **kwargs))
+
         instance = self.model_create_method()(*args, **kwargs)
-        return instance
+        return self._remember_identity(instance)
 
     @service_function_for_write
-    @ServiceFunctionDecorator()
+    @ServiceFunctionDecorator(bufferable=True)
     def delete(self, **kwargs):
-        """ Delete an instance of your model """
+        """
+        Delete an instance of your model. Inside of the unit_of_work() we delete it when the unit is flushed.
+
+        Arguments you can provide:
+            - instance!: the instance that you want to delete
+            - using: what database you want to use
+        """
         instance = self._get_argument_from_kwargs(kwargs, argument='instance')
-        instance.delete()
+        pk = instance.pk    # delete() sets the primary key to None
+
+        unit = get_unit_of_work()
+        if unit is None:
+            instance.delete(using=self._write_alias(kwargs.get('using')))
+        else:
+            unit.delete(self, instance)
+
+        identity_map = get_identity_map()
+        if identity_map is not None:
+            identity_map.remove(self.model, pk)
 
-    def _bulk_operation(self, bulk_function, **kwargs):
+    def unit_of_work(self, using: str = None):
+        """
+        Buffers create(), update() and delete() of all the services inside of the block
+        and flushes them as bulk statements in one transaction at its end:
+
+            with service.unit_of_work():
+                for row in rows:
+                    service.create(**row)
+
+        Provide using if you do not want to write into router.db_for_write() of the service model.
+        """
+        return open_unit_of_work(self, using=using)
+
+    def _where_queryset(self, filters):
+        """ Returns the queryset for the set-based functions, filters are either Q() or a dictionary """
+        if isinstance(filters, Q):
+            return self._objects.filter(filters)
+        elif isinstance(filters, dict):
+            return self._objects.filter(**filters)
+
+        raise ServiceProgrammingException(
+            f"filters must be a dictionary or Q() object in {self.__class__.__name__}",
+        )
+
+    def _primary_key_ranges(self, queryset: QuerySet, chunk_size: int):
+        """ Yields (start, end) ranges of the integer primary keys, so that every chunk locks fewer rows """
+        bounds = queryset.aggregate(min_pk=Min('pk'), max_pk=Max('pk'))
+        min_pk, max_pk = bounds['min_pk'], bounds['max_pk']
+
+        if min_pk is None:
+            return
+        elif not isinstance(min_pk, int):
+            raise ServiceProgrammingException(
+                f"chunk_size can only be used with integer primary keys in {self.__class__.__name__}",
+            )
+
+        for start in range(min_pk, max_pk + 1, chunk_size):
+            yield start, start + chunk_size
+
+    def _set_based_operation(
+        self, queryset: QuerySet, operation: callable, chunk_size: int = None, using: str = None,
+    ) -> int:
+        """
+        Runs operation(queryset) -> affected rows count once or for every primary key range.
+        Every range runs in its own transaction. Querysets of the replica reads are written into the primary.
+        """
+        if using is None and queryset._db not in self.read_replicas:
+            using = queryset._db
+
+        using = self._write_alias(using)
+        queryset = queryset.using(using)
+
+        try:
+            if chunk_size is None:
+                return operation(queryset)
+
+            affected_rows = 0
+            for start, end in self._primary_key_ranges(queryset, chunk_size):
+                with transaction.atomic(using=using):
+                    affected_rows += operation(queryset.filter(pk__gte=start, pk__lt=end))
+
+            return affected_rows
+        finally:
+            self._invalidate_cache(using)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    def update_where(self, filters, chunk_size: int = None, using: str = None, **values):
+        """
+        Updates all the rows that match filters with one UPDATE query, without loading the instances.
+        Provide chunk_size if you want to update the rows in primary key ranges, every range in its
+        own transaction, so that you do not lock the whole table for a long time.
+        Provide using if you do not want to write into router.db_for_write() of the service model.
+        Mind that QuerySet.update() does not call save() and does not send post_save signals.
+        :returns: the number of updated rows, use $result$ in order to log it
+        """
+        if not values:
+            raise ServiceProgrammingException(f"You need to provide values in {self.__class__.__name__}.update_where()")
+
+        return self._set_based_operation(
+            queryset=self._where_queryset(filters),
+            operation=lambda queryset: queryset.update(**values),
+            chunk_size=chunk_size,
+            using=using,
+        )
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    def delete_where(self, filters, chunk_size: int = None, using: str = None):
+        """
+        Deletes all the rows that match filters with QuerySet.delete(), without loading the instances
+        in your code. chunk_size and using work as they do in update_where().
+        :returns: the number of deleted rows, including the cascade ones
+        """
+        return self._set_based_operation(
+            queryset=self._where_queryset(filters),
+            operation=lambda queryset: queryset.delete()[0],
+            chunk_size=chunk_size,
+            using=using,
+        )
+
+    def _build_instance(self, instance):
+        """ Builds the model instance from the dictionary. Model instances are returned as they are """
+        return instance if isinstance(instance, self.model) else self.model(**instance)
+
+    def _bulk_operation(self, bulk_function: callable, **kwargs) -> BulkOperationReport:
+        """
+        Splits instances into chunks of batch_size and calls bulk_function(chunk, manager) for every chunk
+        in its own transaction. bulk_function() must return the number of rows that it wrote.
+        """
         instances = self._get_argument_from_kwargs(kwargs, 'instances')
-        return bulk_function([
-            self.model(**instance) for instance in instances
-        ], **kwargs.get('arguments'))
+        batch_size = kwargs.get('batch_size') or self.bulk_batch_size
+        using = self._write_alias(kwargs.get('using'))
+        manager = self.model.objects.db_manager(using)
+        report = BulkOperationReport()
+
+        try:
+            for chunk in chunked(instances, batch_size):
+                started_at = report.measure()
+
+                with transaction.atomic(using=using):
+                    count = bulk_function(chunk, manager)
+
+                report.add(count=count, started_at=started_at)
+        finally:
+            self._invalidate_cache(using)
+
+        return report
 
     @service_function_for_write
     @ServiceFunctionDecorator()
@@ -143,16 +673,222 @@ class BaseService:
             {"arg" 1},
             {"arg": 2}
         ]
+        instances may be any iterable or generator, we build and write them in chunks.
+
+        Arguments you can provide:
+            - instances!: dictionaries or model instances that you want to create
+            - batch_size: how many instances we write in one transaction
+            - using: what database you want to use
+            - arguments: additional arguments for the QuerySet.bulk_create(), e.g. ignore_conflicts
+        :returns: BulkOperationReport() with counts and timings of every chunk
         """
-        return self._bulk_operation(bulk_function=self.model.objects.bulk_create, **kwargs,)
+        arguments = kwargs.get('arguments') or {}
+
+        def bulk_create_chunk(chunk: list, manager) -> int:
+            return len(manager.bulk_create([self._build_instance(instance) for instance in chunk], **arguments))
+
+        return self._bulk_operation(bulk_function=bulk_create_chunk, **kwargs)
 
     @service_function_for_write
-    @ServiceFunctionDecorator
+    @ServiceFunctionDecorator()
     def bulk_update(self, **kwargs):
-        return self._bulk_operation(bulk_function=self.model.objects.bulk_create, **kwargs,)
+        """
+        Use that to update a lot of models at once. Every instance must contain the primary key.
+        Arguments are the same as in bulk_create(), and:
+            - fields!: the fields that you want to update
+        """
+        fields = self._get_argument_from_kwargs(kwargs, 'fields')
+        arguments = kwargs.get('arguments') or {}
+
+        def bulk_update_chunk(chunk: list, manager) -> int:
+            instances = [self._build_instance(instance) for instance in chunk]
+            updated = manager.bulk_update(instances, fields, **arguments)
+            return len(instances) if updated is None else updated  # Django < 4.0 returns None
+
+        return self._bulk_operation(bulk_function=bulk_update_chunk, **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    def bulk_upsert(self, **kwargs):
+        """
+        Use that to create the instances or update them if they conflict on unique_fields.
+        Instances must be dictionaries. Arguments are the same as in bulk_create(), and:
+            - unique_fields!: the fields that identify the existing rows
+            - update_fields!: the fields that you want to update in the existing rows
+        On Django older than 4.1 we select the existing rows of every chunk and split it
+        into bulk_update() and bulk_create() calls.
+        """
+        unique_fields = tuple(self._get_argument_from_kwargs(kwargs, 'unique_fields'))
+        update_fields = tuple(self._get_argument_from_kwargs(kwargs, 'update_fields'))
+
+        def native_upsert_chunk(chunk: list, manager) -> int:
+            return len(manager.bulk_create(
+                [self._build_instance(instance) for instance in chunk],
+                update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields,
+            ))
+
+        def select_and_upsert_chunk(chunk: list, manager) -> int:
+            # If the same row appears in the chunk twice, the last one wins
+            rows = list({tuple(row[field] for field in unique_fields): row for row in chunk}.values())
+            existing_rows = manager.filter(unique_fields_query(rows, unique_fields)).select_for_update()
+            existing_pks = {
+                tuple(values[1:]): values[0] for values in existing_rows.values_list('pk', *unique_fields)
+            }
+
+            to_update, to_create = [], []
+            for row in rows:
+                pk = existing_pks.get(tuple(row[field] for field in unique_fields))
+
+                if pk is None:
+                    to_create.append(self._build_instance(row))
+                else:
+                    to_update.append(self._build_instance({**row, 'pk': pk}))
+
+            if to_update:
+                manager.bulk_update(to_update, update_fields)
+            if to_create:
+                manager.bulk_create(to_create)
+
+            return len(to_update) + len(to_create)
+
+        return self._bulk_operation(
+            bulk_function=native_upsert_chunk if supports_update_conflicts() else select_and_upsert_chunk,
+            **kwargs,
+        )
+
+    def _run_async(self, method_name: str, *args, **kwargs):
+        """
+        Runs the undecorated synchronous service function in the service executor.
+        The async function is decorated itself, so we do not log the messages twice.
+        """
+        function = inspect.unwrap(getattr(self.__class__, method_name))
+        return run_in_service_executor(function, self, *args, **kwargs)
+
+    def _call_unwrapped(self, method_name: str, *args, **kwargs):
+        """ Calls the undecorated service function that does not make database queries """
+        return inspect.unwrap(getattr(self.__class__, method_name))(self, *args, **kwargs)
+
+    async def aresult(self):
+        """ Async version of the result property. Querysets are evaluated in the service executor """
+        if isinstance(self._objects, QuerySet):
+            return await run_in_service_executor(list, self._objects)
+
+        return self._objects
+
+    @ServiceFunctionDecorator()
+    async def aget(self, *args, query_profile: str = None, **model_fields):
+        identity_map, pk = get_identity_map(), self._identity_key(args, model_fields, query_profile)
+        if identity_map is not None and pk is not None:
+            instance = identity_map.get(self.model, pk)
+
+            if instance is not None:
+                return instance
+
+        loader, key = self._active_loader(args, model_fields, query_profile)
+        if loader is not None:
+            instance = await loader.aload(key)  # concurrent aget() calls are loaded with one query
+
+            if instance is None:
+                raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+
+            return self._remember_identity(instance)
+
+        return await self._run_async('get', *args, query_profile=query_profile, **model_fields)
+
+    @ServiceFunctionDecorator()
+    async def aget_many(self, keys, field: str = 'pk', query_profile: str = None):
+        return await self._run_async('get_many', keys, field=field, query_profile=query_profile)
+
+    @ServiceFunctionDecorator()
+    async def afilter(self, *args, **model_fields):
+        return self._call_unwrapped('filter', *args, **model_fields)
+
+    @ServiceFunctionDecorator()
+    async def aall(self, query_profile: str = None):
+        return self._call_unwrapped('all', query_profile=query_profile)
+
+    @ServiceFunctionDecorator()
+    async def aorder_by(self, *args):
+        return self._call_unwrapped('order_by', *args)
+
+    @ServiceFunctionDecorator()
+    async def afirst(self, query_profile: str = None):
+        return await self._run_async('first', query_profile=query_profile)
+
+    @ServiceFunctionDecorator()
+    async def alast(self, query_profile: str = None):
+        return await self._run_async('last', query_profile=query_profile)
+
+    @ServiceFunctionDecorator()
+    async def aiterate(
+        self, chunk_size: int = None, values: tuple = None, values_list: tuple = None, flat: bool = False,
+    ):
+        """ Async version of the iterate(), use it with 'async for' over the result """
+        chunk_size = chunk_size or self.iteration_chunk_size
+        iterate_function = inspect.unwrap(self.__class__.iterate)
+
+        async for item in iterate_in_thread(
+            lambda: iterate_function(self, chunk_size, values, values_list, flat), chunk_size=chunk_size,
+        ):
+            yield item
+
+    @ServiceFunctionDecorator()
+    async def apaginate(
+        self, after: str = None, before: str = None, limit: int = None,
+        order: tuple = ('pk',), values: tuple = None,
+    ):
+        return await self._run_async(
+            'paginate', after=after, before=before, limit=limit, order=order, values=values,
+        )
+
+    async def aconditional_validators(self, last_modified_field: str = None) -> dict:
+        return await self._run_async('conditional_validators', last_modified_field=last_modified_field)
+
+    async def arefresh_from_db(self, **kwargs):
+        return await run_in_service_executor(self.refresh_from_db, **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator(bufferable=True)
+    async def aupdate(self, **kwargs):
+        return await self._run_async('update', **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator(bufferable=True)
+    async def acreate(self, *args, **kwargs):
+        return await self._run_async('create', *args, **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator(bufferable=True)
+    async def adelete(self, **kwargs):
+        return await self._run_async('delete', **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    async def aupdate_where(self, filters, chunk_size: int = None, using: str = None, **values):
+        return await self._run_async('update_where', filters, chunk_size=chunk_size, using=using, **values)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    async def adelete_where(self, filters, chunk_size: int = None, using: str = None):
+        return await self._run_async('delete_where', filters, chunk_size=chunk_size, using=using)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    async def abulk_create(self, **kwargs):
+        return await self._run_async('bulk_create', **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    async def abulk_update(self, **kwargs):
+        return await self._run_async('bulk_update', **kwargs)
+
+    @service_function_for_write
+    @ServiceFunctionDecorator()
+    async def abulk_upsert(self, **kwargs):
+        return await self._run_async('bulk_upsert', **kwargs)
 
     def __str__(self):
-        return f"{{{self.__class__.__name__} {self.result}}}"
+        return f"{{{self.__class__.__name__} {format_result(self.result)}}}"
 
     def __repr__(self):
         return str(self)
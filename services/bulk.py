@@ -0,0 +1,92 @@
+"""
+That file contains the tools for the bulk service functions.
+Bulk functions accept any iterable of dictionaries, so we never keep more than one chunk
+of model instances in memory, even if you import millions of rows from a generator.
+"""
+import time
+from itertools import islice
+from typing import Iterable, NamedTuple
+
+import django
+from django.db.models import Q
+
+
+def chunked(iterable: Iterable, chunk_size: int):
+    """ Yields lists of chunk_size items from any iterable """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive number")
+
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+
+        yield chunk
+
+
+def supports_update_conflicts() -> bool:
+    """ QuerySet.bulk_create(update_conflicts=True) was added in Django 4.1 """
+    return django.VERSION >= (4, 1)
+
+
+def unique_fields_query(rows: list, unique_fields: tuple) -> Q:
+    """ Returns the Q() object that selects all the rows by their unique fields """
+    if len(unique_fields) == 1:
+        field, = unique_fields
+        return Q(**{f"{field}__in": [row[field] for row in rows]})
+
+    query = Q()
+    for row in rows:
+        query |= Q(**{field: row[field] for field in unique_fields})
+
+    return query
+
+
+class BulkChunkResult(NamedTuple):
+    """ Result of one chunk of the bulk operation """
+    index: int
+    count: int
+    duration: float
+
+
+class BulkOperationReport:
+    """ That is the result of the bulk service functions with counts and timings of every chunk """
+
+    def __init__(self):
+        self.chunks = []
+
+    def measure(self):
+        """ Returns the start time for the chunk, use it with add() """
+        return time.perf_counter()
+
+    def add(self, count: int, started_at: float) -> BulkChunkResult:
+        chunk_result = BulkChunkResult(
+            index=len(self.chunks), count=count, duration=time.perf_counter() - started_at,
+        )
+        self.chunks.append(chunk_result)
+        return chunk_result
+
+    @property
+    def count(self) -> int:
+        return sum(chunk.count for chunk in self.chunks)
+
+    @property
+    def duration(self) -> float:
+        return sum(chunk.duration for chunk in self.chunks)
+
+    def __str__(self):
+        return f"<BulkOperationReport count={self.count} chunks={len(self.chunks)} duration={self.duration:.3f}s>"
+
+    def __repr__(self):
+        return str(self)
+
+
+__all__ = [
+    'BulkChunkResult',
+    'BulkOperationReport',
+    'chunked',
+    'supports_update_conflicts',
+    'unique_fields_query',
+]
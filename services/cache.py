@@ -0,0 +1,210 @@
+"""
+That file contains the caching layer for the services.
+Declare ServiceCache() on your service class and get() results will be cached in two layers:
+the in-process LRU cache and the Django cache framework. Every write to the model invalidates the
+cache with the help of post_save/post_delete signals and the service write functions.
+Signals are sent before the commit, so inside of the transaction we invalidate the cache again after
+the commit, and we never cache what we read inside of the transaction: it may be rolled back.
+"""
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models.signals import post_delete, post_save
+
+from services.versions import increment_generation, start_generation
+
+
+SERVICES_SETTINGS = settings.DJANGO_HEAVEN['SERVICES']
+
+
+class LocalLRUCache:
+    """ In-process LRU cache that evicts entries by the TTL and by the maximum size """
+
+    def __init__(self, max_size: int, timeout: float):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.evictions = 0
+        self.expirations = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                return default
+
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ServiceCache:
+    """
+    Read-through cache for the BaseService.get() results. We keep a generation number for every model,
+    and every write increments it, so all the cached lookups of that model become stale at once.
+    The generation is stored in the Django cache, so other processes see the invalidation too.
+    Mind that the local layer is not shared, so other processes will see your writes
+    only after local_timeout seconds.
+
+    :params:
+        - timeout(int): how long entries live in the Django cache
+        - max_size(int): maximum size of the local LRU cache, 0 disables the local layer
+        - local_timeout(float): how long entries live in the local layer, defaults to timeout
+        - cache_alias(str): alias of the Django cache, None disables the shared layer
+    """
+
+    def __init__(
+        self, timeout: int = SERVICES_SETTINGS.get('CACHE_TIMEOUT', 60),
+        max_size: int = SERVICES_SETTINGS.get('CACHE_MAX_SIZE', 1024),
+        local_timeout: float = None,
+        cache_alias: str = SERVICES_SETTINGS.get('CACHE_ALIAS', 'default'),
+        key_prefix: str = SERVICES_SETTINGS.get('CACHE_KEY_PREFIX', 'django_heaven'),
+    ):
+        self.timeout = timeout
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.local = LocalLRUCache(max_size, local_timeout or timeout) if max_size else None
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._local_generations = {}
+
+    @property
+    def shared(self):
+        return None if self.cache_alias is None else caches[self.cache_alias]
+
+    def _generation_key(self, model) -> str:
+        return f"{self.key_prefix}:generation:{model._meta.label_lower}"
+
+    def make_key(self, model, lookup: dict) -> str:
+        """ Creates the cache key from the lookup, we hash it so that it fits into memcached key limits """
+        lookup_hash = hashlib.md5(repr(sorted(lookup.items())).encode()).hexdigest()
+        return f"{self.key_prefix}:{model._meta.label_lower}:{lookup_hash}"
+
+    def _in_transaction(self, model) -> bool:
+        return any(
+            transaction.get_connection(using).in_atomic_block
+            for using in {router.db_for_read(model), router.db_for_write(model)}
+        )
+
+    def get_or_set(self, model, lookup: dict, loader: callable):
+        """ Returns the cached instance for the lookup or loads it with the loader() and caches it """
+        key = self.make_key(model, lookup)
+        local_generation = self._local_generations.get(model, 0)
+
+        if self.local is not None:
+            cached = self.local.get(key)
+            if cached is not None and cached[0] == local_generation:
+                self.hits += 1
+                return copy.copy(cached[1])
+
+        shared_generation = None
+        shared = self.shared
+
+        if shared is not None:
+            generation_key = self._generation_key(model)
+            cached_values = shared.get_many([generation_key, key])
+            shared_generation = cached_values.get(generation_key)
+
+            if shared_generation is None:
+                shared_generation = start_generation(shared, generation_key)
+
+            cached = cached_values.get(key)
+            if cached is not None and cached[0] == shared_generation:
+                self.shared_hits += 1
+                self._set_local(key, local_generation, cached[1])
+                return copy.copy(cached[1])
+
+        self.misses += 1
+        instance = loader()
+
+        if self._in_transaction(model):
+            return copy.copy(instance)  # rows of the transaction are not committed yet
+
+        if shared is not None and shared_generation is not None:
+            shared.set(key, (shared_generation, instance), timeout=self.timeout)
+
+        self._set_local(key, local_generation, instance)
+        return copy.copy(instance)
+
+    def _set_local(self, key, generation: int, instance):
+        if self.local is not None:
+            self.local.set(key, (generation, instance))
+
+    def invalidate(self, model, using: str = None):
+        """
+        Makes all the cached lookups of the model stale. Inside of the transaction we invalidate them
+        again after the commit, otherwise the readers could cache the old rows under the new generation.
+        """
+        using = using or router.db_for_write(model)
+        self._increment_generations(model)
+
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(lambda: self._increment_generations(model), using=using)
+
+    def _increment_generations(self, model):
+        self.invalidations += 1
+        self._local_generations[model] = self._local_generations.get(model, 0) + 1
+
+        shared = self.shared
+        if shared is not None:
+            increment_generation(shared, self._generation_key(model))
+
+    def _on_model_change(self, sender, using: str = None, **kwargs):
+        self.invalidate(sender, using=using)
+
+    def connect(self, model):
+        """ Connects the invalidation to the post_save and post_delete signals of the model """
+        dispatch_uid = f"django_heaven_service_cache_{id(self)}_{model._meta.label_lower}"
+
+        for signal in (post_save, post_delete):
+            signal.connect(self._on_model_change, sender=model, weak=False, dispatch_uid=dispatch_uid)
+
+    def stats(self) -> dict:
+        """ Returns the counters of the cache, use them in order to size your cache """
+        return {
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "evictions": self.local.evictions if self.local is not None else 0,
+            "expirations": self.local.expirations if self.local is not None else 0,
+            "local_size": len(self.local) if self.local is not None else 0,
+        }
+
+
+__all__ = [
+    'LocalLRUCache',
+    'ServiceCache',
+]
@@ -0,0 +1,87 @@
+"""
+That file contains the request scope of the services.
+Add ServiceContextMiddleware to your MIDDLEWARE, or use 'with service_context():' in your background jobs,
+and services will share the state that must live as long as one request, e.g. the time of the last write
+of every service for the read-your-writes replica routing.
+"""
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+try:
+    from asgiref.sync import markcoroutinefunction
+except ImportError:  # asgiref < 3.6
+    def markcoroutinefunction(function):
+        function._is_coroutine = asyncio.coroutines._is_coroutine
+        return function
+
+
+_current_context = contextvars.ContextVar('service_request_context', default=None)
+
+
+class ServiceRequestContext:
+    """ State of the services that lives as long as the request """
+
+    def __init__(self):
+        self.last_writes = {}   # service class -> time.monotonic() of its last write
+        self.loaders = {}       # (service class, field) -> ServiceLoader()
+        self.identity_map = None    # IdentityMap() inside of the identity_map() scope
+
+
+def get_service_context():
+    """ Returns the ServiceRequestContext() of the current request or None outside of the request scope """
+    return _current_context.get()
+
+
+@contextmanager
+def service_context():
+    """ Opens the request scope of the services, nested scopes reuse the outer one """
+    context = _current_context.get()
+
+    if context is not None:
+        yield context
+        return
+
+    context = ServiceRequestContext()
+    token = _current_context.set(context)
+
+    try:
+        yield context
+    finally:
+        _current_context.reset(token)
+
+
+class ServiceContextMiddleware:
+    """ Opens service_context() for every request, works both in WSGI and ASGI deployments """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+
+        with self.open_context():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with self.open_context():
+            return await self.get_response(request)
+
+    def open_context(self):
+        """ Returns the context manager of the request scope, reassign it in order to extend the scope """
+        return service_context()
+
+
+__all__ = [
+    'ServiceContextMiddleware',
+    'ServiceRequestContext',
+    'get_service_context',
+    'service_context',
+]
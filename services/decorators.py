@@ -1,9 +1,17 @@
+import asyncio
+import inspect
+import logging
+import time
 from functools import wraps
 
 from django.conf import settings
 from django.core.exceptions import FieldError
 
+from common.log_sampling import get_log_policy
 from services.exceptions import ServiceProgrammingException
+from services.formatting import compile_logger_message, format_result, is_logger_enabled
+from services.metrics import QueryCounter, count_rows, current_query_counter, registry
+from services.unit_of_work import get_unit_of_work
 
 
 SERVICES_SETTINGS = settings.DJANGO_HEAVEN['SERVICES']
@@ -13,31 +21,42 @@ class ServiceFunctionDecorator:
     def __init__(
         self, force_error_message: bool = SERVICES_SETTINGS.get('FORCE_ERROR_MESSAGE_ARGUMENT', True),
         force_info_message: bool = SERVICES_SETTINGS.get('FORCE_INFO_MESSAGE_ARGUMENT', True),
+        collect_metrics: bool = SERVICES_SETTINGS.get('COLLECT_METRICS', False),
+        bufferable: bool = False,
     ):
         self.force_error_message = force_error_message
         self.force_info_message = force_info_message
+        self.collect_metrics = collect_metrics
+        self.bufferable = bufferable
 
     def __logger_argument_check_forced(self, argument_name: str, kwargs):
         """ Checks that the appropriate logger argument is provided if the user set is as forced """
-        if getattr(self, f"force_{argument_name}", False):
-            if kwargs.get(argument_name) is None:
-                raise ValueError(f"You must provide {argument_name} argument")
-            del kwargs[argument_name]
+        if getattr(self, f"force_{argument_name}", False) and kwargs.get(argument_name) is None:
+            raise ValueError(f"You must provide {argument_name} argument")
 
+        # We delete it so it does not interfere with other ORM arguments.
+        kwargs.pop(argument_name, None)
         return kwargs
 
     def format_logger_message(self, message: str, resulted_service) -> str:
-        """ Use that function in order to format your message. __format__ will be implemented in the future """
+        """
+        Use that function in order to format your message. __format__ will be implemented in the future.
+        $service$ and $result$ are rendered without evaluating querysets.
+        """
         if resulted_service is None:    # if an error happens, then we cannot use the values of None
             return message
 
-        for replace_key, replace_value in (
-            ("$service$", resulted_service),
-            ("$result$", resulted_service.result),
-        ):
-            message = message.replace(replace_key, str(replace_value))
+        parts = compile_logger_message(message)
+        if len(parts) == 1:
+            return message
 
-        return message
+        formatted_parts = list(parts)
+        for index in range(1, len(parts), 2):
+            formatted_parts[index] = (
+                str(resulted_service) if parts[index] == 'service' else format_result(resulted_service.result)
+            )
+
+        return "".join(formatted_parts)
 
     def __call__(self, function):
         """
@@ -53,52 +72,225 @@ class ServiceFunctionDecorator:
         returned_result_in_info is another argument that you may provide. If so, we will
         automatically replace %result% substring in the info message with the result returned from the
         function().
+
+        Coroutine functions are decorated with the async wrapper that has the same logging
+        and error handling, so you can await them in your async views.
+
+        Generator functions (sync and async) return the service with the iterator as its result.
+        We log the info message when the iteration finishes, and $result$ is the number of items in that case.
+
+        If collect_metrics is True, we record wall time, SQL queries, SQL time and rows of every call
+        in services.metrics.registry. Generator functions are not measured.
+
+        bufferable functions are buffered by the unit of work, and inside of it we do not log
+        their info messages: the unit of work logs the flushed batch instead.
         """
 
-        def service_function_decorator_wrapper(service, *args, **kwargs):
-            error_message = kwargs.get('error_message')
-            info_message = kwargs.get('info_message')
+        if inspect.isgeneratorfunction(function):
+            @wraps(function)
+            def generator_service_function_decorator_wrapper(service, *args, **kwargs):
+                error_message, info_message, kwargs = self._pop_logger_arguments(kwargs)
+                return service.__class__(objects=self._logged_iteration(
+                    service, function(service, *args, **kwargs), info_message, error_message,
+                ))
 
-            kwargs = self.__logger_argument_check_forced(argument_name='info_message', kwargs=kwargs)
-            kwargs = self.__logger_argument_check_forced(argument_name='error_message', kwargs=kwargs)
+            return generator_service_function_decorator_wrapper
 
-            # We delete it so it does not interfere with other ORM arguments.
+        if inspect.isasyncgenfunction(function):
+            @wraps(function)
+            def async_generator_service_function_decorator_wrapper(service, *args, **kwargs):
+                error_message, info_message, kwargs = self._pop_logger_arguments(kwargs)
+                return service.__class__(objects=self._async_logged_iteration(
+                    service, function(service, *args, **kwargs), info_message, error_message,
+                ))
 
-            try:
-                new_service = service.__class__(objects=function(service, *args, **kwargs))
+            return async_generator_service_function_decorator_wrapper
+
+        if asyncio.iscoroutinefunction(function):
+            @wraps(function)
+            async def async_service_function_decorator_wrapper(service, *args, **kwargs):
+                error_message, info_message, kwargs = self._pop_logger_arguments(kwargs)
+
+                try:
+                    if self.collect_metrics:
+                        result = await self._async_measured_call(service, function, args, kwargs)
+                    else:
+                        result = await function(service, *args, **kwargs)
+
+                    new_service = service.__class__(objects=result)
+                    return self._log_success(service, info_message, new_service)
 
-                if info_message is not None:
-                    service.logger_obj.info(
-                        self.format_logger_message(info_message, new_service),
-                    )
+                except (FieldError, ServiceProgrammingException) as exc:
+                    raise exc
+                except Exception as exc:
+                    return self._handle_error(service, error_message, exc)
 
-                return new_service
+            return async_service_function_decorator_wrapper
+
+        @wraps(function)
+        def service_function_decorator_wrapper(service, *args, **kwargs):
+            error_message, info_message, kwargs = self._pop_logger_arguments(kwargs)
+
+            try:
+                if self.collect_metrics:
+                    result = self._measured_call(service, function, args, kwargs)
+                else:
+                    result = function(service, *args, **kwargs)
+
+                new_service = service.__class__(objects=result)
+                return self._log_success(service, info_message, new_service)
 
             except (FieldError, ServiceProgrammingException) as exc:
                 # Field error is related to the wrong arguments, that may be typo,
                 # so we don't want to except these as the normal exception
                 raise exc
             except Exception as exc:
-                error_message = error_message or SERVICES_SETTINGS['DEFAULT_ERROR_LOG_MESSAGE']
+                return self._handle_error(service, error_message, exc)
 
-                if settings.DEBUG:  # We add the exception to the log in DEBUG mode
-                    error_message += f". Exception: {exc}"
+        return service_function_decorator_wrapper
 
-                service.logger_obj.error(self.format_logger_message(error_message, None,))
-                return service.service_function_error_handler(exc=exc)
+    def _record_metrics(self, service, function, counter: QueryCounter, started_at: float, result):
+        registry.record(
+            service.__class__.__name__, function.__name__,
+            duration_seconds=time.perf_counter() - started_at,
+            sql_queries=counter.queries,
+            sql_duration_seconds=counter.duration,
+            rows=count_rows(result),
+        )
 
-        return service_function_decorator_wrapper
+    def _measured_call(self, service, function, args: tuple, kwargs: dict):
+        """ Calls the service function and records its metrics """
+        counter, result = QueryCounter(), None
+        token = current_query_counter.set(counter)
+        started_at = time.perf_counter()
+
+        try:
+            with counter.wrap_connections():
+                result = function(service, *args, **kwargs)
+
+            return result
+        finally:
+            current_query_counter.reset(token)
+            self._record_metrics(service, function, counter, started_at, result)
+
+    async def _async_measured_call(self, service, function, args: tuple, kwargs: dict):
+        """ Async version of the _measured_call(). Executor threads count the queries with the context counter """
+        counter, result = QueryCounter(), None
+        token = current_query_counter.set(counter)
+        started_at = time.perf_counter()
+
+        try:
+            result = await function(service, *args, **kwargs)
+            return result
+        finally:
+            current_query_counter.reset(token)
+            self._record_metrics(service, function, counter, started_at, result)
+
+    def _pop_logger_arguments(self, kwargs: dict) -> tuple:
+        """ Returns error_message, info_message and kwargs without them """
+        error_message = kwargs.get('error_message')
+        info_message = kwargs.get('info_message')
+
+        kwargs = self.__logger_argument_check_forced(argument_name='info_message', kwargs=kwargs)
+        kwargs = self.__logger_argument_check_forced(argument_name='error_message', kwargs=kwargs)
+
+        if self.bufferable and get_unit_of_work() is not None:
+            info_message = None
+
+        return error_message, info_message, kwargs
+
+    def _log_success(self, service, info_message: str, new_service):
+        """ Logs the info message of the successful service function and returns the new service """
+        if (
+            info_message is not None and is_logger_enabled(service.logger_obj, logging.INFO)
+            and get_log_policy(service).should_log_info()
+        ):
+            service.logger_obj.info(
+                self.format_logger_message(info_message, new_service),
+            )
+
+        return new_service
+
+    def _log_iteration_success(self, service, info_message: str, items_count: int):
+        self._log_success(service, info_message, service.__class__(objects=items_count))
+
+    def _logged_iteration(self, service, iterator, info_message: str, error_message: str):
+        """ Yields the items of the iterator with the logging and error handling of the service functions """
+        items_count = 0
+
+        try:
+            for item in iterator:
+                items_count += 1
+                yield item
+
+        except (FieldError, ServiceProgrammingException) as exc:
+            raise exc
+        except Exception as exc:
+            self._handle_error(service, error_message, exc)
+            return
+
+        self._log_iteration_success(service, info_message, items_count)
+
+    async def _async_logged_iteration(self, service, iterator, info_message: str, error_message: str):
+        """ Async version of the _logged_iteration() """
+        items_count = 0
+
+        try:
+            async for item in iterator:
+                items_count += 1
+                yield item
+
+        except (FieldError, ServiceProgrammingException) as exc:
+            raise exc
+        except Exception as exc:
+            self._handle_error(service, error_message, exc)
+            return
+
+        self._log_iteration_success(service, info_message, items_count)
+
+    def _handle_error(self, service, error_message: str, exc: Exception):
+        """ Logs the error message and returns the result of the service_function_error_handler() """
+        error_message = error_message or SERVICES_SETTINGS['DEFAULT_ERROR_LOG_MESSAGE']
+
+        if settings.DEBUG:  # We add the exception to the log in DEBUG mode
+            error_message += f". Exception: {exc}"
+
+        for message in get_log_policy(service).error_messages(self.format_logger_message(error_message, None)):
+            service.logger_obj.error(message)
+
+        return service.service_function_error_handler(exc=exc)
 
 
 def service_function_for_write(function: callable):
-    """ That decorator marks service function that can change the information in the database """
+    """
+    That decorator marks service function that can change the information in the database.
+    After the write we call service.record_write(), so that the replica routing reads your writes.
+    """
 
-    @wraps(function)
-    def service_function_for_write_wrapper(service, *args, **kwargs):
+    def check_read_only(service):
         if service.read_only:
             raise ServiceProgrammingException(f"You are calling write function on read_only service {service}")
 
-        return function(service, *args, **kwargs)
+    if asyncio.iscoroutinefunction(function):
+        @wraps(function)
+        async def async_service_function_for_write_wrapper(service, *args, **kwargs):
+            check_read_only(service)
+
+            try:
+                return await function(service, *args, **kwargs)
+            finally:
+                service.record_write()
+
+        return async_service_function_for_write_wrapper
+
+    @wraps(function)
+    def service_function_for_write_wrapper(service, *args, **kwargs):
+        check_read_only(service)
+
+        try:
+            return function(service, *args, **kwargs)
+        finally:
+            service.record_write()
 
     return service_function_for_write_wrapper
 
@@ -0,0 +1,50 @@
+"""
+That file contains the functions that format service log messages.
+We never evaluate querysets while formatting, since that would make an additional query
+for every logged service function.
+"""
+import logging
+import re
+from functools import lru_cache
+
+from django.db.models import QuerySet
+
+
+PLACEHOLDER_REGEX = re.compile(r"\$(service|result)\$")
+
+
+@lru_cache(maxsize=1024)
+def compile_logger_message(message: str) -> tuple:
+    """
+    Splits the message into literal parts and placeholder names once, so that
+    we do not search for placeholders on every call. Odd items are the placeholder names.
+    """
+    return tuple(PLACEHOLDER_REGEX.split(message))
+
+
+def format_result(result) -> str:
+    """ Returns the string representation of the result without hitting the database """
+    if isinstance(result, QuerySet):
+        if result._result_cache is None:
+            return f"<QuerySet {result.model._meta.label} (not evaluated)>"
+
+        return repr(result)  # repr() uses the cached results
+
+    return str(result)
+
+
+def is_logger_enabled(logger_obj, level: int) -> bool:
+    """ Returns False only if we know that the logger will drop the message of that level """
+    is_enabled_for = getattr(logger_obj, 'isEnabledFor', None)
+
+    if is_enabled_for is None:  # logging module itself works through the root logger
+        return logging.getLogger().isEnabledFor(level) if logger_obj is logging else True
+
+    return is_enabled_for(level)
+
+
+__all__ = [
+    'compile_logger_message',
+    'format_result',
+    'is_logger_enabled',
+]
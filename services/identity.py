@@ -0,0 +1,97 @@
+"""
+That file contains the identity map of the services.
+Inside of the identity_map() scope, or with IdentityMapMiddleware, there is only one instance
+for every (model, primary key). BaseService.get() with the primary key returns the remembered instance
+without a query, get(), first() and last() remember what they load, and update(), create() and delete()
+keep the map up to date, so your reads in the request stay consistent.
+"""
+import threading
+from contextlib import contextmanager
+
+from services.context import ServiceContextMiddleware, get_service_context, service_context
+
+
+class IdentityMap:
+    """ One instance per (model, primary key) """
+
+    def __init__(self):
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(model, pk) -> tuple:
+        concrete_model = model._meta.concrete_model
+        return concrete_model, concrete_model._meta.pk.to_python(pk)
+
+    def get(self, model, pk):
+        """ Returns the remembered instance or None """
+        return self._instances.get(self._key(model, pk))
+
+    def add(self, instance, replace: bool = False):
+        """
+        Remembers the instance and returns the one that the map keeps for its primary key.
+        Use replace=True when the instance has newer data than the remembered one.
+        """
+        if instance is None or instance.pk is None:
+            return instance
+
+        key = self._key(instance.__class__, instance.pk)
+
+        with self._lock:
+            if replace:
+                self._instances[key] = instance
+                return instance
+
+            return self._instances.setdefault(key, instance)
+
+    def remove(self, model, pk):
+        with self._lock:
+            self._instances.pop(self._key(model, pk), None)
+
+    def remove_model(self, model):
+        """ Forgets all the instances of the model, we use it after the set-based and bulk writes """
+        concrete_model = model._meta.concrete_model
+
+        with self._lock:
+            for key in [key for key in self._instances if key[0] is concrete_model]:
+                del self._instances[key]
+
+    def __len__(self):
+        return len(self._instances)
+
+
+def get_identity_map():
+    """ Returns the IdentityMap() of the current scope or None if it is not active """
+    context = get_service_context()
+    return None if context is None else context.identity_map
+
+
+@contextmanager
+def identity_map():
+    """ Activates the identity map, nested scopes reuse the outer map """
+    with service_context() as context:
+        if context.identity_map is not None:
+            yield context.identity_map
+            return
+
+        context.identity_map = IdentityMap()
+
+        try:
+            yield context.identity_map
+        finally:
+            context.identity_map = None
+
+
+class IdentityMapMiddleware(ServiceContextMiddleware):
+    """ Use that instead of ServiceContextMiddleware in order to activate the identity map for every request """
+
+    def open_context(self):
+        return identity_map()
+
+
+__all__ = [
+    'IdentityMap',
+    'IdentityMapMiddleware',
+    'get_identity_map',
+    'identity_map',
+]
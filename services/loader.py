@@ -0,0 +1,170 @@
+"""
+That file contains the batching loader of the services (DataLoader pattern).
+Serializers and templates often call SomeService().get(pk=...) inside of loops, and every call
+is a separate query. Loader collects the keys first and loads all of them with one field__in query.
+
+    loader = UserService().loader()
+    pending_users = [loader.load(comment.user_id) for comment in comments]
+    users = [pending_user.result for pending_user in pending_users]  # one query for all the users
+
+Loaders live in the request scope (services.context), so get() calls of the same service in that
+request use the loaded instances too. In async views 'await loader.aload(key)' calls that are made
+concurrently are coalesced into one query.
+Loader field must be unique, otherwise get() of one key could return any of its rows,
+and instances are keyed by its attname, so foreign keys are ids.
+"""
+import asyncio
+import threading
+
+from django.db.models import Model
+
+from services.asynchronous import run_in_service_executor
+from services.exceptions import ServiceProgrammingException
+
+
+class PendingLoad:
+    """ The result of the ServiceLoader.load(). We load all the pending keys when you access the result """
+
+    def __init__(self, loader, key):
+        self.loader = loader
+        self.key = key
+
+    @property
+    def result(self):
+        """ Returns the instance or None if there is no instance with that key """
+        return self.loader.load_now(self.key)
+
+
+class ServiceLoader:
+    """
+    Loads the instances of one service by one field in batches. Keys are deduplicated, and we remember
+    the loaded instances, so every key is queried only once during the life of the loader.
+    """
+
+    def __init__(self, service, field: str = 'pk'):
+        self.service = service
+        self.field = field
+        self.model_field = service.model._meta.pk if field == 'pk' else service.model._meta.get_field(field)
+
+        if not (self.model_field.primary_key or self.model_field.unique):
+            raise ServiceProgrammingException(
+                f"{service.__class__.__name__} loader needs the primary key or the unique field, '{field}' is not"
+            )
+
+        self._loaded = {}   # key -> instance or None
+        self._pending = {}  # we use dict as the ordered set
+        self._lock = threading.Lock()
+        self._async_dispatch = None
+        self._async_dispatch_lock = None
+
+    def normalize_key(self, key):
+        """ '1' and 1 are the same primary key, so we convert keys with the model field """
+        if isinstance(key, Model):  # related instance of the foreign key
+            key = key.pk
+
+        return self.model_field.to_python(key)
+
+    def _queue(self, key):
+        with self._lock:
+            if key not in self._loaded:
+                self._pending[key] = None
+
+    def load(self, key) -> PendingLoad:
+        """ Queues the key and returns PendingLoad(), its result loads all the queued keys at once """
+        key = self.normalize_key(key)
+        self._queue(key)
+        return PendingLoad(self, key)
+
+    def load_many(self, keys) -> list:
+        """ Loads all the keys with one query and returns instances in the order of keys, None if missing """
+        keys = [self.normalize_key(key) for key in keys]
+
+        for key in keys:
+            self._queue(key)
+
+        self.dispatch()
+        return [self._loaded.get(key) for key in keys]
+
+    def load_now(self, key):
+        """ Returns the instance of the key, loading it with all the queued keys if needed """
+        key = self.normalize_key(key)
+
+        if key not in self._loaded:
+            self._queue(key)
+            self.dispatch()
+
+        return self._loaded.get(key)
+
+    def is_loaded(self, key) -> bool:
+        return self.normalize_key(key) in self._loaded
+
+    def dispatch(self):
+        """ Loads all the queued keys with one query """
+        with self._lock:
+            keys, self._pending = list(self._pending), {}
+
+        if not keys:
+            return
+
+        instances = self.service.fetch_many(keys, field=self.field)
+
+        with self._lock:
+            for key in keys:
+                self._loaded[key] = instances.get(key)
+
+    def prime(self, instance):
+        """ Puts the already loaded instance into the loader, so we do not query it again """
+        with self._lock:
+            self._loaded[self.normalize_key(getattr(instance, self.model_field.attname))] = instance
+
+    def clear(self, key=None):
+        """ Forgets the key, or all the keys, so that they are loaded again """
+        with self._lock:
+            if key is None:
+                self._loaded.clear()
+            else:
+                self._loaded.pop(self.normalize_key(key), None)
+
+    async def aload(self, key):
+        """
+        Async version of the load_now(). All the aload() calls that wait at the same time
+        are dispatched with one query in the service executor.
+        """
+        key = self.normalize_key(key)
+        if key in self._loaded:
+            return self._loaded[key]
+
+        self._queue(key)
+
+        if self._async_dispatch is None:
+            loop = asyncio.get_running_loop()
+            future = self._async_dispatch = loop.create_future()
+            # call_soon() runs after the coroutines that are already scheduled, so they queue their keys first
+            loop.call_soon(lambda: asyncio.ensure_future(self._run_async_dispatch(future)))
+
+        await asyncio.shield(self._async_dispatch)
+        return self._loaded.get(key)
+
+    async def aload_many(self, keys) -> list:
+        return list(await asyncio.gather(*(self.aload(key) for key in keys)))
+
+    async def _run_async_dispatch(self, future: asyncio.Future):
+        if self._async_dispatch_lock is None:
+            self._async_dispatch_lock = asyncio.Lock()
+
+        # The previous dispatch may still load the keys of our waiters, so we wait for it
+        async with self._async_dispatch_lock:
+            self._async_dispatch = None
+
+            try:
+                await run_in_service_executor(self.dispatch)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(None)
+
+
+__all__ = [
+    'PendingLoad',
+    'ServiceLoader',
+]
@@ -0,0 +1,244 @@
+"""
+That file contains the performance metrics of the service functions.
+Turn on settings.DJANGO_HEAVEN.SERVICES.COLLECT_METRICS and ServiceFunctionDecorator will record
+wall time, number of SQL queries, SQL time and returned rows of every service function call.
+Metrics are aggregated per service class and function into histograms in the process memory,
+and you can export them with a sink: Prometheus text format, JSON dump or a log line.
+"""
+import bisect
+import contextvars
+import json
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Model, QuerySet
+from django.http import HttpResponse
+
+from common.queue_logging import configured_logger
+
+
+# responses import that file through services.asynchronous, so they work without the SERVICES settings
+SERVICES_SETTINGS = settings.DJANGO_HEAVEN.get('SERVICES', {})
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 10000, 100000)
+
+# Query counter of the current service call, async service functions use it in the executor threads
+current_query_counter = contextvars.ContextVar('current_query_counter', default=None)
+
+
+class Histogram:
+    """ Prometheus-like histogram with the fixed buckets """
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list:
+        """ Returns (upper bound, count) pairs as Prometheus expects them """
+        result, total = [], 0
+
+        for bound, count in zip(self.buckets + (float('inf'),), self.bucket_counts):
+            total += count
+            result.append((bound, total))
+
+        return result
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "buckets": {str(bound): count for bound, count in self.cumulative_counts()},
+        }
+
+
+class ServiceFunctionMetrics:
+    """ Histograms of one service function """
+    histogram_buckets = {
+        "duration_seconds": DURATION_BUCKETS,
+        "sql_queries": COUNT_BUCKETS,
+        "sql_duration_seconds": DURATION_BUCKETS,
+        "rows": COUNT_BUCKETS,
+    }
+
+    def __init__(self):
+        self.histograms = {name: Histogram(buckets) for name, buckets in self.histogram_buckets.items()}
+
+    def observe(self, **values):
+        for name, value in values.items():
+            if value is not None:
+                self.histograms[name].observe(value)
+
+
+class MetricsRegistry:
+    """ Thread-safe registry of the metrics of all service functions """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, service_name: str, function_name: str, **values):
+        with self._lock:
+            key = (service_name, function_name)
+
+            try:
+                metrics = self._metrics[key]
+            except KeyError:
+                metrics = self._metrics[key] = ServiceFunctionMetrics()
+
+            metrics.observe(**values)
+
+    def items(self) -> list:
+        with self._lock:
+            return sorted(self._metrics.items())
+
+    def as_dict(self) -> dict:
+        return {
+            f"{service_name}.{function_name}": {
+                name: histogram.as_dict() for name, histogram in metrics.histograms.items()
+            } for (service_name, function_name), metrics in self.items()
+        }
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    """ Counts SQL queries and their time with the connection execute wrappers """
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.duration += time.perf_counter() - started_at
+
+    def wrap_connections(self) -> ExitStack:
+        """ Installs the counter on all the connections of the current thread """
+        stack = ExitStack()
+
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+
+        return stack
+
+
+def count_rows(result):
+    """ Returns the number of rows in the result of the service function, or None if we cannot know it """
+    if result is None:
+        return 0
+    elif isinstance(result, Model):
+        return 1
+    elif isinstance(result, QuerySet):
+        # We never evaluate querysets just for the metrics
+        return None if result._result_cache is None else len(result._result_cache)
+    elif isinstance(result, (list, tuple)):
+        return len(result)
+    elif isinstance(result, int) and not isinstance(result, bool):
+        return result
+
+    count = getattr(result, 'count', None)
+    return count if isinstance(count, int) else None
+
+
+class BaseMetricsSink:
+    """ Sink exports the metrics registry. Reassign export() in order to create your own sink """
+    content_type = 'text/plain'
+
+    def export(self, metrics_registry: MetricsRegistry) -> str:
+        raise NotImplementedError
+
+
+class PrometheusMetricsSink(BaseMetricsSink):
+    """ Exports the metrics in the Prometheus text exposition format """
+    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    metric_prefix = 'django_heaven_service'
+
+    def export(self, metrics_registry: MetricsRegistry) -> str:
+        lines = []
+        items = metrics_registry.items()
+
+        for histogram_name in ServiceFunctionMetrics.histogram_buckets:
+            metric_name = f"{self.metric_prefix}_{histogram_name}"
+            lines.append(f"# TYPE {metric_name} histogram")
+
+            for (service_name, function_name), metrics in items:
+                histogram = metrics.histograms[histogram_name]
+                labels = f'service="{service_name}",function="{function_name}"'
+
+                for bound, count in histogram.cumulative_counts():
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{metric_name}_bucket{{{labels},le="{le}"}} {count}')
+
+                lines.append(f"{metric_name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{metric_name}_count{{{labels}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+class JsonMetricsSink(BaseMetricsSink):
+    """ Exports the metrics as a JSON dump """
+    content_type = 'application/json'
+
+    def export(self, metrics_registry: MetricsRegistry) -> str:
+        return json.dumps(metrics_registry.as_dict())
+
+
+class LogMetricsSink(JsonMetricsSink):
+    """ Writes the JSON dump of the metrics into the service logger as one line """
+
+    def __init__(self, logger_obj=None):
+        self.logger_obj = logger_obj or configured_logger(SERVICES_SETTINGS)
+
+    def export(self, metrics_registry: MetricsRegistry) -> str:
+        dump = super(LogMetricsSink, self).export(metrics_registry)
+        self.logger_obj.info(f"Service metrics: {dump}")
+        return dump
+
+
+def get_metrics_sink() -> BaseMetricsSink:
+    """ Returns the sink from settings.DJANGO_HEAVEN.SERVICES.METRICS_SINK, Prometheus one by default """
+    sink = SERVICES_SETTINGS.get('METRICS_SINK', PrometheusMetricsSink)
+    return sink() if isinstance(sink, type) else sink
+
+
+def metrics_view(request):
+    """ Add that view to your urls.py in order to scrape the metrics """
+    sink = get_metrics_sink()
+    return HttpResponse(sink.export(registry), content_type=sink.content_type)
+
+
+__all__ = [
+    'BaseMetricsSink',
+    'Histogram',
+    'JsonMetricsSink',
+    'LogMetricsSink',
+    'MetricsRegistry',
+    'PrometheusMetricsSink',
+    'QueryCounter',
+    'count_rows',
+    'current_query_counter',
+    'get_metrics_sink',
+    'metrics_view',
+    'registry',
+]
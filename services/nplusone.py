@@ -0,0 +1,151 @@
+"""
+That file contains the N+1 queries detector for the services.
+We mark the instances that services load with querysets, and if your code lazily loads a relation
+or a deferred field of such instance, we log a warning with the service logger. Add the relation to the
+select_related_fields or prefetch_related_fields of your service in that case.
+The detector patches Django descriptors, so it is meant for the DEBUG mode only.
+"""
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor,
+    ManyToManyDescriptor,
+    ReverseManyToOneDescriptor,
+    ReverseOneToOneDescriptor,
+)
+from django.db.models.query import ModelIterable
+from django.db.models.query_utils import DeferredAttribute
+
+
+LOAD_CONTEXT_ATTRIBUTE = '_heaven_load_context'
+
+_installed = False
+_tracking_iterable_classes = {}
+
+
+class ServiceLoadContext:
+    """ Shared by all the instances that one service queryset loaded """
+
+    def __init__(self, service_class, prefetch_lookups: tuple = ()):
+        self.service_class = service_class
+        self.rows = 0
+        # prefetch_related_objects() accesses the relations itself, so we never report them
+        self.reported = {
+            getattr(lookup, 'prefetch_through', lookup).split('__')[0] for lookup in prefetch_lookups
+        }
+
+
+def report_lazy_load(instance, relation_name: str):
+    """ Logs the warning once per relation for every queryset that loaded more than one instance """
+    context = instance.__dict__.get(LOAD_CONTEXT_ATTRIBUTE)
+    if context is None or context.rows < 2 or relation_name in context.reported:
+        return
+
+    context.reported.add(relation_name)
+    context.service_class.logger_obj.warning(
+        f"Possible N+1 queries: '{relation_name}' of {instance._meta.label} is lazily loaded on "
+        f"{context.rows} instances returned by {context.service_class.__name__}. "
+        f"Add it to select_related_fields, prefetch_related_fields or only_fields of the service",
+    )
+
+
+def _is_tracked(instance) -> bool:
+    return instance is not None and LOAD_CONTEXT_ATTRIBUTE in instance.__dict__
+
+
+def _is_forward_many_to_many(descriptor) -> bool:
+    return isinstance(descriptor, ManyToManyDescriptor) and not descriptor.reverse
+
+
+def _many_relation_names(descriptor) -> set:
+    """ Names that Django uses for the prefetched objects cache of the many relation """
+    if _is_forward_many_to_many(descriptor):
+        return {descriptor.field.name}
+
+    return {descriptor.rel.get_accessor_name(), descriptor.rel.field.related_query_name()}
+
+
+def install():
+    """ Patches Django relation descriptors, so that they report lazy loads of the tracked instances """
+    global _installed
+
+    if _installed:
+        return
+
+    forward_get = ForwardManyToOneDescriptor.__get__
+    reverse_one_get = ReverseOneToOneDescriptor.__get__
+    reverse_many_get = ReverseManyToOneDescriptor.__get__
+    deferred_get = DeferredAttribute.__get__
+
+    def tracked_forward_get(self, instance, cls=None):
+        if (
+            _is_tracked(instance) and not self.field.is_cached(instance)
+            and None not in self.field.get_local_related_value(instance)
+        ):
+            report_lazy_load(instance, self.field.name)
+
+        return forward_get(self, instance, cls)
+
+    def tracked_reverse_one_get(self, instance, cls=None):
+        if _is_tracked(instance) and not self.related.is_cached(instance):
+            report_lazy_load(instance, self.related.get_accessor_name())
+
+        return reverse_one_get(self, instance, cls)
+
+    def tracked_reverse_many_get(self, instance, cls=None):
+        if _is_tracked(instance):
+            prefetched = getattr(instance, '_prefetched_objects_cache', {})
+
+            if not _many_relation_names(self) & prefetched.keys():
+                report_lazy_load(
+                    instance, self.field.name if _is_forward_many_to_many(self) else self.rel.get_accessor_name(),
+                )
+
+        return reverse_many_get(self, instance, cls)
+
+    def tracked_deferred_get(self, instance, cls=None):
+        if _is_tracked(instance) and self.field.attname not in instance.__dict__:
+            report_lazy_load(instance, self.field.attname)
+
+        return deferred_get(self, instance, cls)
+
+    ForwardManyToOneDescriptor.__get__ = tracked_forward_get
+    ReverseOneToOneDescriptor.__get__ = tracked_reverse_one_get
+    ReverseManyToOneDescriptor.__get__ = tracked_reverse_many_get
+    DeferredAttribute.__get__ = tracked_deferred_get
+    _installed = True
+
+
+def tracking_iterable_class(service_class):
+    """ Returns ModelIterable subclass that marks every instance with the load context of the service """
+    try:
+        return _tracking_iterable_classes[service_class]
+    except KeyError:
+        pass
+
+    class TrackingModelIterable(ModelIterable):
+        def __iter__(self):
+            context = ServiceLoadContext(service_class, self.queryset._prefetch_related_lookups)
+
+            for instance in super(TrackingModelIterable, self).__iter__():
+                context.rows += 1
+                instance.__dict__[LOAD_CONTEXT_ATTRIBUTE] = context
+                yield instance
+
+    _tracking_iterable_classes[service_class] = TrackingModelIterable
+    return TrackingModelIterable
+
+
+def track_queryset(queryset, service_class):
+    """ Makes the instances of the queryset report lazy loads. Values querysets are left as they are """
+    install()
+
+    if queryset._iterable_class is ModelIterable:
+        queryset._iterable_class = tracking_iterable_class(service_class)
+
+    return queryset
+
+
+__all__ = [
+    'install',
+    'report_lazy_load',
+    'track_queryset',
+]
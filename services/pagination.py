@@ -0,0 +1,135 @@
+"""
+That file contains the keyset (cursor) pagination for the services.
+Offset pagination makes the database skip all the previous rows, so deep pages get slower and slower.
+Keyset pagination filters by the ordering values of the last row instead, so every page costs the same
+as the first one. Cursors are opaque strings that you return to your clients.
+"""
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.db.models import Q
+
+
+# Values of these types are tagged in the cursor, so that we decode them back with the full precision.
+# DjangoJSONEncoder cuts datetimes to milliseconds, and the page would start from the same row again
+CURSOR_TYPES = {
+    '$datetime': (datetime.datetime, datetime.datetime.isoformat, datetime.datetime.fromisoformat),
+    '$date': (datetime.date, datetime.date.isoformat, datetime.date.fromisoformat),
+    '$time': (datetime.time, datetime.time.isoformat, datetime.time.fromisoformat),
+    '$timedelta': (
+        datetime.timedelta,
+        lambda value: [value.days, value.seconds, value.microseconds],
+        lambda value: datetime.timedelta(*value),
+    ),
+    '$decimal': (decimal.Decimal, str, decimal.Decimal),
+    '$uuid': (uuid.UUID, str, uuid.UUID),
+}
+
+
+class KeysetPage(list):
+    """
+    That is the page of the keyset pagination. It is a normal list of rows, but it also knows the cursors
+    of the next and the previous pages. Response mixins put the cursors into the response envelope.
+    """
+
+    def __init__(self, rows, next_cursor: str = None, prev_cursor: str = None):
+        super(KeysetPage, self).__init__(rows)
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def cursors(self) -> dict:
+        return {
+            "next_cursor": self.next_cursor,
+            "prev_cursor": self.prev_cursor,
+        }
+
+
+class CursorEncoder(json.JSONEncoder):
+    """ Encodes the values of CURSOR_TYPES as {"$tag": value} """
+
+    def default(self, value):
+        # datetime is a subclass of date, so '$datetime' goes before '$date' in CURSOR_TYPES
+        for tag, (value_type, encode, _) in CURSOR_TYPES.items():
+            if isinstance(value, value_type):
+                return {tag: encode(value)}
+
+        return super(CursorEncoder, self).default(value)
+
+
+def _decode_tagged_value(dictionary: dict):
+    if len(dictionary) == 1:
+        (tag, value), = dictionary.items()
+
+        if tag in CURSOR_TYPES:
+            return CURSOR_TYPES[tag][2](value)
+
+    return dictionary
+
+
+def encode_cursor(values: list) -> str:
+    """ Encodes the ordering values of the row into the opaque cursor """
+    payload = json.dumps(values, cls=CursorEncoder, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> list:
+    """ Decodes the cursor from encode_cursor(), raises ValueError if the cursor is broken """
+    try:
+        values = json.loads(
+            base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)), object_hook=_decode_tagged_value,
+        )
+    except (ValueError, TypeError, decimal.InvalidOperation):
+        raise ValueError(f"Cursor '{cursor}' cannot be decoded")
+
+    if not isinstance(values, list):
+        raise ValueError(f"Cursor '{cursor}' cannot be decoded")
+
+    return values
+
+
+def parse_order(order: tuple) -> list:
+    """ Converts ('-created', 'pk') into [('created', True), ('pk', False)], where True means descending """
+    return [(field[1:], True) if field.startswith('-') else (field, False) for field in order]
+
+
+def keyset_query(order: list, values: list, backwards: bool = False) -> Q:
+    """
+    Returns Q() that selects the rows after the values in the order, or before them if backwards is True:
+    (a > 1) OR (a = 1 AND b > 2) OR ...
+    """
+    if len(order) != len(values):
+        raise ValueError("Cursor does not match the ordering of the page")
+
+    query = Q()
+    equal_fields = {}
+
+    for (field, descending), value in zip(order, values):
+        lookup = 'lt' if descending != backwards else 'gt'
+        query |= Q(**equal_fields, **{f"{field}__{lookup}": value})
+        equal_fields[field] = value
+
+    return query
+
+
+def row_values(row, order: list) -> list:
+    """ Returns the ordering values of the model instance or values() dictionary """
+    if isinstance(row, dict):
+        return [row[field] for field, _ in order]
+
+    return [getattr(row, field) for field, _ in order]
+
+
+__all__ = [
+    'CURSOR_TYPES',
+    'CursorEncoder',
+    'KeysetPage',
+    'decode_cursor',
+    'encode_cursor',
+    'keyset_query',
+    'parse_order',
+    'row_values',
+]
@@ -0,0 +1,117 @@
+"""
+That file contains the read replica routing of the services.
+List your replica aliases in settings.DJANGO_HEAVEN.SERVICES.READ_REPLICAS and read_only services
+will read from them. If a replica fails, we skip it for REPLICA_FAILURE_TIMEOUT seconds and
+read from the primary database instead.
+"""
+import asyncio
+import itertools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import InterfaceError, OperationalError, connections
+
+
+SERVICES_SETTINGS = settings.DJANGO_HEAVEN['SERVICES']
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+
+    return True
+
+
+class ReplicaSelector:
+    """
+    Chooses the replica for the read.
+        - round_robin: replicas take turns
+        - least_loaded: the replica with the fewest reads in progress in that process
+    """
+
+    def __init__(
+        self, strategy: str = SERVICES_SETTINGS.get('REPLICA_SELECTION', ROUND_ROBIN),
+        failure_timeout: float = SERVICES_SETTINGS.get('REPLICA_FAILURE_TIMEOUT', 30),
+    ):
+        if strategy not in (ROUND_ROBIN, LEAST_LOADED):
+            raise ValueError(f"Replica selection must be '{ROUND_ROBIN}' or '{LEAST_LOADED}', not '{strategy}'")
+
+        self.strategy = strategy
+        self.failure_timeout = failure_timeout
+
+        self._turns = itertools.count()
+        self._in_flight = defaultdict(int)
+        self._failed_until = {}
+        self._lock = threading.Lock()
+
+    def available(self, aliases) -> list:
+        now = time.monotonic()
+        return [alias for alias in aliases if self._failed_until.get(alias, 0) <= now]
+
+    def _pick(self, candidates: list) -> str:
+        # We rotate candidates, so that least_loaded takes turns between the equally loaded replicas
+        turn = next(self._turns) % len(candidates)
+        candidates = candidates[turn:] + candidates[:turn]
+
+        if self.strategy == LEAST_LOADED:
+            return min(candidates, key=lambda alias: self._in_flight[alias])
+
+        return candidates[0]
+
+    def choose(self, aliases) -> str:
+        """
+        Returns the alias of the healthy replica, or None if all of them failed.
+        In the event loop we cannot connect, e.g. in afilter() that only builds the lazy queryset,
+        so we pick the replica without the check there.
+        """
+        candidates = self.available(aliases)
+
+        if candidates and _in_event_loop():
+            return self._pick(candidates)
+
+        while candidates:
+            alias = self._pick(candidates)
+
+            try:
+                connections[alias].ensure_connection()
+                return alias
+            except (InterfaceError, OperationalError):
+                self.mark_failed(alias)
+                candidates.remove(alias)
+
+        return None
+
+    def mark_failed(self, alias: str):
+        with self._lock:
+            self._failed_until[alias] = time.monotonic() + self.failure_timeout
+
+    @contextmanager
+    def track(self, alias: str):
+        """ Counts the reads in progress for the least_loaded strategy """
+        with self._lock:
+            self._in_flight[alias] += 1
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight[alias] -= 1
+
+
+replica_selector = ReplicaSelector()
+
+
+__all__ = [
+    'LEAST_LOADED',
+    'ROUND_ROBIN',
+    'ReplicaSelector',
+    'replica_selector',
+]
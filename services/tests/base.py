@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from services.base import BaseService
+
+
+class UserTestService(BaseService):
+    """ UserService() creates users with create_user(), so the tests use the plain service of the User model """
+    model = get_user_model()
+    raise_exception = True
+
+
+class BaseServiceTest(TestCase):
+    """ That is the base class for the services tests, it creates users_count users """
+    users_count = 5
+
+    def setUp(self):
+        super(BaseServiceTest, self).setUp()
+        self.users = [
+            get_user_model().objects.create(username=f"user-{index}", first_name=f"first-{index}")
+            for index in range(self.users_count)
+        ]
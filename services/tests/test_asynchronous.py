@@ -0,0 +1,59 @@
+import asyncio
+
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.test import TransactionTestCase
+
+from services.asynchronous import ASYNC_MAX_WORKERS, get_iteration_executor
+from services.tests.base import UserTestService
+
+
+class AsyncServiceTest(TransactionTestCase):
+    """ That is the tests for the async service functions. Executor threads do not see the test transactions """
+
+    def setUp(self):
+        self.users = [get_user_model().objects.create(username=f"user-{index}") for index in range(5)]
+
+    def test_async_functions_return_the_same_results(self):
+        async def load():
+            return await asyncio.gather(
+                UserTestService().aget(pk=self.users[0].pk, info_message="User is found"),
+                UserTestService().afilter(username__in=["user-1", "user-2"], info_message="Users are found"),
+            )
+
+        user_service, users_service = asyncio.run(load())
+        self.assertEqual(user_service.result, self.users[0])
+        self.assertEqual(
+            sorted(user.username for user in asyncio.run(users_service.aresult())), ["user-1", "user-2"],
+        )
+
+    def test_worker_connections_are_reused(self):
+        created_connections = []
+
+        def count_connection(**kwargs):
+            created_connections.append(kwargs['connection'].alias)
+
+        async def load():
+            for _ in range(20):
+                await UserTestService().aget(pk=self.users[0].pk, info_message="User is found")
+
+        connection_created.connect(count_connection)
+        try:
+            asyncio.run(load())
+        finally:
+            connection_created.disconnect(count_connection)
+
+        self.assertLessEqual(len(created_connections), ASYNC_MAX_WORKERS)
+
+    def test_aiterate(self):
+        async def iterate():
+            service = UserTestService().aiterate(
+                chunk_size=2, values_list=("username",), flat=True, info_message="Users are iterated",
+            )
+            return [username async for username in service.result]
+
+        self.assertEqual(sorted(asyncio.run(iterate())), [f"user-{index}" for index in range(5)])
+
+    def test_iteration_executors_are_bounded(self):
+        executors = {get_iteration_executor() for _ in range(ASYNC_MAX_WORKERS * 2)}
+        self.assertEqual(len(executors), ASYNC_MAX_WORKERS)
@@ -0,0 +1,62 @@
+from services.bulk import chunked
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class BulkServiceFunctionsTest(BaseServiceTest):
+    """ That is the tests for the chunked bulk service functions """
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+
+        with self.assertRaises(ValueError):
+            list(chunked([], 0))
+
+    def test_bulk_create_from_generator(self):
+        report = UserTestService().bulk_create(
+            instances=({"username": f"created-{index}"} for index in range(5)), batch_size=2,
+            info_message="Users are created",
+        ).result
+
+        self.assertEqual([chunk.count for chunk in report.chunks], [2, 2, 1])
+        self.assertEqual(report.count, 5)
+        self.assertEqual(UserTestService.model.objects.filter(username__startswith="created-").count(), 5)
+
+    def test_bulk_update_chunk_counts(self):
+        for user in self.users:
+            user.first_name = "updated"
+
+        report = UserTestService().bulk_update(
+            instances=self.users, fields=["first_name"], batch_size=3, info_message="Users are updated",
+        ).result
+
+        self.assertEqual([chunk.count for chunk in report.chunks], [3, 2])
+        self.assertEqual(UserTestService.model.objects.filter(first_name="updated").count(), self.users_count)
+
+    def test_bulk_upsert_chunk_counts(self):
+        rows = [
+            {"username": "user-0", "first_name": "upserted"},
+            {"username": "user-1", "first_name": "upserted"},
+            {"username": "upserted-0", "first_name": "upserted"},
+        ]
+
+        report = UserTestService().bulk_upsert(
+            instances=rows, unique_fields=["username"], update_fields=["first_name"], batch_size=2,
+            info_message="Users are upserted",
+        ).result
+
+        self.assertEqual([chunk.count for chunk in report.chunks], [2, 1])
+        self.assertEqual(
+            sorted(UserTestService.model.objects.filter(first_name="upserted").values_list("username", flat=True)),
+            ["upserted-0", "user-0", "user-1"],
+        )
+        self.assertEqual(UserTestService.model.objects.count(), self.users_count + 1)
+
+    def test_bulk_upsert_last_duplicate_wins(self):
+        rows = [{"username": "user-0", "first_name": "first"}, {"username": "user-0", "first_name": "last"}]
+
+        UserTestService().bulk_upsert(
+            instances=rows, unique_fields=["username"], update_fields=["first_name"],
+            info_message="Users are upserted",
+        )
+
+        self.assertEqual(UserTestService.model.objects.get(username="user-0").first_name, "last")
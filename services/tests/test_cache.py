@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from services.cache import LocalLRUCache, ServiceCache
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class CachedUserService(UserTestService):
+    cache = ServiceCache(timeout=60)
+
+
+class ServiceCacheTest(TransactionTestCase):
+    """ That is the tests for the read-through cache of the get(), rows of TestCase transactions are never cached """
+
+    def setUp(self):
+        super(ServiceCacheTest, self).setUp()
+        cache.clear()
+        CachedUserService.cache.local.clear()
+        self.user = get_user_model().objects.create(username="user-0", first_name="first-0")
+
+    def _get(self):
+        return CachedUserService().get(pk=self.user.pk, info_message="User is found").result
+
+    def test_hit_makes_no_queries(self):
+        self._get()
+
+        with self.assertNumQueries(0):
+            user = self._get()
+
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertEqual(CachedUserService.cache.hits, CachedUserService.cache.stats()["hits"])
+
+    def test_cached_instances_are_copies(self):
+        self._get().first_name = "changed"
+        self.assertEqual(self._get().first_name, self.user.first_name)
+
+    def test_update_invalidates(self):
+        user = self._get()
+        CachedUserService().update(instance=user, first_name="updated", info_message="User is updated")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self._get().first_name, "updated")
+
+    def test_bulk_functions_invalidate(self):
+        self._get()
+        CachedUserService().bulk_update(
+            instances=[{"pk": self.user.pk, "first_name": "bulk"}], fields=["first_name"],
+            info_message="Users are updated",
+        )
+        self.assertEqual(self._get().first_name, "bulk")
+
+        CachedUserService().update_where({"pk": self.user.pk}, first_name="where", info_message="Users are updated")
+        self.assertEqual(self._get().first_name, "where")
+
+    def test_shared_layer_sees_the_invalidation_of_other_processes(self):
+        self._get()
+        CachedUserService.cache.local.clear()   # as if another process read it
+
+        with self.assertNumQueries(0):
+            self._get()
+
+        get_user_model().objects.filter(pk=self.user.pk).update(first_name="queryset")
+        CachedUserService.cache.invalidate(get_user_model())
+        self.assertEqual(self._get().first_name, "queryset")
+
+    def test_writes_of_the_transaction_invalidate_after_the_commit(self):
+        generation_key = CachedUserService.cache._generation_key(get_user_model())
+        self._get()
+
+        with transaction.atomic():
+            CachedUserService().update(instance=self._get(), first_name="updated", info_message="User is updated")
+            generation = cache.get(generation_key)
+
+        self.assertNotEqual(cache.get(generation_key), generation)
+        self.assertEqual(self._get().first_name, "updated")
+
+    def test_reads_of_the_transaction_are_not_cached(self):
+        try:
+            with transaction.atomic():
+                get_user_model().objects.filter(pk=self.user.pk).update(first_name="rolled back")
+                self.assertEqual(self._get().first_name, "rolled back")
+                raise ValueError("Rollback")
+        except ValueError:
+            pass
+
+        self.assertEqual(self._get().first_name, self.user.first_name)
+
+
+class LocalLRUCacheTest(BaseServiceTest):
+    users_count = 0
+
+    def test_eviction_and_expiration(self):
+        local_cache = LocalLRUCache(max_size=2, timeout=60)
+        local_cache.set("first", 1)
+        local_cache.set("second", 2)
+        local_cache.get("first")
+        local_cache.set("third", 3)
+
+        self.assertIsNone(local_cache.get("second"))
+        self.assertEqual(local_cache.get("first"), 1)
+        self.assertEqual(local_cache.evictions, 1)
+
+        expired_cache = LocalLRUCache(max_size=2, timeout=-1)
+        expired_cache.set("first", 1)
+        self.assertIsNone(expired_cache.get("first"))
+        self.assertEqual(expired_cache.expirations, 1)
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+
+from services.formatting import compile_logger_message, format_result
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class ServiceLogFormattingTest(BaseServiceTest):
+    """ That is the tests for the lazy formatting of the service log messages """
+
+    def test_compile_logger_message(self):
+        self.assertEqual(
+            compile_logger_message("Found $result$ in $service$"), ("Found ", "result", " in ", "service", ""),
+        )
+
+    def test_result_queryset_is_not_evaluated(self):
+        with patch.object(UserTestService.logger_obj, 'info') as mock_logger, self.assertNumQueries(0):
+            users = UserTestService().filter(is_active=True, info_message="Users: $result$").result
+
+        mock_logger.assert_called_once_with("Users: <QuerySet auth.User (not evaluated)>")
+        self.assertIsNone(users._result_cache)
+
+    def test_evaluated_queryset_uses_cached_results(self):
+        users = UserTestService.model.objects.all()
+        list(users)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(format_result(users), repr(users))
+
+    def test_disabled_logger_does_not_format(self):
+        logger_obj = UserTestService.logger_obj
+
+        with patch.object(logger_obj, 'isEnabledFor', return_value=False), \
+                patch.object(logger_obj, 'info') as mock_logger, \
+                patch('services.decorators.ServiceFunctionDecorator.format_logger_message') as mock_format:
+            UserTestService().get(pk=self.users[0].pk, info_message="User: $result$")
+
+        mock_logger.assert_not_called()
+        mock_format.assert_not_called()
@@ -0,0 +1,60 @@
+from services.exceptions import ServiceException
+from services.identity import identity_map
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class IdentityMapTest(BaseServiceTest):
+    """ That is the tests for the request-scoped identity map """
+
+    def setUp(self):
+        super(IdentityMapTest, self).setUp()
+        self.user = self.users[0]
+
+    def _get(self, **lookup):
+        return UserTestService().get(**lookup, info_message="User is found").result
+
+    def test_same_instance_without_queries(self):
+        with identity_map():
+            user = self._get(pk=self.user.pk)
+
+            with self.assertNumQueries(0):
+                self.assertIs(self._get(id=self.user.pk), user)
+                self.assertIs(self._get(pk=str(self.user.pk)), user)
+
+    def test_loaded_instances_are_shared(self):
+        with identity_map():
+            first = UserTestService().order_by("pk", info_message="Users are ordered").first(
+                info_message="User is found",
+            ).result
+
+            self.assertIs(self._get(pk=first.pk), first)
+
+    def test_filtered_services_do_not_use_the_map(self):
+        with identity_map():
+            self._get(pk=self.user.pk)
+            staff = UserTestService().filter(is_staff=True, info_message="Users are found")
+
+            with self.assertRaises(ServiceException):
+                staff.get(pk=self.user.pk, info_message="User is found")
+
+    def test_writes_keep_the_map_up_to_date(self):
+        with identity_map() as instances:
+            user = self._get(pk=self.user.pk)
+            UserTestService().update(instance=user, first_name="updated", info_message="User is updated")
+            self.assertEqual(self._get(pk=self.user.pk).first_name, "updated")
+
+            UserTestService().delete(instance=user, info_message="User is deleted")
+            self.assertEqual(len(instances), 0)
+
+            self._get(pk=self.users[1].pk)
+            UserTestService().update_where({"pk": self.users[1].pk}, is_staff=True, info_message="User is updated")
+            self.assertEqual(len(instances), 0)
+
+    def test_nested_scopes_share_the_map(self):
+        with identity_map() as outer:
+            with identity_map() as inner:
+                self.assertIs(outer, inner)
+
+            user = self._get(pk=self.user.pk)
+
+        self.assertIsNot(self._get(pk=self.user.pk), user)
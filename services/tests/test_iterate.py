@@ -0,0 +1,28 @@
+from unittest.mock import patch
+
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class IterateServiceFunctionTest(BaseServiceTest):
+    """ That is the tests for the streaming iterate() """
+
+    def test_iterate_instances(self):
+        users = list(UserTestService().iterate(chunk_size=2, info_message="Users are iterated").result)
+        self.assertEqual(sorted(user.pk for user in users), sorted(user.pk for user in self.users))
+
+    def test_iterate_projections(self):
+        usernames = UserTestService().filter(username__in=["user-0", "user-1"], info_message="Users are found")
+        values = list(usernames.iterate(values=("username",), info_message="Users are iterated").result)
+        flat_values = list(usernames.iterate(values_list=("username",), flat=True, info_message="Users").result)
+
+        self.assertEqual(sorted(row["username"] for row in values), ["user-0", "user-1"])
+        self.assertEqual(sorted(flat_values), ["user-0", "user-1"])
+
+    def test_info_message_is_logged_after_iteration(self):
+        with patch.object(UserTestService.logger_obj, 'info') as mock_logger:
+            iterator = UserTestService().iterate(info_message="Iterated $result$ users").result
+            mock_logger.assert_not_called()
+
+            list(iterator)
+
+        mock_logger.assert_called_once_with(f"Iterated {self.users_count} users")
@@ -0,0 +1,80 @@
+from django.contrib.auth.models import Permission
+from django.contrib.contenttypes.models import ContentType
+
+from services.base import BaseService
+from services.context import service_context
+from services.exceptions import ServiceException, ServiceProgrammingException
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class PermissionTestService(BaseService):
+    model = Permission
+    raise_exception = True
+
+
+class ServiceLoaderTest(BaseServiceTest):
+    """ That is the tests for the batching loader of the services """
+
+    def test_keys_are_loaded_with_one_query(self):
+        loader = UserTestService().loader()
+        pending_users = [loader.load(user.pk) for user in self.users] + [loader.load(str(self.users[0].pk))]
+
+        with self.assertNumQueries(1):
+            users = [pending_user.result for pending_user in pending_users]
+
+        self.assertEqual(users, self.users + [self.users[0]])
+        self.assertEqual(loader.load_many([self.users[1].pk, 0]), [self.users[1], None])
+
+    def test_get_uses_the_request_loader(self):
+        with service_context():
+            loader = UserTestService().loader()
+            self.assertIs(UserTestService().loader(), loader)
+
+            for user in self.users:
+                loader.load(user.pk)
+
+            with self.assertNumQueries(1):
+                users = [UserTestService().get(pk=user.pk, info_message="User is found").result for user in self.users]
+
+        self.assertEqual(users, self.users)
+
+    def test_filtered_services_do_not_use_the_request_loader(self):
+        with service_context():
+            UserTestService().loader().load_many([user.pk for user in self.users])
+            staff = UserTestService().filter(is_staff=True, info_message="Users are found")
+
+            with self.assertRaises(ServiceException):
+                staff.get(pk=self.users[1].pk, info_message="User is found")
+
+    def test_request_loader_of_filtered_service_loads_all_rows(self):
+        with service_context():
+            staff_loader = UserTestService().filter(is_staff=True, info_message="Users are found").loader()
+            self.assertEqual(staff_loader.load_now(self.users[1].pk), self.users[1])
+
+    def test_writes_clear_the_request_loader(self):
+        with service_context():
+            loader = UserTestService().loader()
+            user = loader.load_now(self.users[0].pk)
+
+            UserTestService().update_where({"pk": user.pk}, first_name="updated", info_message="User is updated")
+            self.assertFalse(loader.is_loaded(user.pk))
+            user = UserTestService().get(pk=user.pk, info_message="User is found").result
+
+        self.assertEqual(user.first_name, "updated")
+
+    def test_loader_field_must_be_unique(self):
+        with self.assertRaises(ServiceProgrammingException):
+            UserTestService().loader(field="first_name")
+
+        with self.assertRaises(ServiceProgrammingException):
+            UserTestService().get_many(["first-0"], field="first_name", info_message="Users are found")
+
+        loader = UserTestService().loader(field="username")
+        self.assertEqual(loader.load_many(["user-1", "missing"]), [self.users[1], None])
+
+    def test_foreign_keys_are_keyed_by_ids(self):
+        content_type = ContentType.objects.get_for_model(Permission)
+        permissions = PermissionTestService().fetch_many([content_type.pk], field="content_type")
+
+        self.assertEqual(list(permissions), [content_type.pk])
+        self.assertEqual(permissions[content_type.pk].content_type_id, content_type.pk)
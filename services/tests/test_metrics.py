@@ -0,0 +1,64 @@
+import json
+
+from services.decorators import ServiceFunctionDecorator
+from services.metrics import Histogram, JsonMetricsSink, PrometheusMetricsSink, count_rows, registry
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class MeasuredUserService(UserTestService):
+
+    @ServiceFunctionDecorator(collect_metrics=True)
+    def regular_users(self):
+        return list(self._objects.filter(is_staff=False))
+
+    @ServiceFunctionDecorator(collect_metrics=True)
+    def names(self):
+        return [user.username for user in self._objects.all()] + [self._objects.count()]
+
+
+class ServiceMetricsTest(BaseServiceTest):
+    """ That is the tests for the per-call metrics of the service functions """
+
+    def setUp(self):
+        super(ServiceMetricsTest, self).setUp()
+        registry.reset()
+
+    def _histograms(self, function_name: str) -> dict:
+        return registry.as_dict()[f"MeasuredUserService.{function_name}"]
+
+    def test_calls_are_recorded(self):
+        MeasuredUserService().regular_users(info_message="Users are found")
+        MeasuredUserService().names(info_message="Users are found")
+
+        regular_users, names = self._histograms("regular_users"), self._histograms("names")
+        self.assertEqual(regular_users["duration_seconds"]["count"], 1)
+        self.assertEqual(regular_users["sql_queries"]["sum"], 1)
+        self.assertEqual(regular_users["rows"]["sum"], self.users_count)
+        self.assertEqual(names["sql_queries"]["sum"], 2)
+
+    def test_functions_without_metrics_are_not_recorded(self):
+        MeasuredUserService().all(info_message="Users are found")
+        self.assertEqual(registry.as_dict(), {})
+
+    def test_count_rows_does_not_evaluate_querysets(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(count_rows(UserTestService.model.objects.all()))
+
+        self.assertEqual(count_rows(self.users), self.users_count)
+        self.assertEqual(count_rows(None), 0)
+        self.assertEqual(count_rows(self.users[0]), 1)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 10):
+            histogram.observe(value)
+
+        self.assertEqual(histogram.cumulative_counts(), [(1, 2), (5, 3), (float('inf'), 4)])
+
+    def test_sinks(self):
+        MeasuredUserService().regular_users(info_message="Users are found")
+        prometheus = PrometheusMetricsSink().export(registry)
+
+        labels = 'service="MeasuredUserService",function="regular_users"'
+        self.assertIn(f'django_heaven_service_sql_queries_count{{{labels}}} 1', prometheus)
+        self.assertIn("MeasuredUserService.regular_users", json.loads(JsonMetricsSink().export(registry)))
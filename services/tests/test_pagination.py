@@ -0,0 +1,68 @@
+import datetime
+
+from django.utils import timezone
+
+from services.pagination import decode_cursor, encode_cursor
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class KeysetPaginationTest(BaseServiceTest):
+    """ That is the tests for the keyset pagination of the services """
+    users_count = 7
+    order = ('date_joined', 'pk')
+
+    def setUp(self):
+        super(KeysetPaginationTest, self).setUp()
+        joined_at = timezone.now().replace(microsecond=0)
+
+        # Users joined within the same millisecond, cursors must keep the microseconds
+        for index, user in enumerate(self.users):
+            user.date_joined = joined_at + datetime.timedelta(microseconds=100 * index)
+
+        UserTestService.model.objects.bulk_update(self.users, ['date_joined'])
+
+    def _paginate(self, **kwargs):
+        return UserTestService().paginate(order=self.order, info_message="Users are paginated", **kwargs).result
+
+    def _pages(self, limit: int) -> list:
+        pages, page = [], self._paginate(limit=limit)
+
+        for _ in range(self.users_count):   # the broken cursor returns the same page forever
+            pages.append([user.username for user in page])
+
+            if page.next_cursor is None:
+                return pages
+
+            page = self._paginate(after=page.next_cursor, limit=limit)
+
+        self.fail(f"Pagination does not end: {pages}")
+
+    def test_cursor_keeps_types_and_precision(self):
+        values = [self.users[1].date_joined, datetime.time(1, 2, 3, 4), self.users[1].pk]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_forward_pages_by_datetime(self):
+        self.assertEqual(self._pages(limit=3), [
+            ["user-0", "user-1", "user-2"], ["user-3", "user-4", "user-5"], ["user-6"],
+        ])
+
+    def test_backward_pages_by_datetime(self):
+        last_page = self._paginate(after=self._paginate(limit=4).next_cursor, limit=4)
+        self.assertEqual([user.username for user in last_page], ["user-4", "user-5", "user-6"])
+
+        previous_page = self._paginate(before=last_page.prev_cursor, limit=2)
+        self.assertEqual([user.username for user in previous_page], ["user-2", "user-3"])
+        self.assertIsNotNone(previous_page.prev_cursor)
+
+        first_page = self._paginate(before=previous_page.prev_cursor, limit=2)
+        self.assertEqual([user.username for user in first_page], ["user-0", "user-1"])
+        self.assertIsNone(first_page.prev_cursor)
+
+    def test_descending_values_pages(self):
+        page = self._paginate(limit=4, values=('username',))
+        self.assertEqual([row['username'] for row in page], ["user-0", "user-1", "user-2", "user-3"])
+
+        self.order = ('-date_joined', '-pk')
+        self.assertEqual(self._pages(limit=5), [
+            ["user-6", "user-5", "user-4", "user-3", "user-2"], ["user-1", "user-0"],
+        ])
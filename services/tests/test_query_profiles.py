@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import Group
+
+from services.exceptions import ServiceProgrammingException
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class ProfiledUserService(UserTestService):
+    only_fields = ("id", "username")
+    query_profiles = {"groups": {"prefetch_related": ("groups",)}}
+    detect_n_plus_one = True
+
+
+class QueryProfilesTest(BaseServiceTest):
+    """ That is the tests for the declared query profiles and the N+1 queries detection """
+
+    def setUp(self):
+        super(QueryProfilesTest, self).setUp()
+        group = Group.objects.create(name="group")
+
+        for user in self.users:
+            user.groups.add(group)
+
+    def test_default_profile_uses_only_fields(self):
+        user = ProfiledUserService().get(pk=self.users[0].pk, info_message="User is found").result
+        self.assertEqual(user.get_deferred_fields() & {"username", "id"}, set())
+        self.assertIn("first_name", user.get_deferred_fields())
+
+    def test_query_profile_prefetches_relations(self):
+        with self.assertNumQueries(2), patch.object(ProfiledUserService.logger_obj, 'warning') as mock_logger:
+            users = ProfiledUserService().all(query_profile="groups", info_message="Users are found").result
+            group_names = [[group.name for group in user.groups.all()] for user in users]
+
+        self.assertEqual(group_names, [["group"]] * self.users_count)
+        mock_logger.assert_not_called()
+
+    def test_lazy_relation_loads_are_reported_once(self):
+        with patch.object(ProfiledUserService.logger_obj, 'warning') as mock_logger:
+            for user in ProfiledUserService().filter(is_active=True, info_message="Users are found").result:
+                list(user.groups.all())
+
+        mock_logger.assert_called_once()
+        self.assertIn("'groups'", mock_logger.call_args[0][0])
+
+    def test_lazy_deferred_field_loads_are_reported(self):
+        with patch.object(ProfiledUserService.logger_obj, 'warning') as mock_logger:
+            for user in ProfiledUserService().all(info_message="Users are found").result:
+                user.first_name
+
+        mock_logger.assert_called_once()
+        self.assertIn("'first_name'", mock_logger.call_args[0][0])
+
+    def test_unknown_profile(self):
+        with self.assertRaises(ServiceProgrammingException):
+            ProfiledUserService().all(query_profile="missing", info_message="Users are found")
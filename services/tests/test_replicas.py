@@ -0,0 +1,76 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from services.replicas import LEAST_LOADED, ReplicaSelector
+from services.tests.base import UserTestService
+
+
+class ReplicaUserService(UserTestService):
+    read_replicas = ('replica',)
+    route_reads_to_replicas = True
+    read_your_writes_window = 0
+
+
+class ReplicaRoutingTest(TestCase):
+    """ That is the tests for the replica reads and the writes that must go to the primary database """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        super(ReplicaRoutingTest, self).setUp()
+        model = get_user_model()
+
+        # Replica has the same rows, but we give them other names, so that we know where we read from
+        for index in range(3):
+            user = model.objects.create(username=f"user-{index}", first_name="primary")
+            model.objects.using('replica').create(pk=user.pk, username=f"user-{index}", first_name="replica")
+
+    def _first_names(self, alias: str) -> list:
+        return list(get_user_model().objects.using(alias).order_by('pk').values_list('first_name', flat=True))
+
+    def _replica_user(self, username: str = "user-0"):
+        return ReplicaUserService().get(username=username, info_message="User is found").result
+
+    def test_reads_go_to_the_replica(self):
+        user = self._replica_user()
+        self.assertEqual((user.first_name, user._state.db), ("replica", "replica"))
+
+    def test_update_of_replica_instance_writes_to_the_primary(self):
+        ReplicaUserService().update(instance=self._replica_user(), last_name="updated", info_message="User is updated")
+
+        self.assertEqual(get_user_model().objects.get(username="user-0").last_name, "updated")
+        self.assertEqual(get_user_model().objects.using('replica').get(username="user-0").last_name, "")
+
+    def test_delete_of_replica_instance_writes_to_the_primary(self):
+        ReplicaUserService().delete(instance=self._replica_user(), info_message="User is deleted")
+
+        self.assertFalse(get_user_model().objects.filter(username="user-0").exists())
+        self.assertTrue(get_user_model().objects.using('replica').filter(username="user-0").exists())
+
+    def test_set_based_functions_of_replica_querysets_write_to_the_primary(self):
+        users = ReplicaUserService().filter(username__in=["user-0", "user-1"], info_message="Users are found")
+        self.assertEqual(users.result.db, 'replica')
+
+        users.update_where({"is_active": True}, chunk_size=1, first_name="updated", info_message="Users are updated")
+        self.assertEqual(self._first_names('default'), ["updated", "updated", "primary"])
+        self.assertEqual(self._first_names('replica'), ["replica"] * 3)
+
+    def test_unit_of_work_writes_to_the_primary(self):
+        service = ReplicaUserService()
+
+        with service.unit_of_work():
+            service.update(instance=self._replica_user("user-1"), first_name="updated", info_message="Updated")
+            service.delete(instance=self._replica_user("user-2"), info_message="User is deleted")
+
+        self.assertEqual(self._first_names('default'), ["primary", "updated"])
+        self.assertEqual(self._first_names('replica'), ["replica"] * 3)
+
+    async def test_async_lazy_reads_choose_the_replica_without_connecting(self):
+        users = await ReplicaUserService().afilter(is_active=True, info_message="Users are found")
+        self.assertEqual(users.result.db, 'replica')
+
+    def test_selector_skips_failed_replicas(self):
+        selector = ReplicaSelector(strategy=LEAST_LOADED)
+        self.assertEqual(selector.choose(['replica']), 'replica')
+
+        selector.mark_failed('replica')
+        self.assertIsNone(selector.choose(['replica']))
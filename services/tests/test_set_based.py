@@ -0,0 +1,48 @@
+from django.db.models import Q
+
+from services.exceptions import ServiceProgrammingException
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class SetBasedServiceFunctionsTest(BaseServiceTest):
+    """ That is the tests for update_where() and delete_where() """
+
+    def test_update_where_with_one_query(self):
+        with self.assertNumQueries(1):
+            updated = UserTestService().update_where(
+                {"username__in": ["user-0", "user-1"]}, first_name="updated", info_message="Users are updated",
+            ).result
+
+        self.assertEqual(updated, 2)
+        self.assertEqual(UserTestService.model.objects.filter(first_name="updated").count(), 2)
+
+    def test_update_where_in_primary_key_ranges(self):
+        updated = UserTestService().update_where(
+            Q(is_active=True), chunk_size=2, is_staff=True, info_message="Users are updated",
+        ).result
+
+        self.assertEqual(updated, self.users_count)
+        self.assertEqual(UserTestService.model.objects.filter(is_staff=True).count(), self.users_count)
+
+    def test_delete_where_in_primary_key_ranges(self):
+        deleted = UserTestService().delete_where(
+            Q(username__in=["user-0", "user-2", "user-4"]), chunk_size=2, info_message="Users are deleted",
+        ).result
+
+        self.assertEqual(deleted, 3)
+        self.assertEqual(
+            sorted(UserTestService.model.objects.values_list("username", flat=True)), ["user-1", "user-3"],
+        )
+
+    def test_nothing_matches(self):
+        deleted = UserTestService().delete_where(
+            {"username": "missing"}, chunk_size=10, info_message="Users are deleted",
+        ).result
+        self.assertEqual(deleted, 0)
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(ServiceProgrammingException):
+            UserTestService().update_where({"is_active": True}, info_message="Users are updated")
+
+        with self.assertRaises(ServiceProgrammingException):
+            UserTestService().delete_where("is_active", info_message="Users are deleted")
@@ -0,0 +1,85 @@
+from itertools import groupby
+from unittest.mock import patch
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from services.tests.base import BaseServiceTest, UserTestService
+
+
+class UnitOfWorkTest(BaseServiceTest):
+    """ That is the tests for the write buffering of the unit of work """
+
+    def _statements(self, queries: CaptureQueriesContext) -> list:
+        """ Kinds of the write statements, delete() of the user deletes its relations first, so we group them """
+        statements = [query['sql'].split()[0] for query in queries.captured_queries]
+        return [statement for statement, _ in groupby(statements) if statement in ('INSERT', 'UPDATE', 'DELETE')]
+
+    def test_writes_are_flushed_in_order_as_bulk_statements(self):
+        service = UserTestService()
+
+        with CaptureQueriesContext(connection) as queries:
+            with service.unit_of_work() as unit:
+                for index in range(3):
+                    service.create(username=f"created-{index}", info_message="User is created")
+
+                for user in self.users[:2]:
+                    service.update(instance=user, first_name="updated", info_message="User is updated")
+
+                service.delete(instance=self.users[4], info_message="User is deleted")
+                self.assertEqual(len(unit), 6)
+                self.assertFalse(UserTestService.model.objects.filter(username="created-0").exists())
+
+        self.assertEqual(self._statements(queries), ['INSERT', 'UPDATE', 'DELETE'])
+        self.assertEqual(dict(unit.report), {
+            ('auth.User', 'create'): 3, ('auth.User', 'update'): 2, ('auth.User', 'delete'): 1,
+        })
+        self.assertEqual(UserTestService.model.objects.filter(first_name="updated").count(), 2)
+        self.assertEqual(UserTestService.model.objects.count(), self.users_count + 3 - 1)
+
+    def test_flush_is_logged_instead_of_buffered_functions(self):
+        service = UserTestService()
+
+        with patch.object(UserTestService.logger_obj, 'info') as mock_logger:
+            with service.unit_of_work():
+                service.create(username="created", info_message="User is created")
+                service.update(instance=self.users[0], first_name="updated", info_message="User is updated")
+
+        mock_logger.assert_called_once()
+        message = mock_logger.call_args[0][0]
+        self.assertTrue(message.startswith("Unit of work of UserTestService flushed in "))
+        self.assertTrue(message.endswith(": auth.User create: 1, auth.User update: 1"))
+
+    def test_repeated_updates_are_merged(self):
+        service, user = UserTestService(), self.users[0]
+
+        with CaptureQueriesContext(connection) as queries:
+            with service.unit_of_work() as unit:
+                service.update(instance=user, first_name="first", info_message="User is updated")
+                service.update(instance=user, last_name="last", info_message="User is updated")
+
+        self.assertEqual(self._statements(queries), ['UPDATE'])
+        self.assertEqual(unit.report[('auth.User', 'update')], 1)
+
+        user.refresh_from_db()
+        self.assertEqual((user.first_name, user.last_name), ("first", "last"))
+
+    def test_deleting_created_instance_cancels_creation(self):
+        service = UserTestService()
+
+        with service.unit_of_work() as unit:
+            user = service.create(username="created", info_message="User is created").result
+            service.delete(instance=user, info_message="User is deleted")
+
+        self.assertEqual(len(unit.report), 0)
+        self.assertFalse(UserTestService.model.objects.filter(username="created").exists())
+
+    def test_exception_drops_the_writes(self):
+        service = UserTestService()
+
+        with self.assertRaises(RuntimeError):
+            with service.unit_of_work():
+                service.create(username="created", info_message="User is created")
+                raise RuntimeError("failed")
+
+        self.assertFalse(UserTestService.model.objects.filter(username="created").exists())
@@ -0,0 +1,196 @@
+"""
+That file contains the unit of work of the services.
+Inside of 'with service.unit_of_work():' create(), update() and delete() of all the services do not
+write immediately. We collect the writes and flush them at the end of the block as grouped
+bulk_create(), bulk_update() and delete() statements in one transaction.
+
+Writes of every model are flushed in the order that you made them, consecutive writes of the same kind
+are grouped into one statement. Models are flushed in the order of their first write, so create parents first.
+Mind that bulk_create() sets primary keys of the created instances only on the databases that return them
+(e.g. PostgreSQL), and that save() is not called, so pre_save/post_save signals are not sent for the buffered rows.
+"""
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import router, transaction
+
+from services.exceptions import ServiceProgrammingException
+from services.formatting import is_logger_enabled
+
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+
+_current_unit_of_work = contextvars.ContextVar('current_unit_of_work', default=None)
+
+
+class BufferedWrite(NamedTuple):
+    kind: str
+    service: object
+    instance: object
+    fields: frozenset = frozenset()
+
+
+class UnitOfWork:
+    """ Collects the writes of the services and flushes them as bulk statements """
+
+    def __init__(self, service, using: str = None):
+        self.service = service
+        self.using = using
+        self.report = Counter()    # (model label, kind) -> number of rows, filled by flush()
+
+        self._writes = {}   # model -> [BufferedWrite()], dict keeps the order of the first write
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(writes) for writes in self._writes.values())
+
+    def _find_create(self, writes: list, instance):
+        for index, write in enumerate(writes):
+            if write.kind == CREATE and write.instance is instance:
+                return index
+
+        return None
+
+    def create(self, service, instance):
+        """ Buffers the creation of the unsaved instance and returns it """
+        with self._lock:
+            self._writes.setdefault(service.model, []).append(BufferedWrite(CREATE, service, instance))
+
+        return instance
+
+    def update(self, service, instance, fields):
+        """ Buffers the update of the fields. Values are read from the instance when we flush """
+        with self._lock:
+            writes = self._writes.setdefault(service.model, [])
+
+            if instance.pk is None:
+                if self._find_create(writes, instance) is None:
+                    raise ServiceProgrammingException(
+                        f"You cannot update the unsaved instance in the unit of work of {service.__class__.__name__}",
+                    )
+                return  # the buffered create() will write the new values
+
+            writes.append(BufferedWrite(UPDATE, service, instance, frozenset(fields)))
+
+    def delete(self, service, instance):
+        """ Buffers the deletion. Deletion of the instance that was created in the same unit cancels the creation """
+        with self._lock:
+            writes = self._writes.setdefault(service.model, [])
+            create_index = self._find_create(writes, instance) if instance.pk is None else None
+
+            if create_index is not None:
+                del writes[create_index]
+            elif instance.pk is None:
+                raise ServiceProgrammingException(
+                    f"You cannot delete the unsaved instance in the unit of work of {service.__class__.__name__}",
+                )
+            else:
+                writes.append(BufferedWrite(DELETE, service, instance))
+
+    def _flush_run(self, kind: str, run: list, using: str) -> int:
+        service = run[0].service
+
+        if kind == CREATE:
+            return service._call_unwrapped(
+                'bulk_create', instances=[write.instance for write in run], using=using,
+            ).count
+
+        if kind == DELETE:
+            pks = list(dict.fromkeys(write.instance.pk for write in run))
+            # service may be the result of another service function, so we delete through the model objects
+            return service.__class__()._call_unwrapped('delete_where', {'pk__in': pks}, using=using)
+
+        # Instance may be updated a few times, we write its current values of all the updated fields at once
+        instance_fields = {}
+        for write in run:
+            instance, fields = instance_fields.get(id(write.instance), (write.instance, frozenset()))
+            instance_fields[id(write.instance)] = (instance, fields | write.fields)
+
+        updated_rows = 0
+        for fields, group in itertools.groupby(
+            sorted(instance_fields.values(), key=lambda item: sorted(item[1])), key=lambda item: item[1],
+        ):
+            updated_rows += service._call_unwrapped(
+                'bulk_update', instances=[instance for instance, _ in group], fields=list(fields), using=using,
+            ).count
+
+        return updated_rows
+
+    def flush(self) -> Counter:
+        """ Writes all the buffered writes in one transaction and returns the report """
+        with self._lock:
+            writes, self._writes = self._writes, {}
+
+        using = self.using
+        started_at = time.perf_counter()
+
+        with transaction.atomic(using=using):
+            for model, model_writes in writes.items():
+                for kind, run in itertools.groupby(model_writes, key=lambda write: write.kind):
+                    self.report[(model._meta.label, kind)] += self._flush_run(kind, list(run), using)
+
+        if writes and is_logger_enabled(self.service.logger_obj, logging.INFO):
+            self.service.logger_obj.info(
+                f"Unit of work of {self.service.__class__.__name__} flushed in "
+                f"{time.perf_counter() - started_at:.4f}s: {self}",
+            )
+
+        return self.report
+
+    def __str__(self):
+        return ", ".join(f"{label} {kind}: {count}" for (label, kind), count in self.report.items()) or "no writes"
+
+
+def get_unit_of_work():
+    """ Returns the UnitOfWork() of the current scope or None """
+    return _current_unit_of_work.get()
+
+
+@contextmanager
+def open_unit_of_work(service, using: str = None):
+    """
+    Context manager of the BaseService.unit_of_work(), nested units reuse the outer one.
+    If an exception happens inside of the block, we drop the buffered writes. Errors of the flush
+    are logged and handled with service_function_error_handler() as in the service functions.
+    """
+    unit = _current_unit_of_work.get()
+
+    if unit is not None:
+        yield unit
+        return
+
+    unit = UnitOfWork(service, using=using or router.db_for_write(service.model))
+    token = _current_unit_of_work.set(unit)
+
+    try:
+        yield unit
+    finally:
+        _current_unit_of_work.reset(token)
+
+    try:
+        unit.flush()
+    except Exception as exc:
+        error_message = f"Unit of work of {service.__class__.__name__} failed to flush"
+
+        if settings.DEBUG:
+            error_message += f". Exception: {exc}"
+
+        service.logger_obj.error(error_message)
+        service.service_function_error_handler(exc=exc)
+
+
+__all__ = [
+    'BufferedWrite',
+    'UnitOfWork',
+    'get_unit_of_work',
+    'open_unit_of_work',
+]
@@ -0,0 +1,96 @@
+"""
+That file contains the data versions of the models. Every service write increments the version of its model,
+so the caches that put the versions into their keys, e.g. responses.cache.CachedResponseMixin,
+become stale at once without looking for the keys. Versions are stored in the Django cache,
+so the other processes see them too.
+
+Bumping the version costs cache requests on every write, so by default we only do it for the models
+that are registered with track_model_versions(), e.g. cache_models of CachedResponseMixin views.
+Processes that write but never import your views, e.g. background workers, do not know these models:
+set settings.DJANGO_HEAVEN.SERVICES.TRACK_DATA_VERSIONS to True there, or False to turn the versions off.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+
+
+# responses.cache uses that file, so it works without the SERVICES settings
+SERVICES_SETTINGS = settings.DJANGO_HEAVEN.get('SERVICES', {})
+VERSIONS_CACHE_ALIAS = SERVICES_SETTINGS.get('CACHE_ALIAS', 'default')
+VERSIONS_KEY_PREFIX = SERVICES_SETTINGS.get('CACHE_KEY_PREFIX', 'django_heaven')
+
+
+_tracked_models = set()
+
+
+def track_model_versions(*models):
+    """ Makes the service writes of these models bump their versions """
+    _tracked_models.update(model._meta.label_lower for model in models)
+
+
+def is_model_version_tracked(model) -> bool:
+    return model._meta.label_lower in _tracked_models
+
+
+def start_generation(cache, key: str) -> int:
+    """
+    Returns the generation of the key that is missing in the cache. We start it from the current time,
+    so the generation never goes back if the key is evicted. ServiceCache uses the generations too.
+    """
+    cache.add(key, int(time.time() * 1000), timeout=None)
+    return cache.get(key)
+
+
+def increment_generation(cache, key: str):
+    """ Increments the generation of the key, everything cached with the previous one becomes stale """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def _version_key(model) -> str:
+    return f"{VERSIONS_KEY_PREFIX}:version:{model._meta.label_lower}"
+
+
+def get_model_versions(*models) -> tuple:
+    """ Returns the current versions of the models with one cache request """
+    cache = caches[VERSIONS_CACHE_ALIAS]
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys) if keys else {}
+
+    for key in keys:
+        if key not in versions:
+            versions[key] = start_generation(cache, key)
+
+    return tuple(versions[key] for key in keys)
+
+
+def bump_model_version(model):
+    """ Makes everything that was cached with the current version of the model stale """
+    increment_generation(caches[VERSIONS_CACHE_ALIAS], _version_key(model))
+
+
+def record_model_write(model, using: str = None):
+    """
+    Bumps the version of the model after the write. Inside of the transaction we bump it again
+    after the commit, otherwise the readers could cache the old rows under the new version.
+    """
+    using = using or router.db_for_write(model)
+    bump_model_version(model)
+
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: bump_model_version(model), using=using)
+
+
+__all__ = [
+    'bump_model_version',
+    'get_model_versions',
+    'increment_generation',
+    'is_model_version_tracked',
+    'record_model_write',
+    'start_generation',
+    'track_model_versions',
+]
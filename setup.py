@@ -8,13 +8,16 @@ with open(os.path.join(os.path.dirname(__file__), 'README.md')) as readme:
 os.chdir(os.path.normpath(os.path.join(os.path.abspath(__file__), os.pardir)))
 
 requirements = open("requirements/base_requirements.txt", "r").read().split("\n")
+# pip install django-heaven[orjson] makes the default JSON serializer of the responses faster
+orjson_requirements = open("requirements/orjson_requirements.txt", "r").read().split("\n")
 
 setup(
     name='django-heaven',
     version='0.0.3',
-    packages=['responses', 'services'],
+    packages=['common', 'responses', 'services'],
     include_package_data=True,
     install_requires=requirements,
+    extras_require={'orjson': orjson_requirements},
     license='MIT License',
     description='django-heaven brings structure and order to your django projects',
     long_description=README,